@@ -110,9 +110,28 @@ async def main(bot_token: str, env: str) -> None:
     )
 
     video_worker = container.video_worker()
+    battle_render_farm = container.battle_render_farm()
+
+    # Индекс лотереи собирается до старта поллинга и вне event loop:
+    # без манифеста это sha256 каждого видео пула
+    await asyncio.to_thread(container.lottery_pool().load)
+
+    # Прогрев file_id лотереи идёт в фоне — бот отвечает сразу
+    lottery_warm_up = None
+    if settings.LOTTERY_STORAGE_CHAT_ID:
+        lottery_warm_up = asyncio.create_task(
+            container.lottery_pool().warm_up(bot, settings.LOTTERY_STORAGE_CHAT_ID)
+        )
+
+    # Индексы кешей видео пишутся на диск в фоне, а не на каждом запросе
+    cache_autosaves = [
+        asyncio.create_task(container.battle_video_cache().autosave()),
+        asyncio.create_task(container.anime_clip_cache().autosave()),
+    ]
 
     try:
         await video_worker.start()
+        await battle_render_farm.start()
 
         dp = Dispatcher()
         logger.info("Object of dispatcher is initialize")
@@ -174,7 +193,16 @@ async def main(bot_token: str, env: str) -> None:
             except Exception as e:
                 logger.error(f"Error start bot: {e}")
     finally:
+        if lottery_warm_up is not None:
+            lottery_warm_up.cancel()
+
+        for task in cache_autosaves:
+            task.cancel()
+        await asyncio.gather(*cache_autosaves, return_exceptions=True)
+
+        await container.delayed_action_scheduler().stop()
         await video_worker.stop()
+        await battle_render_farm.stop()
 
         await bot.session.close()
 
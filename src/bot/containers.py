@@ -31,9 +31,21 @@ from .services import (
     UserService,
     WordleService,
 )
+from .services.battle.delivery import BattleDeliveryService
+from .services.battle.generator import BattleVideoGenerator
+from .services.battle.render_farm import BattleRenderFarm
+from .services.battle.video_cache import BattleVideoCache
+from .services.battle.win_table import WinProbabilityTable
 from .services.ghoul_game import CoffeeService, LotteryService
+from .services.lottery_pool import LotteryPoolIndex
+from .services.scheduler import DelayedActionScheduler
 from .services.stat_upgrade import StatUpgradeService
-from .services.video import VideoCutterService, VideoWorker
+from .services.video import (
+    AnimeClipCache,
+    KeyframeIndexStore,
+    VideoCutterService,
+    VideoWorker,
+)
 
 session_context: ContextVar[AsyncSession] = ContextVar("session_context")
 
@@ -113,6 +125,9 @@ class Container(containers.DeclarativeContainer):
         dialog_service=dialog_service,
     )
 
+    lottery_pool = providers.Singleton(LotteryPoolIndex)
+    delayed_action_scheduler = providers.Singleton(DelayedActionScheduler)
+
     lottery_service = providers.Factory(
         LotteryService,
         user_service=user_service,
@@ -121,6 +136,8 @@ class Container(containers.DeclarativeContainer):
         media_service=media_service,
         dialog_service=dialog_service,
         lottery_repository=lottery_repository,
+        lottery_pool=lottery_pool,
+        scheduler=delayed_action_scheduler,
     )
 
     stat_upgrade_service = providers.Factory(
@@ -172,5 +189,25 @@ class Container(containers.DeclarativeContainer):
     #     BattleService,
     # )
 
-    video_cutter_service = providers.Singleton(VideoCutterService)
+    battle_render_farm = providers.Singleton(BattleRenderFarm)
+    battle_video_cache = providers.Singleton(BattleVideoCache)
+    battle_video_generator = providers.Singleton(
+        BattleVideoGenerator,
+        output_dir="src/assets/videos/battle",
+        render_farm=battle_render_farm,
+    )
+    battle_win_table = providers.Singleton(WinProbabilityTable.load_optional)
+    battle_delivery_service = providers.Singleton(
+        BattleDeliveryService,
+        generator=battle_video_generator,
+        video_cache=battle_video_cache,
+        scheduler=delayed_action_scheduler,
+        win_table=battle_win_table,
+    )
+
+    keyframe_index_store = providers.Singleton(KeyframeIndexStore)
+    video_cutter_service = providers.Singleton(
+        VideoCutterService, keyframes=keyframe_index_store
+    )
     video_worker = providers.Singleton(VideoWorker, video_cutter_service)
+    anime_clip_cache = providers.Singleton(AnimeClipCache)
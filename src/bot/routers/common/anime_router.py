@@ -3,24 +3,86 @@ import logging
 from pathlib import Path
 
 from aiogram import Router
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import Command
 from aiogram.types import FSInputFile, Message
 from dependency_injector.wiring import Provide, inject
 
 from ...containers import Container
-from ...services import VideoCutterService, VideoWorker
+from ...services import AnimeClipCache, VideoCutterService, VideoWorker
+from ...services.video.clip_cache import (
+    CLIP_FORMAT_GIF,
+    CLIP_FORMAT_VIDEO,
+    CachedAnimeClip,
+)
 from ...types import VideoCutJob
 
 logger = logging.getLogger(__name__)
 router = Router(name=__name__)
 
 
+async def _reply_clip(
+    message: Message,
+    clip_cache: AnimeClipCache,
+    key: str,
+    media: str | FSInputFile,
+    is_gif: bool,
+    caption: str,
+) -> Message:
+    """Отправляет отрывок и запоминает file_id, если файл загружался."""
+    if is_gif:
+        sent = await message.reply_animation(media, caption=caption)
+        uploaded = sent.animation
+    else:
+        sent = await message.reply_video(media, caption=caption)
+        uploaded = sent.video
+
+    if isinstance(media, FSInputFile) and uploaded is not None:
+        clip_cache.set_file_id(key, uploaded.file_id)
+    return sent
+
+
+async def _reply_cached(
+    message: Message,
+    clip_cache: AnimeClipCache,
+    cached: CachedAnimeClip,
+    is_gif: bool,
+    caption: str,
+    source: Path | None = None,
+) -> bool:
+    """
+    Отвечает отрывком из кеша. Протухший file_id вычёркивается, и файл
+    грузится заново — из кеша или source. False — грузить нечего, отрывок
+    нужно нарезать заново.
+    """
+    try:
+        await _reply_clip(
+            message, clip_cache, cached.key, cached.media, is_gif, caption
+        )
+        return True
+    except TelegramBadRequest:
+        if not cached.file_id:
+            raise
+        logger.warning(f"Stale anime clip file_id {cached.key}, re-uploading")
+        clip_cache.forget_file_id(cached.key)
+
+    path = cached.path or source
+    if path is None:
+        return False
+
+    await _reply_clip(
+        message, clip_cache, cached.key, FSInputFile(path), is_gif, caption
+    )
+    return True
+
+
 @router.message(Command("anime"))
 @inject
 async def anime_handler(
     message: Message,
     video_worker: VideoWorker = Provide[Container.video_worker],
     video_cutter: VideoCutterService = Provide[Container.video_cutter_service],
+    clip_cache: AnimeClipCache = Provide[Container.anime_clip_cache],
 ):
     if not message.text:
         await message.answer("Пожалуйста, укажите параметры команды.")
@@ -50,10 +112,17 @@ async def anime_handler(
         return
 
     if len(args) == 3:
-        await message.reply_video(
-            FSInputFile(input_path),
-            caption=f"🎬 Сезон {season}. Серия {episode}",
-        )
+        key = clip_cache.key(input_path, season, episode)
+        caption = f"🎬 Сезон {season}. Серия {episode}"
+        cached = clip_cache.get(key)
+        if cached is not None:
+            await _reply_cached(
+                message, clip_cache, cached, False, caption, source=input_path
+            )
+        else:
+            await _reply_clip(
+                message, clip_cache, key, FSInputFile(input_path), False, caption
+            )
         return
 
     if len(args) < 5:
@@ -91,6 +160,23 @@ async def anime_handler(
         await message.answer("❌ Конечный таймкод должен быть больше начального.")
         return
 
+    caption = f"🎬 Сезон {season}. Серия {episode}. Отрывок с {start_time} до {end_time}"
+    caption = ("Gif\n" if is_gif else "Video\n") + caption
+
+    key = clip_cache.key(
+        input_path,
+        season,
+        episode,
+        start_time,
+        end_time,
+        CLIP_FORMAT_GIF if is_gif else CLIP_FORMAT_VIDEO,
+    )
+    cached = clip_cache.get(key)
+    if cached is not None and await _reply_cached(
+        message, clip_cache, cached, is_gif, caption
+    ):
+        return
+
     output_path = video_cutter.generate_output_path(input_path.name, is_gif=is_gif)
 
     job = VideoCutJob(
@@ -99,7 +185,7 @@ async def anime_handler(
         start_time=start_time,
         end_time=end_time,
         chat_id=message.chat.id,
-        caption=f"🎬 Сезон {season}. Серия {episode}. Отрывок с {start_time} до {end_time}",
+        caption=caption,
     )
 
     processing_msg = await message.reply(
@@ -116,16 +202,11 @@ async def anime_handler(
 
         await processing_msg.delete()
 
-        if not is_gif:
-            await message.reply_video(
-                FSInputFile(result_path),
-                caption="Video\n" + job.caption if job.caption else "",
-            )
-        else:
-            await message.reply_animation(
-                FSInputFile(result_path),
-                caption="Gif\n" + job.caption if job.caption else "",
-            )
+        # Файл уходит в кеш; если хранение выключено, его удалит finally
+        clip_path = clip_cache.put_file(key, result_path)
+        await _reply_clip(
+            message, clip_cache, key, FSInputFile(clip_path), is_gif, caption
+        )
 
     except asyncio.TimeoutError:
         await processing_msg.edit_text(
@@ -19,7 +19,7 @@ from .media import MediaDownloader, MediaService
 from .rp_commands import RpCommandsService
 from .sync_entity import SyncEntitiesService
 from .user import UserService
-from .video import VideoCutterService, VideoWorker
+from .video import AnimeClipCache, VideoCutterService, VideoWorker
 from .wordle_game import WordleService
 
 __all__ = [
@@ -47,4 +47,5 @@ __all__ = [
     "BattleTextGenerator",
     "VideoCutterService",
     "VideoWorker",
+    "AnimeClipCache",
 ]
@@ -0,0 +1,144 @@
+import logging
+import multiprocessing
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+
+import av
+import numpy as np
+from PIL import Image
+
+from src.bot.services.battle.animation_loader import (
+    ANIMATIONS_DIR,
+    CLIP_HEIGHT,
+    fit_height,
+    write_clip_manifest,
+)
+from src.bot.services.battle.clip_cache import (
+    ALPHA_KEYED,
+    ALPHA_MATTED,
+    clip_cache_path,
+    clip_cache_ready,
+    prune_clip_cache,
+    write_clip_cache,
+)
+from src.bot.services.battle.compositor import premultiply
+
+logger = logging.getLogger(__name__)
+
+# Модель rembg, обученная на аниме-персонажах
+MATTING_MODEL = "isnet-anime"
+
+# Кадров в одной задаче воркеру — меньше пересылок между процессами
+MATTING_BATCH_SIZE = 16
+
+
+# ==========================================================
+# Офлайн-маски для клипов боя
+# ==========================================================
+# rembg (onnxruntime на CPU) строит альфу по каждому кадру всех клипов
+# src/assets/animation/battle/**. Кадры уходят в пул процессов пачками,
+# готовые RGBA пишутся в формат скомпилированного кеша клипов с пометкой
+# ALPHA_MATTED — рантайм берёт их как есть, без порога по чёрному фону
+# и без ореолов от него. Уже собранные клипы пропускаются.
+
+
+_session = None
+
+
+def _init_worker(model: str) -> None:
+    # onnxruntime по умолчанию берёт все ядра в каждом процессе —
+    # при N процессах это N² потоков на N ядрах
+    os.environ["OMP_NUM_THREADS"] = "1"
+
+    from rembg import new_session
+
+    global _session
+    _session = new_session(model, providers=["CPUExecutionProvider"])
+
+
+def _matte_batch(frames: List[np.ndarray]) -> List[np.ndarray]:
+    """RGB кадры → маски uint8 (h, w). Выполняется в воркере."""
+    from rembg import remove
+
+    return [
+        np.asarray(
+            remove(
+                Image.fromarray(frame),
+                session=_session,
+                only_mask=True,
+                post_process_mask=True,
+            )
+        )
+        for frame in frames
+    ]
+
+
+def _decode_rgb_frames(path: Path, target_height: int) -> List[np.ndarray]:
+    with av.open(str(path)) as container:
+        stream = container.streams.video[0]
+        return [
+            fit_height(frame.to_ndarray(format="rgb24"), target_height)
+            for frame in container.decode(stream)
+        ]
+
+
+def matte_animations(
+    root: Path = ANIMATIONS_DIR,
+    target_height: int = CLIP_HEIGHT,
+    workers: Optional[int] = None,
+    batch_size: int = MATTING_BATCH_SIZE,
+    model: str = MATTING_MODEL,
+    force: bool = False,
+) -> int:
+    """
+    Строит маски rembg для всех webm клипов и сохраняет их в кеш клипов.
+    Возвращает количество обработанных клипов.
+    """
+    sources = sorted(root.rglob("*.webm"))
+    todo = [
+        source
+        for source in sources
+        if force
+        or not clip_cache_ready(source, target_height, alpha=ALPHA_MATTED)
+    ]
+    logger.info(f"Matting {len(todo)} of {len(sources)} battle clips")
+
+    if todo:
+        # spawn — onnxruntime не переживает fork с уже созданными потоками
+        with ProcessPoolExecutor(
+            max_workers=workers or os.cpu_count(),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(model,),
+        ) as pool:
+            # Все пачки всех клипов сразу — пул не простаивает на коротких клипах
+            jobs: List[tuple[Path, List[np.ndarray], List[Future]]] = []
+            for source in todo:
+                frames = _decode_rgb_frames(source, target_height)
+                batches = [
+                    pool.submit(_matte_batch, frames[i : i + batch_size])
+                    for i in range(0, len(frames), batch_size)
+                ]
+                jobs.append((source, frames, batches))
+
+            for source, frames, batches in jobs:
+                masks = [mask for batch in batches for mask in batch.result()]
+                sprites = [
+                    premultiply(np.dstack((rgb, mask)))
+                    for rgb, mask in zip(frames, masks)
+                ]
+                write_clip_cache(source, target_height, sprites, alpha=ALPHA_MATTED)
+                logger.info(f"Matted {source} ({len(sprites)} frames)")
+
+    keep = [
+        clip_cache_path(source, target_height, alpha=alpha)
+        for source in sources
+        for alpha in (ALPHA_MATTED, ALPHA_KEYED)
+        if clip_cache_ready(source, target_height, alpha=alpha)
+    ]
+    prune_clip_cache(keep)
+    write_clip_manifest(root, target_height)
+
+    return len(todo)
@@ -1,5 +1,5 @@
+import json
 import logging
-from functools import lru_cache
 from pathlib import Path
 from typing import List, Optional
 
@@ -7,6 +7,19 @@ import av
 import numpy as np
 from PIL import Image
 
+from src.bot.services.battle.clip_cache import (
+    ALPHA_KEYED,
+    ALPHA_MATTED,
+    CLIP_MANIFEST,
+    clip_cache_path,
+    clip_cache_ready,
+    load_clip_cache,
+    prune_clip_cache,
+    write_clip_cache,
+)
+from src.bot.services.battle.compositor import PremultipliedSprite, premultiply
+from src.bot.services.battle.frame_cache import ByteBudgetCache, FrameCacheStats
+from src.bot.services.battle.stage_timer import stage
 from src.bot.types import KaguneType
 
 logger = logging.getLogger(__name__)
@@ -14,6 +27,17 @@ logger = logging.getLogger(__name__)
 BASE_DIR = Path("src/assets")
 ANIMATIONS_DIR = BASE_DIR / "animation" / "battle"
 
+CLIP_HEIGHT = 220
+
+# Бюджет памяти на декодированные клипы во всём процессе
+CLIP_CACHE_MAX_BYTES = 160 * 1024 * 1024
+
+_clip_frames: ByteBudgetCache[List[PremultipliedSprite]] = ByteBudgetCache(
+    name="battle_clips",
+    max_bytes=CLIP_CACHE_MAX_BYTES,
+    sizeof=lambda frames: sum(frame.nbytes for frame in frames),
+)
+
 ATTACKER_CLIP = {
     "hit": "attack",
     "crit": "attack",
@@ -58,14 +82,53 @@ def get_animation_path(
     return None
 
 
-@lru_cache(maxsize=128)
 def _decode_webm_rgba(
     path: str,
     target_height: int,
-) -> List[np.ndarray]:
+) -> List[PremultipliedSprite]:
     """Декодирует webm без flip — flip делается на лету в get_clip_frame.
     Так один файл кешируется один раз для обоих игроков."""
-    frames: List[np.ndarray] = []
+    return _clip_frames.get_or_load(
+        (path, target_height), lambda: _load_clip(path, target_height)
+    )
+
+
+def _load_clip(path: str, target_height: int) -> List[PremultipliedSprite]:
+    """Сначала ищет скомпилированный клип на диске (с маской rembg, потом
+    с вырезанным фоном), иначе декодирует и сохраняет для следующих запусков."""
+    for alpha in (ALPHA_MATTED, ALPHA_KEYED):
+        frames = load_clip_cache(path, target_height, alpha=alpha)
+        if frames is not None:
+            return frames
+
+    logger.debug(f"No matted cache for {path}, keying black background")
+
+    frames = _decode_webm_frames(path, target_height)
+    if frames:
+        try:
+            write_clip_cache(path, target_height, frames)
+        except OSError as e:
+            logger.warning(f"Failed to write clip cache for {path}: {e}")
+
+    return frames
+
+
+def fit_height(arr: np.ndarray, target_height: int) -> np.ndarray:
+    """Масштабирует кадр (RGB или RGBA) до высоты с сохранением пропорций."""
+    if arr.shape[0] == target_height:
+        return arr
+    img = Image.fromarray(arr)
+    ratio = target_height / img.height
+    new_size = (int(img.width * ratio), target_height)
+    return np.array(img.resize(new_size, Image.Resampling.LANCZOS))
+
+
+def _decode_webm_frames(
+    path: str,
+    target_height: int,
+) -> List[PremultipliedSprite]:
+    """Кадры хранятся premultiplied и обрезанными до непрозрачной области."""
+    frames: List[PremultipliedSprite] = []
 
     try:
         container = av.open(path)
@@ -84,14 +147,7 @@ def _decode_webm_rgba(
                 black = (arr[:, :, 0] < 15) & (arr[:, :, 1] < 15) & (arr[:, :, 2] < 15)
                 arr[:, :, 3] = np.where(black, 0, 255)
 
-            if arr.shape[0] != target_height:
-                img = Image.fromarray(arr, "RGBA")
-                ratio = target_height / img.height
-                new_size = (int(img.width * ratio), target_height)
-                img = img.resize(new_size, Image.Resampling.LANCZOS)
-                arr = np.array(img)
-
-            frames.append(arr)
+            frames.append(premultiply(fit_height(arr, target_height)))
 
     except Exception as e:
         logger.error(f"Error decoding {path}: {e}")
@@ -108,20 +164,120 @@ def get_clip_frame(
     path: Optional[str],
     progress: float,
     flip: bool = False,
-    target_height: int = 220,
-) -> Optional[Image.Image]:
+    target_height: int = CLIP_HEIGHT,
+) -> Optional[PremultipliedSprite]:
     if not path:
         return None
 
-    frames = _decode_webm_rgba(path, target_height)
+    with stage("clip_decode"):
+        frames = _decode_webm_rgba(path, target_height)
     if not frames:
         return None
 
     progress = min(max(progress, 0.0), 1.0)
     idx = min(int(progress * (len(frames) - 1)), len(frames) - 1)
 
-    arr = frames[idx]
+    sprite = frames[idx]
     if flip:
-        arr = np.flip(arr, axis=1)  # view, без copy — быстро
+        sprite = sprite.flipped()  # view, без copy — быстро
+
+    return sprite
+
+
+def clip_frame_count(path: str, target_height: int = CLIP_HEIGHT) -> int:
+    with stage("clip_decode"):
+        return len(_decode_webm_rgba(path, target_height))
+
+
+def get_clip_frame_at(
+    path: str,
+    index: int,
+    flip: bool = False,
+    target_height: int = CLIP_HEIGHT,
+) -> PremultipliedSprite:
+    """Кадр клипа по готовому индексу из скомпилированного таймлайна."""
+    with stage("clip_decode"):
+        sprite = _decode_webm_rgba(path, target_height)[index]
+    return sprite.flipped() if flip else sprite
+
+
+def compile_animations(
+    root: Path = ANIMATIONS_DIR,
+    target_height: int = CLIP_HEIGHT,
+    prune: bool = True,
+) -> int:
+    """
+    Компилирует все webm клипы в кеш на диске. Вызывается при деплое,
+    чтобы первый бой после рестарта не платил за декодирование.
+    Возвращает количество перекомпилированных клипов.
+    """
+    compiled = 0
+    keep: List[Path] = []
+
+    for source in sorted(root.rglob("*.webm")):
+        # Маски rembg собираются отдельной командой — их не трогаем
+        if clip_cache_ready(source, target_height, alpha=ALPHA_MATTED):
+            keep.append(clip_cache_path(source, target_height, alpha=ALPHA_MATTED))
+
+        # Буфер без индекса — прерванная компиляция, собираем заново
+        if clip_cache_ready(source, target_height):
+            keep.append(clip_cache_path(source, target_height))
+            continue
+
+        frames = _decode_webm_frames(str(source), target_height)
+        if not frames:
+            continue
+
+        keep.append(write_clip_cache(source, target_height, frames))
+        compiled += 1
+        logger.info(f"Compiled {source} ({len(frames)} frames)")
+
+    if prune:
+        prune_clip_cache(keep)
+
+    write_clip_manifest(root, target_height)
+    return compiled
+
+
+def write_clip_manifest(
+    root: Path = ANIMATIONS_DIR, target_height: int = CLIP_HEIGHT
+) -> None:
+    manifest = [
+        {"path": str(source), "height": target_height}
+        for source in sorted(root.rglob("*.webm"))
+    ]
+    CLIP_MANIFEST.parent.mkdir(parents=True, exist_ok=True)
+    CLIP_MANIFEST.write_text(json.dumps(manifest, ensure_ascii=False, indent=2))
+
+
+def prewarm_clips(manifest_path: Path = CLIP_MANIFEST) -> int:
+    """
+    Загружает клипы из манифеста в память до исчерпания бюджета.
+    Возвращает количество прогретых клипов.
+    """
+    if not manifest_path.is_file():
+        logger.debug(f"Clip manifest not found: {manifest_path}")
+        return 0
+
+    warmed = 0
+    for entry in json.loads(manifest_path.read_text()):
+        path, height = entry["path"], entry.get("height", CLIP_HEIGHT)
+        if not Path(path).is_file():
+            continue
+
+        # Кеш сам держится в бюджете, так что полный бюджет виден только
+        # по вытеснению: клип встал на место уже прогретого — дальше
+        # прогрев лишь гоняет клипы по кругу
+        evictions = _clip_frames.stats.evictions
+        _decode_webm_rgba(path, height)
+        if _clip_frames.stats.evictions > evictions:
+            break
+        if (path, height) in _clip_frames:
+            warmed += 1
+
+    logger.info(f"Prewarmed {warmed} battle clips ({_clip_frames.stats.bytes} bytes)")
+    return warmed
+
 
-    return Image.fromarray(arr, "RGBA")
+def clip_cache_stats() -> FrameCacheStats:
+    return _clip_frames.stats
@@ -0,0 +1,71 @@
+from typing import List
+
+from src.bot.services.battle.models import TimelineEvent
+
+EVENT_NAMES = {
+    "hit": "удар",
+    "miss": "промах",
+    "block": "блок",
+    "crit": "КРИТ",
+    "regen": "регенерация",
+}
+
+
+# ==========================================================
+# Текстовый лог боя
+# ==========================================================
+# Идёт сообщением рядом с видео — в режиме хайлайтов видео показывает
+# не все раунды, а в логе есть каждый удар. Строится по полному
+# таймлайну: в нём уже посчитаны HP до и после каждого события.
+
+
+def _event_line(item: TimelineEvent) -> str:
+    data = item.data
+    event = data.battle_event
+    attacker_left = data.attacker_left or False
+
+    attacker_hp = data.left_hp_after if attacker_left else data.right_hp_after
+    defender_hp = data.right_hp_after if attacker_left else data.left_hp_after
+    attacker, defender = event.attacker, event.defender
+
+    if event.type == "regen":
+        return (
+            f"{attacker.name}: {EVENT_NAMES['regen']} +{event.heal} "
+            f"({attacker_hp}/{attacker.max_hp})"
+        )
+    if event.type == "miss":
+        return f"{attacker.name} → {defender.name}: {EVENT_NAMES['miss']}"
+    return (
+        f"{attacker.name} → {defender.name}: {EVENT_NAMES[event.type]} "
+        f"-{event.damage} ({defender.name} {defender_hp}/{defender.max_hp})"
+    )
+
+
+def format_battle_log(timeline: List[TimelineEvent]) -> str:
+    lines: List[str] = []
+    first_attacker = None
+    round_num = 0
+
+    for item in timeline:
+        event = item.data.battle_event
+
+        if event is None:
+            if item.type == "outro":
+                lines.append("")
+                if item.data.is_draw:
+                    lines.append("Ничья")
+                else:
+                    lines.append(f"Победитель: {item.data.winner.name}")
+            continue
+
+        # Раунд начинается с удара того, кто ходит первым
+        if event.type != "regen":
+            if first_attacker is None:
+                first_attacker = event.attacker
+            if event.attacker is first_attacker:
+                round_num += 1
+                lines.append(f"Раунд {round_num}")
+
+        lines.append(_event_line(item))
+
+    return "\n".join(lines)
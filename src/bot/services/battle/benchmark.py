@@ -4,24 +4,68 @@ from pathlib import Path
 
 sys.path.append(str(Path(__file__).parent.parent.parent.parent.parent))
 
+import argparse
+import cProfile
+import json
 import statistics
 import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
 
+from src.bot.services.battle.compiled_timeline import (
+    item_frame_count,
+    timeline_frame_count,
+)
 from src.bot.services.battle.generator import BattleVideoGenerator
-from src.bot.services.battle.mechanics import BattleMechanics
 from src.bot.services.battle.models import BattleFighter
-from src.bot.services.battle.timeline import BattleTimelineBuilder
+from src.bot.services.battle.replay import BattleReplay
+from src.bot.services.battle.stage_timer import STAGES, collect
 from src.bot.types import KaguneType
 
 OUTPUT_DIR = Path("src/assets/videos/battle/benchmark")
-N = 10
+BASELINE_PATH = Path("src/assets/benchmarks/battle_render.json")
 
+REPORT_VERSION = 1
+REPEATS = 3
 
-def make_fighter(name: str, kagune: KaguneType) -> BattleFighter:
+# Рост времени на кадр больше порога считается регрессией
+THRESHOLD = 0.15
+# Разница меньше этого на кадр — шум таймера, не регрессия
+NOISE_FLOOR_MS = 0.05
+
+
+# ==========================================================
+# Фикстуры
+# ==========================================================
+# Сид фиксирует исход боя, поэтому от запуска к запуску рендерится
+# один и тот же таймлайн. Разный запас HP даёт разное число раундов:
+# 4, 7 и 13 — длинный бой не упирается в MAX_ROUNDS, иначе он
+# отличался бы от среднего только длиной пауз. Обе стороны — ринкаку:
+# в репозитории лежат спрайты и клипы только для него.
+
+
+@dataclass(frozen=True)
+class Fixture:
+    name: str
+    seed: int
+    hp: int
+    left_kagune: KaguneType = KaguneType.RINKAKU
+    right_kagune: KaguneType = KaguneType.RINKAKU
+
+
+FIXTURES = (
+    Fixture("short", seed=1, hp=400),
+    Fixture("medium", seed=2, hp=1000),
+    Fixture("long", seed=3, hp=2000),
+)
+
+
+def make_fighter(name: str, kagune: KaguneType, hp: int = 1000) -> BattleFighter:
     return BattleFighter(
         name=name,
-        hp=1000,
-        max_hp=1000,
+        hp=hp,
+        max_hp=hp,
         kagune_type=kagune,
         strength=50,
         dexterity=40,
@@ -31,41 +75,260 @@ def make_fighter(name: str, kagune: KaguneType) -> BattleFighter:
     )
 
 
-def run():
-    mechanics = BattleMechanics()
-    builder = BattleTimelineBuilder()
-    generator = BattleVideoGenerator(output_dir=OUTPUT_DIR)
+def build_timeline(fixture: Fixture):
+    left = make_fighter("Канеки", fixture.left_kagune, fixture.hp)
+    right = make_fighter("Хайсе", fixture.right_kagune, fixture.hp)
+    return BattleReplay.record(left, right, seed=fixture.seed).play()
+
 
-    times = []
+# ==========================================================
+# Замеры
+# ==========================================================
 
-    for i in range(1, N + 1):
-        left = make_fighter("Канеки", KaguneType.RINKAKU)
-        right = make_fighter("Хайсе", KaguneType.RINKAKU)
 
-        result = mechanics.simulate(left, right)
-        timeline = builder.build(left, right, result)
+def _stage_report(totals: Dict[str, tuple[float, int]], frames: int) -> dict:
+    report = {}
+    for name in STAGES:
+        seconds, calls = totals.get(name, (0.0, 0))
+        report[name] = {
+            "total_ms": seconds * 1000,
+            "per_frame_ms": seconds * 1000 / frames,
+            "calls": calls,
+        }
+    return report
 
-        output_path = OUTPUT_DIR / f"bench_{i:02d}.mp4"
 
-        print(f"[{i}/{N}] Генерация {output_path.name}... ", end="", flush=True)
+def run_fixture(
+    fixture: Fixture, generator: BattleVideoGenerator, output_path: Path
+) -> dict:
+    result, timeline = build_timeline(fixture)
+    frames = timeline_frame_count(timeline)
 
+    item_frames: Counter = Counter()
+    for item in timeline:
+        item_frames[item.type] += item_frame_count(item)
+
+    with collect() as timer:
         start = time.perf_counter()
-        generator.generate_timeline(timeline, output_path, left_fighter_name=left.name)
-        elapsed = time.perf_counter() - start
+        generator.generate_timeline(timeline, output_path)
+        wall = time.perf_counter() - start
+
+    per_item = timer.totals()
+    overall: Dict[str, tuple[float, int]] = {}
+    for stages in per_item.values():
+        for name, (seconds, calls) in stages.items():
+            prev_seconds, prev_calls = overall.get(name, (0.0, 0))
+            overall[name] = (prev_seconds + seconds, prev_calls + calls)
+
+    # Разбивка по типам элементов — только стадии рендера: конвейер
+    # энкода работает в своих потоках и к элементам не привязан
+    items = {
+        item_type: {
+            "frames": count,
+            "stages": {
+                name: value["per_frame_ms"]
+                for name, value in _stage_report(
+                    per_item.get(item_type, {}), count
+                ).items()
+                if value["calls"]
+            },
+        }
+        for item_type, count in item_frames.items()
+    }
+
+    return {
+        "seed": fixture.seed,
+        "rounds": result.rounds,
+        "frames": frames,
+        "wall_ms": wall * 1000,
+        "wall_per_frame_ms": wall * 1000 / frames,
+        "stages": _stage_report(overall, frames),
+        "items": items,
+    }
+
+
+def _median_report(runs: List[dict]) -> dict:
+    """Медиана по повторам для всех числовых метрик."""
+    report = dict(runs[0])
+    for key in ("wall_ms", "wall_per_frame_ms"):
+        report[key] = statistics.median(run[key] for run in runs)
+
+    report["stages"] = {
+        name: {
+            "total_ms": statistics.median(
+                run["stages"][name]["total_ms"] for run in runs
+            ),
+            "per_frame_ms": statistics.median(
+                run["stages"][name]["per_frame_ms"] for run in runs
+            ),
+            "calls": runs[0]["stages"][name]["calls"],
+        }
+        for name in STAGES
+    }
+    report["items"] = {
+        item_type: {
+            "frames": item["frames"],
+            "stages": {
+                name: statistics.median(
+                    run["items"][item_type]["stages"].get(name, 0.0) for run in runs
+                )
+                for name in item["stages"]
+            },
+        }
+        for item_type, item in runs[0]["items"].items()
+    }
+    return report
+
+
+def run_benchmark(
+    fixtures=FIXTURES,
+    repeats: int = REPEATS,
+    warmup: bool = True,
+    encoder_threads: Optional[int] = None,
+) -> dict:
+    kwargs = {} if encoder_threads is None else {"encoder_threads": encoder_threads}
+    generator = BattleVideoGenerator(output_dir=OUTPUT_DIR, **kwargs)
+
+    if warmup:
+        # Первый рендер прогревает шрифты, HUD и кеш клипов
+        run_fixture(fixtures[0], generator, OUTPUT_DIR / "warmup.mp4")
+
+    report: Dict[str, Any] = {
+        "version": REPORT_VERSION,
+        "python": sys.version.split()[0],
+        "repeats": repeats,
+        "fixtures": {},
+    }
+
+    for fixture in fixtures:
+        runs = []
+        for i in range(repeats):
+            output_path = OUTPUT_DIR / f"bench_{fixture.name}_{i:02d}.mp4"
+            runs.append(run_fixture(fixture, generator, output_path))
+            print(
+                f"[{fixture.name} {i + 1}/{repeats}] "
+                f"{runs[-1]['wall_ms'] / 1000:.2f}s  |  "
+                f"раундов: {runs[-1]['rounds']}  |  кадров: {runs[-1]['frames']}",
+                file=sys.stderr,
+            )
+        report["fixtures"][fixture.name] = _median_report(runs)
+
+    return report
+
 
-        times.append(elapsed)
+# ==========================================================
+# Сравнение с эталоном
+# ==========================================================
+
+
+def compare_reports(
+    current: dict,
+    baseline: dict,
+    threshold: float = THRESHOLD,
+    noise_floor_ms: float = NOISE_FLOOR_MS,
+) -> List[str]:
+    """Список регрессий: метрики на кадр, выросшие больше порога."""
+    regressions = []
+
+    for name, base in baseline.get("fixtures", {}).items():
+        cur = current.get("fixtures", {}).get(name)
+        if cur is None:
+            continue
+
+        metrics = [("wall", base["wall_per_frame_ms"], cur["wall_per_frame_ms"])]
+        metrics += [
+            (
+                stage,
+                base["stages"][stage]["per_frame_ms"],
+                cur["stages"][stage]["per_frame_ms"],
+            )
+            for stage in STAGES
+            if stage in base["stages"] and stage in cur["stages"]
+        ]
+
+        for metric, base_ms, cur_ms in metrics:
+            if cur_ms - base_ms <= noise_floor_ms:
+                continue
+            if cur_ms > base_ms * (1 + threshold):
+                growth = f"+{(cur_ms / base_ms - 1) * 100:.0f}%" if base_ms else "new"
+                regressions.append(
+                    f"{name}/{metric}: {base_ms:.3f} → {cur_ms:.3f} ms/кадр ({growth})"
+                )
+
+    return regressions
+
+
+def print_report(report: dict) -> None:
+    for name, fixture in report["fixtures"].items():
         print(
-            f"{elapsed:.2f}s  |  раундов: {result.rounds}  |  победитель: {result.winner.name if result.winner else 'ничья'}"
+            f"\n─── {name}: {fixture['rounds']} раундов, {fixture['frames']} кадров, "
+            f"{fixture['wall_ms'] / 1000:.2f}s ───"
         )
+        print(f"  {'всего':<18}{fixture['wall_per_frame_ms']:8.3f} ms/кадр")
+        for stage, value in fixture["stages"].items():
+            print(f"  {stage:<18}{value['per_frame_ms']:8.3f} ms/кадр")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарк рендера боёв по стадиям")
+    parser.add_argument("--fixtures", nargs="*", choices=[f.name for f in FIXTURES])
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--no-warmup", action="store_true")
+    parser.add_argument("--encoder-threads", type=int, default=None)
+    parser.add_argument("--output", type=Path, help="куда записать JSON отчёт")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--profile", type=Path, help="записать cProfile в .pstats")
+    args = parser.parse_args(argv)
+
+    fixtures = tuple(
+        f for f in FIXTURES if not args.fixtures or f.name in args.fixtures
+    )
+
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler:
+        profiler.enable()
+
+    report = run_benchmark(
+        fixtures,
+        repeats=args.repeats,
+        warmup=not args.no_warmup,
+        encoder_threads=args.encoder_threads,
+    )
+
+    if profiler:
+        profiler.disable()
+        profiler.dump_stats(str(args.profile))
+
+    print_report(report)
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, ensure_ascii=False, indent=2))
+
+    if args.update_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(report, ensure_ascii=False, indent=2))
+        print(f"\nЭталон обновлён: {args.baseline}")
+        return 0
+
+    if not args.baseline.is_file():
+        print(f"\nЭталона нет ({args.baseline}), сравнение пропущено")
+        return 0
+
+    regressions = compare_reports(
+        report, json.loads(args.baseline.read_text()), threshold=args.threshold
+    )
+    if regressions:
+        print("\n─── Регрессии ────────────────────────────")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
 
-    print("\n─── Статистика ───────────────────────────")
-    print(f"  Мин:      {min(times):.2f}s")
-    print(f"  Макс:     {max(times):.2f}s")
-    print(f"  Среднее:  {statistics.mean(times):.2f}s")
-    print(f"  Медиана:  {statistics.median(times):.2f}s")
-    print(f"  Σ всего:  {sum(times):.2f}s")
-    print("──────────────────────────────────────────")
+    print("\nРегрессий нет")
+    return 0
 
 
 if __name__ == "__main__":
-    run()
+    sys.exit(main())
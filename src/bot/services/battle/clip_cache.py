@@ -0,0 +1,189 @@
+import hashlib
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+from src.bot.services.battle.compositor import PremultipliedSprite
+
+logger = logging.getLogger(__name__)
+
+CLIP_CACHE_DIR = Path("src/assets/cache/battle_clips")
+CLIP_MANIFEST = CLIP_CACHE_DIR / "manifest.json"
+
+# Поднимать при изменении формата или способа декодирования кадров
+CLIP_CACHE_VERSION = 1
+
+# Откуда альфа: чёрный фон, вырезанный порогом при декодировании,
+# или маска rembg из офлайн-сборки (alpha_matting)
+ALPHA_KEYED = "keyed"
+ALPHA_MATTED = "matted"
+
+# Колонки индекса: смещение в буфере, h, w обрезанного кадра,
+# offset_x, offset_y и width, height исходного кадра
+_INDEX_COLUMNS = 7
+
+# Суффиксы файлов клипа: индекс проверяется первым — он длиннее
+_CACHE_SUFFIXES = (".idx.npy", ".npy")
+
+
+# ==========================================================
+# Скомпилированные клипы на диске
+# ==========================================================
+# Клип хранится как один непрерывный uint8 буфер (все кадры подряд,
+# premultiplied, уже обрезанные) + таблица индекса. Буфер открывается
+# через mmap — кадры становятся view без копирования, и процессы
+# render farm делят одни и те же страницы page cache.
+
+
+def clip_cache_key(
+    source: str | Path, target_height: int, alpha: str = ALPHA_KEYED
+) -> str:
+    stat = Path(source).stat()
+    raw = "|".join(
+        (
+            str(Path(source).resolve()),
+            str(stat.st_mtime_ns),
+            str(stat.st_size),
+            str(target_height),
+            str(CLIP_CACHE_VERSION),
+            alpha,
+        )
+    )
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def _cache_paths(
+    source: str | Path, target_height: int, cache_dir: Path, alpha: str
+) -> tuple[Path, Path]:
+    name = f"{Path(source).stem}_{clip_cache_key(source, target_height, alpha)}"
+    return cache_dir / f"{name}.npy", cache_dir / f"{name}.idx.npy"
+
+
+def clip_cache_path(
+    source: str | Path,
+    target_height: int,
+    cache_dir: Path = CLIP_CACHE_DIR,
+    alpha: str = ALPHA_KEYED,
+) -> Path:
+    return _cache_paths(source, target_height, cache_dir, alpha)[0]
+
+
+def clip_cache_ready(
+    source: str | Path,
+    target_height: int,
+    cache_dir: Path = CLIP_CACHE_DIR,
+    alpha: str = ALPHA_KEYED,
+) -> bool:
+    """Клип скомпилирован целиком: индекс пишется последним."""
+    data_path, index_path = _cache_paths(source, target_height, cache_dir, alpha)
+    return data_path.is_file() and index_path.is_file()
+
+
+def _clip_name(path: Path) -> str:
+    """Имя клипа без суффикса буфера или индекса (в stem бывают точки)."""
+    name = Path(path).name
+    for suffix in _CACHE_SUFFIXES:
+        if name.endswith(suffix):
+            return name[: -len(suffix)]
+    return name
+
+
+def _save_atomic(path: Path, array: np.ndarray) -> None:
+    # Один клип могут компилировать несколько воркеров фермы сразу —
+    # у каждого свой временный файл, os.replace выигрывает последний
+    file = tempfile.NamedTemporaryFile(
+        dir=path.parent, prefix=path.name + ".", suffix=".tmp", delete=False
+    )
+    try:
+        with file:
+            np.save(file, array)
+        os.replace(file.name, path)
+    except BaseException:
+        Path(file.name).unlink(missing_ok=True)
+        raise
+
+
+def write_clip_cache(
+    source: str | Path,
+    target_height: int,
+    frames: List[PremultipliedSprite],
+    cache_dir: Path = CLIP_CACHE_DIR,
+    alpha: str = ALPHA_KEYED,
+) -> Path:
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    data_path, index_path = _cache_paths(source, target_height, cache_dir, alpha)
+
+    index = np.zeros((len(frames), _INDEX_COLUMNS), dtype=np.int64)
+    offset = 0
+    for i, frame in enumerate(frames):
+        h, w = frame.pixels.shape[:2]
+        index[i] = (
+            offset,
+            h,
+            w,
+            frame.offset_x,
+            frame.offset_y,
+            frame.width,
+            frame.height,
+        )
+        offset += frame.pixels.size
+
+    buffer = np.empty(offset, dtype=np.uint8)
+    for frame, row in zip(frames, index):
+        buffer[row[0] : row[0] + frame.pixels.size] = frame.pixels.reshape(-1)
+
+    # Индекс пишется последним — его наличие значит что буфер целый
+    _save_atomic(data_path, buffer)
+    _save_atomic(index_path, index)
+
+    logger.debug(f"Compiled {len(frames)} frames of {source} into {data_path}")
+    return data_path
+
+
+def load_clip_cache(
+    source: str | Path,
+    target_height: int,
+    cache_dir: Path = CLIP_CACHE_DIR,
+    alpha: str = ALPHA_KEYED,
+) -> Optional[List[PremultipliedSprite]]:
+    try:
+        data_path, index_path = _cache_paths(source, target_height, cache_dir, alpha)
+    except FileNotFoundError:
+        return None
+
+    if not index_path.is_file() or not data_path.is_file():
+        return None
+
+    try:
+        index = np.load(index_path)
+        buffer = np.load(data_path, mmap_mode="r")
+    except (OSError, ValueError) as e:
+        logger.warning(f"Broken clip cache for {source}: {e}")
+        return None
+
+    frames: List[PremultipliedSprite] = []
+    for offset, h, w, offset_x, offset_y, width, height in index.tolist():
+        pixels = buffer[offset : offset + h * w * 4].reshape(h, w, 4)
+        frames.append(
+            PremultipliedSprite(pixels, width, height, offset_x, offset_y)
+        )
+
+    logger.debug(f"Mapped {len(frames)} cached frames for {source}")
+    return frames
+
+
+def prune_clip_cache(
+    keep: Iterable[Path], cache_dir: Path = CLIP_CACHE_DIR
+) -> None:
+    """Удаляет скомпилированные клипы, которых нет в keep (устаревшие mtime)."""
+    if not cache_dir.is_dir():
+        return
+
+    keep_names = {_clip_name(p) for p in keep}
+    for path in cache_dir.glob("*.npy"):
+        if _clip_name(path) not in keep_names:
+            path.unlink(missing_ok=True)
@@ -0,0 +1,213 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.bot.services.battle.animation_loader import (
+    clip_frame_count,
+    get_animation_path,
+)
+from src.bot.services.battle.models import TimelineEvent
+
+FPS = 24
+
+# Длительности по умолчанию для служебных элементов таймлайна
+ITEM_DURATIONS = {
+    "intro": 2.5,
+    "pause": 0.8,
+    "outro": 3.0,
+}
+
+# Длительность боевого события зависит только от его типа
+EVENT_DURATIONS = {
+    "hit": 1.0,
+    "miss": 0.8,
+    "block": 1.0,
+    "crit": 2.0,
+    "regen": 2.0,
+}
+
+# Затухание подписи атаки: 1.0 в начале события, 0 к 5/6 его длины
+OVERLAY_FADE_SPEED = 1.2
+
+NO_CLIP = -1
+
+
+def item_frame_count(item: TimelineEvent) -> int:
+    """Точное число кадров, которое даст элемент таймлайна."""
+    if item.type in ITEM_DURATIONS:
+        return int((item.duration or ITEM_DURATIONS[item.type]) * FPS)
+    return int(EVENT_DURATIONS[item.data.battle_event.type] * FPS)
+
+
+def timeline_frame_count(timeline: List[TimelineEvent]) -> int:
+    return sum(item_frame_count(item) for item in timeline)
+
+
+def overlay_alpha(progress):
+    """Прозрачность подписи атаки — скаляр или массив прогресса."""
+    return np.maximum(0.0, 1.0 - progress * OVERLAY_FADE_SPEED)
+
+
+# ==========================================================
+# Таймлайн → плоские массивы на кадр
+# ==========================================================
+# Всё, что раньше пересчитывалось в цикле по кадрам (прогресс, HP,
+# индекс кадра клипа, альфа подписи), считается один раз numpy на
+# весь таймлайн. Рендер кадра i просто читает i-й элемент массивов.
+# Формулы те же, что были в генераторе, в float64 — значения совпадают.
+
+
+@dataclass
+class CompiledTimeline:
+    timeline: List[TimelineEvent]
+    # Номер первого кадра каждого элемента, длина len(timeline) + 1
+    item_start: np.ndarray
+
+    item: np.ndarray  # кадр → индекс элемента таймлайна
+    progress: np.ndarray  # 0.0–1.0 внутри элемента
+    left_hp: np.ndarray
+    right_hp: np.ndarray
+
+    clips: List[str]  # id клипа → путь к webm
+    left_clip: np.ndarray  # id клипа или NO_CLIP
+    right_clip: np.ndarray
+    left_clip_frame: np.ndarray
+    right_clip_frame: np.ndarray
+
+    overlay_alpha: np.ndarray
+
+    @property
+    def total_frames(self) -> int:
+        return int(self.item.size)
+
+    def item_frames(self, index: int) -> range:
+        return range(int(self.item_start[index]), int(self.item_start[index + 1]))
+
+    def clip_path(self, clip_id: int) -> Optional[str]:
+        return None if clip_id == NO_CLIP else self.clips[clip_id]
+
+
+class _ClipTable:
+    def __init__(self) -> None:
+        self.paths: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._lengths: List[int] = []
+
+    def ref(self, path: Optional[str]) -> int:
+        if path is None:
+            return NO_CLIP
+        if path not in self._ids:
+            length = clip_frame_count(path)
+            if not length:
+                return NO_CLIP
+            self._ids[path] = len(self.paths)
+            self.paths.append(path)
+            self._lengths.append(length)
+        return self._ids[path]
+
+    def frame_index(self, clip_id: int, progress: np.ndarray) -> np.ndarray:
+        """Та же выборка, что в get_clip_frame."""
+        if clip_id == NO_CLIP:
+            return np.full(progress.size, -1, dtype=np.int32)
+        last = self._lengths[clip_id] - 1
+        index = np.trunc(np.clip(progress, 0.0, 1.0) * last).astype(np.int32)
+        return np.minimum(index, last)
+
+
+def _item_clips(item: TimelineEvent) -> tuple[Optional[str], Optional[str]]:
+    """Пути клипов левого и правого бойца для элемента."""
+    data = item.data
+
+    if item.type == "pause":
+        return (
+            get_animation_path(
+                "idle", data.left.name, data.left.kagune_type, role="attacker"
+            ),
+            get_animation_path(
+                "idle", data.right.name, data.right.kagune_type, role="defender"
+            ),
+        )
+
+    if item.type in ITEM_DURATIONS:
+        return None, None
+
+    event_type = data.battle_event.type
+    attacker_left = data.attacker_left or False
+    attacker = data.left if attacker_left else data.right
+    defender = data.right if attacker_left else data.left
+
+    attacker_path = get_animation_path(
+        event_type, attacker.name, attacker.kagune_type, role="attacker"
+    )
+    defender_path = get_animation_path(
+        event_type, defender.name, defender.kagune_type, role="defender"
+    )
+    if attacker_left:
+        return attacker_path, defender_path
+    return defender_path, attacker_path
+
+
+def compile_timeline(timeline: List[TimelineEvent]) -> CompiledTimeline:
+    counts = np.array([item_frame_count(item) for item in timeline], dtype=np.int64)
+    item_start = np.zeros(len(timeline) + 1, dtype=np.int64)
+    np.cumsum(counts, out=item_start[1:])
+    total = int(item_start[-1])
+
+    item_index = np.repeat(np.arange(len(timeline), dtype=np.int32), counts)
+    progress = np.empty(total, dtype=np.float64)
+    left_hp = np.empty(total, dtype=np.int32)
+    right_hp = np.empty(total, dtype=np.int32)
+    left_clip = np.full(total, NO_CLIP, dtype=np.int16)
+    right_clip = np.full(total, NO_CLIP, dtype=np.int16)
+    left_clip_frame = np.full(total, -1, dtype=np.int32)
+    right_clip_frame = np.full(total, -1, dtype=np.int32)
+    alpha = np.zeros(total, dtype=np.float64)
+
+    clips = _ClipTable()
+
+    for index, item in enumerate(timeline):
+        start, stop = int(item_start[index]), int(item_start[index + 1])
+        if stop == start:
+            continue
+
+        data = item.data
+        local = np.arange(stop - start, dtype=np.float64) / (stop - start)
+        progress[start:stop] = local
+
+        if item.type in ITEM_DURATIONS:
+            # Вне событий HP не двигается
+            left_hp[start:stop] = data.left_hp_before
+            right_hp[start:stop] = data.right_hp_before
+        else:
+            left_hp[start:stop] = np.trunc(
+                data.left_hp_before
+                + (data.left_hp_after - data.left_hp_before) * local
+            )
+            right_hp[start:stop] = np.trunc(
+                data.right_hp_before
+                + (data.right_hp_after - data.right_hp_before) * local
+            )
+            alpha[start:stop] = overlay_alpha(local)
+
+        left_path, right_path = _item_clips(item)
+        left_id, right_id = clips.ref(left_path), clips.ref(right_path)
+        left_clip[start:stop] = left_id
+        right_clip[start:stop] = right_id
+        left_clip_frame[start:stop] = clips.frame_index(left_id, local)
+        right_clip_frame[start:stop] = clips.frame_index(right_id, local)
+
+    return CompiledTimeline(
+        timeline=timeline,
+        item_start=item_start,
+        item=item_index,
+        progress=progress,
+        left_hp=left_hp,
+        right_hp=right_hp,
+        clips=clips.paths,
+        left_clip=left_clip,
+        right_clip=right_clip,
+        left_clip_frame=left_clip_frame,
+        right_clip_frame=right_clip_frame,
+        overlay_alpha=alpha,
+    )
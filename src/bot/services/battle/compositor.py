@@ -0,0 +1,103 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+# ==========================================================
+# Композитинг на numpy с premultiplied alpha
+# ==========================================================
+# Канвас — uint8 (H, W, 3), спрайты — uint8 (h, w, 4) где RGB уже
+# умножены на альфу. Бленд: dst = src + dst * (255 - a) / 255,
+# промежуточные значения в uint16, запись в канвас на месте.
+
+
+@dataclass(frozen=True)
+class PremultipliedSprite:
+    """
+    Спрайт, обрезанный до непрозрачной области.
+    width/height — размер исходного кадра (нужен для позиционирования),
+    offset_x/offset_y — где обрезанная область лежит внутри него.
+    """
+
+    pixels: np.ndarray
+    width: int
+    height: int
+    offset_x: int = 0
+    offset_y: int = 0
+
+    @property
+    def nbytes(self) -> int:
+        return self.pixels.nbytes
+
+    def flipped(self) -> "PremultipliedSprite":
+        """Зеркальная копия — view без копирования пикселей."""
+        return PremultipliedSprite(
+            pixels=self.pixels[:, ::-1],
+            width=self.width,
+            height=self.height,
+            offset_x=self.width - self.offset_x - self.pixels.shape[1],
+            offset_y=self.offset_y,
+        )
+
+
+def premultiply(rgba: np.ndarray, crop: bool = True) -> PremultipliedSprite:
+    """RGBA uint8 → PremultipliedSprite. Полностью прозрачные поля срезаются."""
+    height, width = rgba.shape[:2]
+    offset_x = offset_y = 0
+
+    if crop:
+        alpha = rgba[:, :, 3]
+        rows = np.flatnonzero(alpha.any(axis=1))
+        if rows.size == 0:
+            return PremultipliedSprite(
+                np.zeros((0, 0, 4), dtype=np.uint8), width, height
+            )
+        cols = np.flatnonzero(alpha.any(axis=0))
+        offset_y, offset_x = int(rows[0]), int(cols[0])
+        rgba = rgba[offset_y : rows[-1] + 1, offset_x : cols[-1] + 1]
+
+    alpha16 = rgba[:, :, 3:4].astype(np.uint16)
+    pixels = np.empty(rgba.shape, dtype=np.uint8)
+    pixels[:, :, :3] = (rgba[:, :, :3] * alpha16 + 127) // 255
+    pixels[:, :, 3] = rgba[:, :, 3]
+    pixels.setflags(write=False)
+
+    return PremultipliedSprite(pixels, width, height, offset_x, offset_y)
+
+
+def blit(canvas: np.ndarray, sprite: PremultipliedSprite, x: int, y: int) -> None:
+    """
+    Накладывает спрайт так, что левый верхний угол его исходного кадра
+    оказывается в (x, y). Части за пределами канваса отбрасываются.
+    """
+    sx = x + sprite.offset_x
+    sy = y + sprite.offset_y
+    sh, sw = sprite.pixels.shape[:2]
+    ch, cw = canvas.shape[:2]
+
+    x0, y0 = max(sx, 0), max(sy, 0)
+    x1, y1 = min(sx + sw, cw), min(sy + sh, ch)
+    if x1 <= x0 or y1 <= y0:
+        return
+
+    src = sprite.pixels[y0 - sy : y1 - sy, x0 - sx : x1 - sx]
+    region = canvas[y0:y1, x0:x1]
+
+    inverse_alpha = 255 - src[:, :, 3:4].astype(np.uint16)
+    region[:] = (region * inverse_alpha + 127) // 255 + src[:, :, :3]
+
+
+def blit_anchored(
+    canvas: np.ndarray,
+    sprite: PremultipliedSprite,
+    cx: int,
+    ground_y: int,
+    offset_x: int = 0,
+    offset_y: int = 0,
+) -> None:
+    """Ставит спрайт нижним центром (ногами) в точку (cx, ground_y)."""
+    blit(
+        canvas,
+        sprite,
+        cx - sprite.width // 2 + offset_x,
+        ground_y - sprite.height + offset_y,
+    )
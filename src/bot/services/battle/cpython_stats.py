@@ -1,6 +1,14 @@
+import argparse
 import pstats
 
+# Читает профиль, записанный `benchmark.py --profile output.pstats`
+parser = argparse.ArgumentParser(description="Топ функций из cProfile")
+parser.add_argument("path", nargs="?", default="output.pstats")
+parser.add_argument("--sort", default="cumulative", help="cumulative или tottime")
+parser.add_argument("--limit", type=int, default=20)
+args = parser.parse_args()
+
 # Загрузка данных
-stats = pstats.Stats("output.pstats")
+stats = pstats.Stats(args.path)
 # Сортировка по общему времени (tottime) или накопленному времени (cumulative)
-stats.sort_stats("cumulative").print_stats(20)  # 20 - количество строк
+stats.sort_stats(args.sort).print_stats(args.limit)
@@ -0,0 +1,131 @@
+import asyncio
+import logging
+from typing import List, Optional
+
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import BufferedInputFile, InputMediaVideo, Message
+
+from src.bot.services.battle.battle_log import format_battle_log
+from src.bot.services.battle.generator import BattleVideoGenerator
+from src.bot.services.battle.mechanics import BattleResult
+from src.bot.services.battle.models import BattleFighter, TimelineEvent
+from src.bot.services.battle.result_card import render_result_card
+from src.bot.services.battle.timeline import select_highlights
+from src.bot.services.battle.video_cache import BattleVideoCache
+from src.bot.services.battle.win_table import WinProbabilityTable
+from src.bot.services.scheduler import DelayedActionScheduler
+
+logger = logging.getLogger(__name__)
+
+
+# ==========================================================
+# Отправка результата боя
+# ==========================================================
+# Сначала — карточка итога: она рисуется за миллисекунды, и игрок
+# видит исход сразу. Видео рендерится (или берётся из кеша) в фоне
+# через DelayedActionScheduler и подменяет карточку в том же
+# сообщении через edit_media: хендлер возвращается сразу после
+# карточки и не держит сессию БД на время рендера. Если рендер или
+# редактирование упали, карточка остаётся ответом.
+# Если есть таблица шансов, в подпись добавляется шанс победы до боя.
+# В режиме хайлайтов видео рендерится по select_highlights, а полный
+# лог боя уходит текстом сразу после карточки.
+
+
+class BattleDeliveryService:
+    def __init__(
+        self,
+        generator: BattleVideoGenerator,
+        video_cache: BattleVideoCache,
+        scheduler: DelayedActionScheduler,
+        win_table: Optional[WinProbabilityTable] = None,
+    ):
+        self.generator = generator
+        self.video_cache = video_cache
+        self.scheduler = scheduler
+        self.win_table = win_table
+
+    def win_chance_line(self, left: BattleFighter, right: BattleFighter) -> str:
+        """Строка с шансами бойцов по таблице; пустая, если таблицы нет."""
+        if self.win_table is None:
+            return ""
+        try:
+            chance = self.win_table.probability(left, right)
+        except ValueError:
+            # Кагуне, которого нет в таблице
+            return ""
+        return (
+            f"Шансы до боя: {left.name} {chance:.0%} — "
+            f"{right.name} {1 - chance:.0%}"
+        )
+
+    async def send(
+        self,
+        message: Message,
+        result: BattleResult,
+        left: BattleFighter,
+        right: BattleFighter,
+        timeline: List[TimelineEvent],
+        caption: Optional[str] = None,
+        highlights: bool = False,
+    ) -> Message:
+        """
+        Отправляет карточку итога и планирует подмену её видео.
+        Возвращает сообщение с карточкой, не дожидаясь рендера.
+        """
+        chance = self.win_chance_line(left, right)
+        if chance:
+            caption = f"{caption}\n\n{chance}" if caption else chance
+
+        # Бойцы из таймлайна — у них выбраны те же спрайты, что в видео
+        outro = timeline[-1].data
+        card = await asyncio.to_thread(
+            render_result_card, result, outro.left, outro.right
+        )
+        sent = await message.answer_photo(
+            photo=BufferedInputFile(file=card, filename="battle.png"),
+            caption=caption,
+        )
+
+        video_timeline = timeline
+        if highlights:
+            video_timeline = select_highlights(timeline)
+            try:
+                await message.answer(format_battle_log(timeline))
+            except TelegramBadRequest as e:
+                logger.warning(f"Could not send battle log: {e}")
+
+        self.scheduler.schedule(
+            0,
+            lambda: self._swap_in_video(sent, video_timeline, caption),
+            name="battle_video",
+        )
+        return sent
+
+    async def _swap_in_video(
+        self,
+        sent: Message,
+        timeline: List[TimelineEvent],
+        caption: Optional[str],
+    ) -> Optional[Message]:
+        try:
+            video = await self.video_cache.get_or_render(
+                timeline, self.generator.generate_timeline_async
+            )
+        except Exception as e:
+            logger.error(f"Battle video render failed, keeping result card: {e}")
+            return None
+
+        try:
+            edited = await sent.edit_media(
+                media=InputMediaVideo(media=video.media, caption=caption)
+            )
+        except TelegramBadRequest as e:
+            logger.warning(f"Could not replace result card with video: {e}")
+            return None
+
+        if not isinstance(edited, Message):
+            return None
+        if edited.video and not video.file_id:
+            self.video_cache.set_file_id(video.key, edited.video.file_id)
+        return edited
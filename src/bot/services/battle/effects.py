@@ -1,11 +1,116 @@
+from functools import lru_cache
 from typing import Tuple
 
 import numpy as np
-from PIL import Image, ImageDraw
 
-
-def _add_arrays(base: np.ndarray, overlay: np.ndarray) -> np.ndarray:
-    return np.clip(base.astype(int) + overlay.astype(int), 0, 255).astype(np.uint8)
+# Радиусы округляются вверх до кратного — на весь бой нужно лишь
+# несколько десятков масок вместо маски на каждый кадр
+RADIUS_BUCKET = 2
+
+TURN_ARROW_SIZE = 40
+
+
+# ==========================================================
+# Аддитивные вспышки по маскам
+# ==========================================================
+# Формы (круг, ромб, стрелка) — маски uint8, посчитанные один раз
+# на корзину радиуса. Эффект трогает только свой bounding box:
+# цвет * маска * интенсивность прибавляется к срезу кадра в uint16
+# с насыщением на 255 — без оверлея во весь кадр и перехода в int64.
+# render_* рисуют прямо в переданный кадр и возвращают его же: нужен
+# исходный кадр — передайте копию (или свой рабочий буфер).
+# Интенсивность теперь действительно гасит вспышку: прежний PIL
+# отбрасывал альфу заливки на RGB-оверлее, и вспышка прибавлялась
+# полным цветом, пока эффект не кончался.
+
+
+def _bucket(radius: int) -> int:
+    return -(-max(radius, 0) // RADIUS_BUCKET) * RADIUS_BUCKET
+
+
+@lru_cache(maxsize=256)
+def _disk_mask(radius: int) -> np.ndarray:
+    """Круг радиуса radius в квадрате (2r+1, 2r+1)."""
+    d = np.arange(-radius, radius + 1)
+    mask = np.where(d[:, None] ** 2 + d[None, :] ** 2 <= radius * radius, 255, 0)
+    mask = mask.astype(np.uint8)
+    mask.setflags(write=False)
+    return mask
+
+
+@lru_cache(maxsize=256)
+def _diamond_mask(radius: int) -> np.ndarray:
+    """Ромб |dx| + |dy| <= radius."""
+    d = np.abs(np.arange(-radius, radius + 1))
+    mask = np.where(d[:, None] + d[None, :] <= radius, 255, 0).astype(np.uint8)
+    mask.setflags(write=False)
+    return mask
+
+
+@lru_cache(maxsize=4)
+def _arrow_mask(size: int, attacker_left: bool) -> np.ndarray:
+    """Треугольник (size + 1, 2 * size + 1) остриём к защитнику."""
+    dy = np.abs(np.arange(-size, size + 1))[:, None]
+    dx = np.arange(size + 1)[None, :]
+    # Основание у dx = 0, остриё у dx = size
+    mask = np.where(dx + dy <= size, 255, 0).astype(np.uint8)
+    if not attacker_left:
+        mask = mask[:, ::-1]
+    mask = np.ascontiguousarray(mask)
+    mask.setflags(write=False)
+    return mask
+
+
+def _add_mask(
+    frame: np.ndarray,
+    mask: np.ndarray,
+    x: int,
+    y: int,
+    color: Tuple[int, int, int],
+    intensity: float,
+) -> np.ndarray:
+    """
+    Прибавляет color * mask * intensity/255 к кадру с углом маски в
+    (x, y). Меняет frame на месте.
+    """
+    level = int(min(max(intensity, 0.0), 255.0))
+    if level == 0:
+        return frame
+
+    mh, mw = mask.shape
+    fh, fw = frame.shape[:2]
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + mw, fw), min(y + mh, fh)
+    if x1 <= x0 or y1 <= y0:
+        return frame
+
+    weight = mask[y0 - y : y1 - y, x0 - x : x1 - x].astype(np.uint16)
+    weight *= level
+    weight += 127
+    weight //= 255
+
+    ink = np.asarray(color, dtype=np.uint16)
+    add = weight[..., None] * ink
+    add += 127
+    add //= 255
+
+    region = frame[y0:y1, x0:x1]
+    add += region
+    np.minimum(add, 255, out=add)
+    region[:] = add
+    return frame
+
+
+def _add_centered(
+    frame: np.ndarray,
+    mask: np.ndarray,
+    cx: int,
+    cy: int,
+    color: Tuple[int, int, int],
+    intensity: float,
+) -> np.ndarray:
+    radius = mask.shape[0] // 2
+    return _add_mask(frame, mask, cx - radius, cy - radius, color, intensity)
 
 
 def render_hit(
@@ -20,12 +125,8 @@ def render_hit(
     """Вспышка цвета кагунэ — обычный удар."""
     progress = t / duration
     intensity = max(0.0, 1.0 - progress) * 180
-    overlay = np.zeros_like(frame)
-    img = Image.fromarray(overlay)
-    draw = ImageDraw.Draw(img)
-    r = int(radius * (0.5 + progress * 0.5))
-    draw.ellipse([cx - r, cy - r, cx + r, cy + r], fill=(*color, int(intensity)))
-    return _add_arrays(frame, np.array(img))
+    r = _bucket(int(radius * (0.5 + progress * 0.5)))
+    return _add_centered(frame, _disk_mask(r), cx, cy, color, intensity)
 
 
 def render_miss(
@@ -50,18 +151,8 @@ def render_block(
     """Угловатая вспышка — блок."""
     progress = t / duration
     intensity = max(0.0, 1.0 - progress) * 150
-    overlay = np.zeros_like(frame)
-    img = Image.fromarray(overlay)
-    draw = ImageDraw.Draw(img)
-    size = int(70 * (0.5 + progress * 0.5))
-    points = [
-        (cx, cy - size),
-        (cx + size, cy),
-        (cx, cy + size),
-        (cx - size, cy),
-    ]
-    draw.polygon(points, fill=(*color, int(intensity)))
-    return _add_arrays(frame, np.array(img))
+    size = _bucket(int(70 * (0.5 + progress * 0.5)))
+    return _add_centered(frame, _diamond_mask(size), cx, cy, color, intensity)
 
 
 def render_crit(
@@ -76,18 +167,13 @@ def render_crit(
     progress = t / duration
     wave1 = max(0.0, 1.0 - progress * 2) * 200
     wave2 = max(0.0, 1.0 - max(0.0, progress - 0.4) * 2) * 160
-    overlay = np.zeros_like(frame)
-    img = Image.fromarray(overlay)
-    draw = ImageDraw.Draw(img)
     if wave1 > 0:
-        r = int(100 * progress * 2)
-        draw.ellipse([cx - r, cy - r, cx + r, cy + r], fill=(*color, int(wave1)))
+        r = _bucket(int(100 * progress * 2))
+        _add_centered(frame, _disk_mask(r), cx, cy, color, wave1)
     if wave2 > 0:
-        r2 = int(60 * max(0.0, progress - 0.4) * 2)
-        draw.ellipse(
-            [cx - r2, cy - r2, cx + r2, cy + r2], fill=(255, 255, 255, int(wave2))
-        )
-    return _add_arrays(frame, np.array(img))
+        r2 = _bucket(int(60 * max(0.0, progress - 0.4) * 2))
+        _add_centered(frame, _disk_mask(r2), cx, cy, (255, 255, 255), wave2)
+    return frame
 
 
 def render_regen(
@@ -101,12 +187,8 @@ def render_regen(
     progress = t / duration
     pulse = abs(np.sin(progress * np.pi * 3))
     intensity = int(pulse * 160)
-    overlay = np.zeros_like(frame)
-    img = Image.fromarray(overlay)
-    draw = ImageDraw.Draw(img)
-    r = int(50 + pulse * 40)
-    draw.ellipse([cx - r, cy - r, cx + r, cy + r], fill=(50, 220, 80, intensity))
-    return _add_arrays(frame, np.array(img))
+    r = _bucket(int(50 + pulse * 40))
+    return _add_centered(frame, _disk_mask(r), cx, cy, (50, 220, 80), intensity)
 
 
 def render_turn_arrow(
@@ -119,28 +201,10 @@ def render_turn_arrow(
     pulse = abs(np.sin(progress * np.pi * 4))
     intensity = int(150 + pulse * 100)
 
-    overlay = np.zeros_like(frame)
-    img = Image.fromarray(overlay)
-    draw = ImageDraw.Draw(img)
-
     y = frame.shape[0] // 2
-    size = 40
-
-    if attacker_left:
-        # стрелка слева направо →
-        points = [
-            (frame.shape[1] // 4 + size, y),
-            (frame.shape[1] // 4, y - size),
-            (frame.shape[1] // 4, y + size),
-        ]
-    else:
-        # стрелка справа налево ←
-        x = frame.shape[1] * 3 // 4
-        points = [
-            (x - size, y),
-            (x, y - size),
-            (x, y + size),
-        ]
-
-    draw.polygon(points, fill=(255, 255, 255, intensity))
-    return _add_arrays(frame, np.array(img))
+    size = TURN_ARROW_SIZE
+    # Основание стрелки на четверти ширины со стороны атакующего
+    x = frame.shape[1] // 4 if attacker_left else frame.shape[1] * 3 // 4 - size
+
+    mask = _arrow_mask(size, attacker_left)
+    return _add_mask(frame, mask, x, y - size, (255, 255, 255), intensity)
@@ -0,0 +1,154 @@
+import logging
+import queue
+import threading
+from pathlib import Path
+from typing import Any, Callable, Iterable, Optional
+
+import av
+import numpy as np
+
+from src.bot.services.battle.stage_timer import stage
+
+logger = logging.getLogger(__name__)
+
+# Кадров в каждой очереди между стадиями — ограничивает память,
+# если рендер обгоняет x264 (360x360 rgb24 ≈ 380 КБ на кадр)
+FRAME_QUEUE_SIZE = 16
+
+# 0 — libx264 сам выбирает число потоков по ядрам
+ENCODER_THREADS = 0
+
+X264_OPTIONS = {"preset": "fast", "crf": "28", "tune": "animation"}
+
+_END = object()
+
+
+# ==========================================================
+# Конвейер рендер → yuv420p → x264
+# ==========================================================
+# Три стадии в разных потоках, связанные ограниченными очередями:
+#   рендер (вызывающий поток) → конвертация RGB→yuv420p → энкод и mux.
+# swscale и libx264 отпускают GIL, поэтому конвертация и энкод идут
+# параллельно с рендером следующих кадров.
+
+
+class _Pipeline:
+    def __init__(self):
+        self.stop = threading.Event()
+        self.error: Optional[BaseException] = None
+
+    def fail(self, error: BaseException) -> None:
+        if self.error is None:
+            self.error = error
+        self.stop.set()
+
+    def put(self, q: queue.Queue, item: Any) -> bool:
+        """Кладёт в очередь, пока конвейер жив. False — кто-то упал."""
+        while not self.stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(self, q: queue.Queue) -> Any:
+        while not self.stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _END
+
+    def spawn(
+        self,
+        name: str,
+        source: queue.Queue,
+        handle: Callable[[Any], None],
+        finish: Callable[[], None],
+    ) -> threading.Thread:
+        def run() -> None:
+            try:
+                while True:
+                    item = self.get(source)
+                    if item is _END:
+                        break
+                    handle(item)
+                if not self.stop.is_set():
+                    finish()
+            except BaseException as e:
+                logger.error(f"Battle encode stage '{name}' failed: {e}")
+                self.fail(e)
+
+        thread = threading.Thread(target=run, name=f"battle-{name}", daemon=True)
+        thread.start()
+        return thread
+
+
+def encode_frames(
+    frames: Iterable[np.ndarray],
+    output_path: str | Path,
+    width: int,
+    height: int,
+    fps: int,
+    encoder_threads: int = ENCODER_THREADS,
+    queue_size: int = FRAME_QUEUE_SIZE,
+) -> int:
+    """
+    Кодирует поток rgb24-кадров в H.264 MP4. Возвращает число кадров.
+    Итератор frames выполняется в вызывающем потоке.
+    """
+    container = av.open(str(output_path), mode="w")
+    stream = container.add_stream("libx264", rate=fps)
+    stream.width = width
+    stream.height = height
+    stream.pix_fmt = "yuv420p"
+    stream.options = dict(X264_OPTIONS)
+    stream.codec_context.thread_count = encoder_threads
+
+    pipeline = _Pipeline()
+    rgb_frames: queue.Queue = queue.Queue(maxsize=queue_size)
+    yuv_frames: queue.Queue = queue.Queue(maxsize=queue_size)
+
+    def convert(frame: np.ndarray) -> None:
+        with stage("colorspace"):
+            video_frame = av.VideoFrame.from_ndarray(frame, format="rgb24")
+            video_frame = video_frame.reformat(format="yuv420p")
+        pipeline.put(yuv_frames, video_frame)
+
+    def encode(video_frame: Optional[av.VideoFrame]) -> None:
+        with stage("encode"):
+            packets = stream.encode(video_frame)
+        with stage("mux"):
+            for packet in packets:
+                container.mux(packet)
+
+    def flush() -> None:
+        encode(None)
+
+    stages = [
+        pipeline.spawn(
+            "colorspace", rgb_frames, convert, lambda: pipeline.put(yuv_frames, _END)
+        ),
+        pipeline.spawn("encode", yuv_frames, encode, flush),
+    ]
+
+    count = 0
+    try:
+        for frame in frames:
+            if not pipeline.put(rgb_frames, frame):
+                break
+            count += 1
+        pipeline.put(rgb_frames, _END)
+    except BaseException as e:
+        pipeline.fail(e)
+        raise
+    finally:
+        for thread in stages:
+            thread.join()
+        container.close()
+
+    if pipeline.error is not None:
+        raise pipeline.error
+
+    return count
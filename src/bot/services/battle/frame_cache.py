@@ -0,0 +1,121 @@
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Generic, Hashable, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+V = TypeVar("V")
+
+
+@dataclass
+class FrameCacheStats:
+    name: str
+    hits: int
+    misses: int
+    evictions: int
+    entries: int
+    bytes: int
+    max_bytes: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class ByteBudgetCache(Generic[V]):
+    """
+    LRU кеш, ограниченный суммарным размером значений в байтах, а не
+    количеством записей. Потокобезопасен — рендер идёт и из to_thread.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_bytes: int,
+        sizeof: Callable[[V], int],
+    ):
+        self.name = name
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._entries: OrderedDict[Hashable, tuple[V, int]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key: Hashable) -> Optional[V]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: V) -> None:
+        size = self._sizeof(value)
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+
+            if size > self.max_bytes:
+                logger.warning(
+                    f"[{self.name}] entry {key} ({size} bytes) exceeds budget, not cached"
+                )
+                return
+
+            self._entries[key] = (value, size)
+            self._bytes += size
+            self._evict_locked()
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], V]) -> V:
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        # Загрузка вне лока — декодирование долгое, остальные ключи не ждут
+        value = loader()
+        self.put(key, value)
+        return value
+
+    def resize(self, max_bytes: int) -> None:
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict_locked()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _evict_locked(self) -> None:
+        while self._bytes > self.max_bytes and self._entries:
+            key, (_, size) = self._entries.popitem(last=False)
+            self._bytes -= size
+            self._evictions += 1
+            logger.debug(f"[{self.name}] evicted {key} ({size} bytes)")
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    @property
+    def stats(self) -> FrameCacheStats:
+        with self._lock:
+            return FrameCacheStats(
+                name=self.name,
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                entries=len(self._entries),
+                bytes=self._bytes,
+                max_bytes=self.max_bytes,
+            )
@@ -1,39 +1,88 @@
+import asyncio
 import logging
 from pathlib import Path
-from typing import Iterator, List
+from typing import TYPE_CHECKING, Iterator, List, Optional
 
-import av
 import numpy as np
-from PIL import Image, ImageDraw, ImageFont
 
-from src.bot.services.battle.animation_loader import (
-    get_animation_path,
-    get_clip_frame,
+from src.bot.services.battle.animation_loader import get_clip_frame_at
+from src.bot.services.battle.compiled_timeline import (
+    FPS,
+    CompiledTimeline,
+    compile_timeline,
+    timeline_frame_count,
 )
+from src.bot.services.battle.encode_pipeline import ENCODER_THREADS, encode_frames
 from src.bot.services.battle.models import TimelineEvent
 from src.bot.services.battle.renderer import (
-    BG_COLOR,
     DMG_Y,
     FONT_CYR,
     FONT_MONO,
     H,
     W,
+    blank_frame,
     draw_action_overlay,
     draw_damage_number,
     draw_event_label,
     make_base_frame,
 )
+from src.bot.services.battle.segments import SegmentedBattleRenderer
+from src.bot.services.battle.serialization import timeline_from_dict, timeline_to_dict
 from src.bot.services.battle.sprite_animator import animate_idle
-from src.bot.services.battle.sprites import get_sprite
+from src.bot.services.battle.sprites import get_sprite_rotations
+from src.bot.services.battle.stage_timer import item_scope, stage
+from src.bot.services.battle.text_raster import draw_text, load_font
+
+if TYPE_CHECKING:
+    from src.bot.services.battle.render_farm import BattleRenderFarm
 
 logger = logging.getLogger(__name__)
-FPS = 24
+
+# Поднимать при любом изменении картинки — инвалидирует кеш готовых видео
+RENDERER_VERSION = 1
+
+# В процессах render farm ядра уже заняты соседними воркерами
+WORKER_ENCODER_THREADS = 1
+
+# С этой длины (в кадрах, ~25 секунд) бой рендерится сегментами на
+# нескольких процессах farm — если в её очереди никто не ждёт
+SEGMENTED_RENDER_MIN_FRAMES = 600
+
+
+def render_timeline_payload(
+    payload: dict,
+    output_path: str,
+    encoder_threads: int = WORKER_ENCODER_THREADS,
+    left_fighter_name: str = "",
+) -> str:
+    """Рендер сериализованного таймлайна — точка входа для процессов-воркеров."""
+    generator = BattleVideoGenerator(
+        output_dir=Path(output_path).parent, encoder_threads=encoder_threads
+    )
+    path = generator.generate_timeline(
+        timeline_from_dict(payload), output_path, left_fighter_name
+    )
+    return str(path)
 
 
 class BattleVideoGenerator:
-    def __init__(self, output_dir: str | Path):
+    def __init__(
+        self,
+        output_dir: str | Path,
+        render_farm: Optional["BattleRenderFarm"] = None,
+        encoder_threads: int = ENCODER_THREADS,
+        segmented_min_frames: int = SEGMENTED_RENDER_MIN_FRAMES,
+    ):
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.render_farm = render_farm
+        self.encoder_threads = encoder_threads
+        self.segmented_min_frames = segmented_min_frames
+        self.segmented = (
+            SegmentedBattleRenderer(render_farm=render_farm)
+            if render_farm is not None
+            else None
+        )
 
     # ======================================================
     # MAIN ENTRY
@@ -47,22 +96,16 @@ class BattleVideoGenerator:
     ) -> Path:
         output_path = Path(output_path)
 
-        container = av.open(str(output_path), mode="w")
-        stream = container.add_stream("libx264", rate=FPS)
-        stream.width = W
-        stream.height = H
-        stream.pix_fmt = "yuv420p"
-        stream.options = {"preset": "fast", "crf": "28", "tune": "animation"}
-
-        for frame in self._timeline_frames(timeline):
-            video_frame = av.VideoFrame.from_ndarray(frame, format="rgb24")
-            for packet in stream.encode(video_frame):
-                container.mux(packet)
-
-        for packet in stream.encode():
-            container.mux(packet)
+        # Рендер, конвертация в yuv420p и x264 идут параллельными стадиями
+        encode_frames(
+            self._timeline_frames(timeline),
+            output_path,
+            width=W,
+            height=H,
+            fps=FPS,
+            encoder_threads=self.encoder_threads,
+        )
 
-        container.close()
         logger.info(f"Battle video saved: {output_path}")
         return output_path
 
@@ -76,107 +119,119 @@ class BattleVideoGenerator:
         output_path: str | Path,
         left_fighter_name: str = "",
     ) -> Path:
-        import asyncio
-        from concurrent.futures import ThreadPoolExecutor
-
-        loop = asyncio.get_event_loop()
-        with ThreadPoolExecutor(max_workers=1) as executor:
-            return await loop.run_in_executor(
-                executor,
-                lambda: self.generate_timeline(
+        # Рендер в пуле процессов — PIL/numpy не делят GIL с event loop
+        if self.render_farm is not None and self.render_farm.is_running:
+            if self._should_segment(timeline):
+                return await self.segmented.render_async(
                     timeline, output_path, left_fighter_name
-                ),
+                )
+            return await self.render_farm.render(
+                timeline_to_dict(timeline),
+                output_path,
+                left_fighter_name=left_fighter_name,
             )
 
+        return await asyncio.to_thread(
+            self.generate_timeline, timeline, output_path, left_fighter_name
+        )
+
+    def _should_segment(self, timeline: List[TimelineEvent]) -> bool:
+        # Под нагрузкой процессы и так заняты — дробление только добавит
+        # старты x264 и склейку, поэтому только при пустой очереди
+        return (
+            self.segmented is not None
+            and self.render_farm.workers_count > 1
+            and self.render_farm.queue_size == 0
+            and timeline_frame_count(timeline) >= self.segmented_min_frames
+        )
+
     # ======================================================
     # Timeline → frames
     # ======================================================
 
     def _timeline_frames(self, timeline: List[TimelineEvent]) -> Iterator[np.ndarray]:
-        for item in timeline:
-            if item.type == "intro":
-                yield from self._frames_intro(item)
-            elif item.type == "pause":
-                yield from self._frames_pause(item)
-            elif item.type == "outro":
-                yield from self._frames_outro(item)
-            else:
-                yield from self._frames_battle_event(item)
+        compiled = compile_timeline(timeline)
+        for index, item in enumerate(timeline):
+            frames = compiled.item_frames(index)
+            with item_scope(item.type):
+                if item.type == "intro":
+                    yield from self._frames_intro(item, compiled, frames)
+                elif item.type == "pause":
+                    yield from self._frames_pause(item, compiled, frames)
+                elif item.type == "outro":
+                    yield from self._frames_outro(item, compiled, frames)
+                else:
+                    yield from self._frames_battle_event(item, compiled, frames)
 
     # ======================================================
     # INTRO
     # ======================================================
 
-    def _frames_intro(self, item):
-        duration = item.duration or 2.5
-        total = int(duration * FPS)
+    def _frames_intro(self, item, compiled: CompiledTimeline, frames: range):
         left = item.data.left
         right = item.data.right
 
-        font_name = ImageFont.truetype(FONT_CYR, int(H * 0.1))
-        font_vs = ImageFont.truetype(FONT_MONO, int(H * 0.13))
+        font_name = load_font(FONT_CYR, int(H * 0.1))
+        font_vs = load_font(FONT_MONO, int(H * 0.13))
 
-        for i in range(total):
-            progress = i / total
+        for progress in compiled.progress[frames.start : frames.stop].tolist():
             ease = 1 - (1 - progress) ** 3
 
-            img = Image.new("RGB", (W, H), BG_COLOR)
-            draw = ImageDraw.Draw(img)
+            frame = blank_frame()
 
             center_y = H // 2
             lx = int(-W * 0.4 + (W // 4 + W * 0.4) * ease)
             rx = int(W + W * 0.4 - (W // 4 + W * 0.4) * ease)
 
-            draw.text(
-                (lx, center_y), left.name, font=font_name, fill=left.color, anchor="mm"
+            draw_text(
+                frame, (lx, center_y), left.name, font_name, left.color, anchor="mm"
             )
-            draw.text(
+            draw_text(
+                frame,
                 (rx, center_y),
                 right.name,
-                font=font_name,
-                fill=right.color,
+                font_name,
+                right.color,
                 anchor="mm",
             )
 
             if progress > 0.7:
                 alpha = (progress - 0.7) / 0.3
                 vs_color = (int(220 * alpha),) * 3
-                draw.text(
-                    (W // 2, center_y), "VS", font=font_vs, fill=vs_color, anchor="mm"
+                draw_text(
+                    frame, (W // 2, center_y), "VS", font_vs, vs_color, anchor="mm"
                 )
 
-            yield np.array(img, dtype=np.uint8)
+            yield frame
 
     # ======================================================
     # PAUSE
     # ======================================================
 
-    def _frames_pause(self, item: TimelineEvent):
-        duration = item.duration or 0.8
-        total = int(duration * FPS)
+    def _frames_pause(self, item, compiled: CompiledTimeline, frames: range):
         data = item.data
+        window = slice(frames.start, frames.stop)
 
-        left_path = get_animation_path(
-            "idle", data.left.name, data.left.kagune_type, role="attacker"
-        )
-        right_path = get_animation_path(
-            "idle", data.right.name, data.right.kagune_type, role="defender"
-        )
+        left_path = compiled.clip_path(int(compiled.left_clip[frames.start]))
+        right_path = compiled.clip_path(int(compiled.right_clip[frames.start]))
 
-        left_png = None if left_path else get_sprite(data.left, flip=False)
-        right_png = None if right_path else get_sprite(data.right, flip=True)
-
-        for i in range(total):
-            progress = i / total
+        # PNG-фолбэк: повороты покачивания берутся из общей таблицы
+        left_png = None if left_path else get_sprite_rotations(data.left, flip=False)
+        right_png = None if right_path else get_sprite_rotations(data.right, flip=True)
 
+        for progress, left_index, right_index in zip(
+            compiled.progress[window].tolist(),
+            compiled.left_clip_frame[window].tolist(),
+            compiled.right_clip_frame[window].tolist(),
+        ):
             if left_path:
-                l_spr = get_clip_frame(left_path, progress, flip=False)
+                l_spr = get_clip_frame_at(left_path, left_index, flip=False)
                 ldx = ldy = la = 0
             else:
                 l_spr, ldx, ldy, la = animate_idle(left_png, progress)
 
             if right_path:
-                r_spr = get_clip_frame(right_path, progress, flip=True)
+                r_spr = get_clip_frame_at(right_path, right_index, flip=True)
                 rdx = rdy = ra = 0
             else:
                 r_spr, rdx, rdy, ra = animate_idle(right_png, progress)
@@ -204,49 +259,36 @@ class BattleVideoGenerator:
     # BATTLE EVENT
     # ======================================================
 
-    def _frames_battle_event(self, item):
+    def _frames_battle_event(self, item, compiled: CompiledTimeline, frames: range):
         event = item.data.battle_event
         left = item.data.left
         right = item.data.right
         attacker_left = item.data.attacker_left or False
-
-        duration_map = {
-            "hit": 1.0,
-            "miss": 0.8,
-            "block": 1.0,
-            "crit": 2.0,
-            "regen": 2.0,
-        }
-        total = int(duration_map[event.type] * FPS)
-
-        attacker = left if attacker_left else right
-        defender = right if attacker_left else left
-
-        attacker_path = get_animation_path(
-            event.type, attacker.name, attacker.kagune_type, role="attacker"
-        )
-        defender_path = get_animation_path(
-            event.type, defender.name, defender.kagune_type, role="defender"
-        )
-
-        for i in range(total):
-            progress = i / total
-
-            left_hp = int(
-                item.data.left_hp_before
-                + (item.data.left_hp_after - item.data.left_hp_before) * progress
-            )
-            right_hp = int(
-                item.data.right_hp_before
-                + (item.data.right_hp_after - item.data.right_hp_before) * progress
-            )
-
-            if attacker_left:
-                left_sprite = get_clip_frame(attacker_path, progress, flip=False)
-                right_sprite = get_clip_frame(defender_path, progress, flip=True)
-            else:
-                right_sprite = get_clip_frame(attacker_path, progress, flip=True)
-                left_sprite = get_clip_frame(defender_path, progress, flip=False)
+        window = slice(frames.start, frames.stop)
+
+        left_path = compiled.clip_path(int(compiled.left_clip[frames.start]))
+        right_path = compiled.clip_path(int(compiled.right_clip[frames.start]))
+
+        for (
+            progress,
+            left_hp,
+            right_hp,
+            left_index,
+            right_index,
+            alpha,
+        ) in zip(
+            compiled.progress[window].tolist(),
+            compiled.left_hp[window].tolist(),
+            compiled.right_hp[window].tolist(),
+            compiled.left_clip_frame[window].tolist(),
+            compiled.right_clip_frame[window].tolist(),
+            compiled.overlay_alpha[window].tolist(),
+        ):
+            left_sprite = right_sprite = None
+            if left_path:
+                left_sprite = get_clip_frame_at(left_path, left_index, flip=False)
+            if right_path:
+                right_sprite = get_clip_frame_at(right_path, right_index, flip=True)
 
             base = make_base_frame(
                 left_hp=left_hp,
@@ -262,75 +304,73 @@ class BattleVideoGenerator:
                 attacker_left=attacker_left,
             )
 
-            img = Image.fromarray(base)
-            draw = ImageDraw.Draw(img)
-
-            draw_event_label(draw, event.type, progress)
-            draw_damage_number(
-                draw,
-                event.damage if event.type != "regen" else event.heal,
-                event.type,
-                progress,
-                W // 2,
-                DMG_Y,
-            )
-            draw_action_overlay(
-                draw,
-                event.type,
-                event.attacker.name,
-                event.defender.name,
-                event.attacker.color,
-                event.defender.color,
-                attacker_left,
-                progress,
-            )
+            with stage("effects"):
+                draw_event_label(base, event.type, progress)
+                draw_damage_number(
+                    base,
+                    event.damage if event.type != "regen" else event.heal,
+                    event.type,
+                    progress,
+                    W // 2,
+                    DMG_Y,
+                )
+                draw_action_overlay(
+                    base,
+                    event.type,
+                    event.attacker.name,
+                    event.defender.name,
+                    event.attacker.color,
+                    event.defender.color,
+                    attacker_left,
+                    alpha,
+                )
 
-            yield np.array(img, dtype=np.uint8)
+            yield base
 
     # ======================================================
     # OUTRO
     # ======================================================
 
-    def _frames_outro(self, item):
-        duration = item.duration or 3.0
-        total = int(duration * FPS)
+    def _frames_outro(self, item, compiled: CompiledTimeline, frames: range):
         winner = item.data.winner
         is_draw = item.data.is_draw
 
-        font_big = ImageFont.truetype(FONT_CYR, int(H * 0.117))
-        font_small = ImageFont.truetype(FONT_CYR, int(H * 0.078))
+        font_big = load_font(FONT_CYR, int(H * 0.117))
+        font_small = load_font(FONT_CYR, int(H * 0.078))
 
-        for i in range(total):
+        for i in range(len(frames)):
             t = i / FPS
-            img = Image.new("RGB", (W, H), BG_COLOR)
-            draw = ImageDraw.Draw(img)
+            frame = blank_frame()
 
             center_y = H // 2
 
             if is_draw:
-                draw.text(
+                draw_text(
+                    frame,
                     (W // 2, center_y),
                     "НИЧЬЯ",
-                    font=font_big,
-                    fill=(180, 180, 180),
+                    font_big,
+                    (180, 180, 180),
                     anchor="mm",
                 )
             else:
                 pulse = 0.7 + 0.3 * abs(np.sin(t * np.pi * 2))
                 color = tuple(int(c * pulse) for c in winner.color)
-                draw.text(
+                draw_text(
+                    frame,
                     (W // 2, center_y - int(H * 0.11)),
                     "ПОБЕДИТЕЛЬ",
-                    font=font_small,
-                    fill=(200, 200, 200),
+                    font_small,
+                    (200, 200, 200),
                     anchor="mm",
                 )
-                draw.text(
+                draw_text(
+                    frame,
                     (W // 2, center_y + int(H * 0.03)),
                     winner.name,
-                    font=font_big,
-                    fill=color,
+                    font_big,
+                    color,
                     anchor="mm",
                 )
 
-            yield np.array(img, dtype=np.uint8)
+            yield frame
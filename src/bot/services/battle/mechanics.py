@@ -34,6 +34,10 @@ class BattleMechanics:
         KaguneType.BIKAKU: 1.0,
     }
 
+    def __init__(self, rng: Optional[random.Random] = None):
+        # Свой генератор вместо модуля random — бой воспроизводим по сиду
+        self.rng = rng if rng is not None else random.Random()
+
     def _calculate_damage(
         self, attacker: BattleFighter, defender: BattleFighter, is_crit: bool
     ) -> int:
@@ -41,7 +45,7 @@ class BattleMechanics:
             attacker.strength * 0.8 + attacker.kagune_strength * 1.2
         ) * self.KAGUNE_ATK[attacker.kagune_type]
 
-        raw *= random.uniform(0.85, 1.15)
+        raw *= self.rng.uniform(0.85, 1.15)
 
         if is_crit:
             raw *= 2.0
@@ -69,7 +73,7 @@ class BattleMechanics:
         )
         crit_chance = attacker.dexterity / total_dex * 0.15
 
-        roll = random.random()
+        roll = self.rng.random()
 
         if roll < miss_chance:
             return "miss"
@@ -0,0 +1,321 @@
+from dataclasses import dataclass, field
+from itertools import product
+from typing import Dict, Optional
+
+import numpy as np
+
+from src.bot.services.battle.mechanics import (
+    MAX_ROUNDS,
+    REGEN_THRESHOLD,
+    BattleMechanics,
+)
+from src.bot.services.battle.models import BattleFighter
+from src.bot.types import KaguneType
+
+# Больше боёв за проход — больше памяти: ~100 байт на бой
+CHUNK_SIZE = 1_000_000
+
+DAMAGE_EVENTS = ("hit", "block", "crit")
+
+
+# ==========================================================
+# Пакетная симуляция боёв на numpy
+# ==========================================================
+# Те же правила, что в BattleMechanics.simulate, но для N боёв сразу:
+# HP, броски и урон — массивы, завершённые бои выкидываются из них
+# после каждого хода. Бросок события повторяет _roll_event_type
+# (вычитание шансов по очереди), урон — _calculate_damage с усечением
+# int() и минимумом 1, блок — 40% урона, реген — один раз за бой.
+
+
+@dataclass
+class BatchResult:
+    n: int
+    left_wins: int = 0
+    right_wins: int = 0
+    draws: int = 0
+    # rounds[k] — сколько боёв закончилось на k-м раунде
+    rounds: np.ndarray = field(
+        default_factory=lambda: np.zeros(MAX_ROUNDS + 1, dtype=np.int64)
+    )
+    # side -> тип события -> гистограмма урона (индекс — урон)
+    damage: Dict[str, Dict[str, np.ndarray]] = field(default_factory=dict)
+    # side -> тип события -> количество
+    events: Dict[str, Dict[str, int]] = field(default_factory=dict)
+
+    @property
+    def left_win_rate(self) -> float:
+        return self.left_wins / self.n if self.n else 0.0
+
+    @property
+    def right_win_rate(self) -> float:
+        return self.right_wins / self.n if self.n else 0.0
+
+    @property
+    def draw_rate(self) -> float:
+        return self.draws / self.n if self.n else 0.0
+
+    @property
+    def mean_rounds(self) -> float:
+        if not self.n:
+            return 0.0
+        return float(np.arange(self.rounds.size) @ self.rounds) / self.n
+
+    def merge(self, other: "BatchResult") -> None:
+        self.n += other.n
+        self.left_wins += other.left_wins
+        self.right_wins += other.right_wins
+        self.draws += other.draws
+        self.rounds += other.rounds
+        for side, histograms in other.damage.items():
+            for event_type, hist in histograms.items():
+                _add_histogram(self.damage, side, event_type, hist)
+        for side, counts in other.events.items():
+            for event_type, count in counts.items():
+                _add_count(self.events, side, event_type, count)
+
+
+def _add_histogram(
+    target: Dict[str, Dict[str, np.ndarray]], side: str, event_type: str, hist
+) -> None:
+    current = target.setdefault(side, {}).get(event_type)
+    if current is None:
+        target[side][event_type] = hist.copy()
+        return
+    if current.size < hist.size:
+        current = np.pad(current, (0, hist.size - current.size))
+    current[: hist.size] += hist
+    target[side][event_type] = current
+
+
+def _add_count(
+    target: Dict[str, Dict[str, int]], side: str, event_type: str, count: int
+) -> None:
+    side_counts = target.setdefault(side, {})
+    side_counts[event_type] = side_counts.get(event_type, 0) + int(count)
+
+
+@dataclass(frozen=True)
+class _Attack:
+    """Константы одного направления атаки — статы в бою не меняются."""
+
+    miss: float
+    block: float
+    crit: float
+    raw: float
+    defense: float
+
+    @classmethod
+    def between(
+        cls,
+        mechanics: BattleMechanics,
+        attacker: BattleFighter,
+        defender: BattleFighter,
+    ) -> "_Attack":
+        total_speed = attacker.speed + defender.speed
+        total_dex = attacker.dexterity + defender.dexterity
+        return cls(
+            miss=defender.speed / total_speed * 0.15,
+            block=(
+                defender.dexterity
+                / total_dex
+                * 0.15
+                * mechanics.KAGUNE_DEF[defender.kagune_type]
+            ),
+            crit=attacker.dexterity / total_dex * 0.15,
+            raw=(attacker.strength * 0.8 + attacker.kagune_strength * 1.2)
+            * mechanics.KAGUNE_ATK[attacker.kagune_type],
+            defense=(defender.strength * 0.3 + defender.kagune_strength * 0.5)
+            * mechanics.KAGUNE_DEF[defender.kagune_type],
+        )
+
+
+class MonteCarloSimulator:
+    def __init__(
+        self,
+        mechanics: Optional[BattleMechanics] = None,
+        chunk_size: int = CHUNK_SIZE,
+    ):
+        # Множители кагуне берутся из экземпляра — для балансировки
+        # можно подменить KAGUNE_ATK/KAGUNE_DEF, не трогая класс
+        self.mechanics = mechanics or BattleMechanics()
+        self.chunk_size = chunk_size
+
+    def simulate(
+        self,
+        left: BattleFighter,
+        right: BattleFighter,
+        n: int,
+        rng: np.random.Generator | int | None = None,
+    ) -> BatchResult:
+        rng = np.random.default_rng(rng)
+        result = BatchResult(n=0)
+
+        for start in range(0, n, self.chunk_size):
+            size = min(self.chunk_size, n - start)
+            result.merge(self._simulate_chunk(left, right, size, rng))
+
+        return result
+
+    def kagune_matrix(
+        self,
+        fighter: BattleFighter,
+        n: int,
+        rng: np.random.Generator | int | None = None,
+    ) -> Dict[tuple[KaguneType, KaguneType], BatchResult]:
+        """Зеркальные бои одинаковых статов для всех пар кагуне."""
+        rng = np.random.default_rng(rng)
+        matrix = {}
+        for left_kagune, right_kagune in product(KaguneType, repeat=2):
+            left = _with_kagune(fighter, left_kagune)
+            right = _with_kagune(fighter, right_kagune)
+            matrix[(left_kagune, right_kagune)] = self.simulate(left, right, n, rng)
+        return matrix
+
+    # ======================================================
+    # Один чанк
+    # ======================================================
+
+    def _simulate_chunk(
+        self,
+        left: BattleFighter,
+        right: BattleFighter,
+        n: int,
+        rng: np.random.Generator,
+    ) -> BatchResult:
+        result = BatchResult(n=n)
+
+        # Порядок хода как в simulate: правый первый только если быстрее
+        right_first = right.speed > left.speed
+        first, second = (right, left) if right_first else (left, right)
+        first_side, second_side = (
+            ("right", "left") if right_first else ("left", "right")
+        )
+
+        first_attack = _Attack.between(self.mechanics, first, second)
+        second_attack = _Attack.between(self.mechanics, second, first)
+
+        # Состояние только живых боёв; idx — их номера в чанке
+        idx = np.arange(n)
+        hp_first = np.full(n, first.hp, dtype=np.int64)
+        hp_second = np.full(n, second.hp, dtype=np.int64)
+        regen_first = np.full(n, first.regen_used, dtype=bool)
+        regen_second = np.full(n, second.regen_used, dtype=bool)
+
+        final_first = hp_first.copy()
+        final_second = hp_second.copy()
+        rounds = np.zeros(n, dtype=np.int64)
+
+        def attack(params: _Attack, side: str, hp_defender: np.ndarray) -> None:
+            damage = self._roll_damage(params, side, hp_defender.size, rng, result)
+            hp_defender -= damage
+
+        def regen(
+            fighter: BattleFighter,
+            side: str,
+            hp: np.ndarray,
+            used: np.ndarray,
+        ) -> None:
+            triggered = ~used & (hp <= fighter.max_hp * REGEN_THRESHOLD)
+            hp[triggered] += fighter.regeneration * 10
+            used |= triggered
+            _add_count(result.events, side, "regen", np.count_nonzero(triggered))
+
+        round_num = 0
+        while idx.size and round_num < MAX_ROUNDS:
+            round_num += 1
+            rounds[idx] = round_num
+
+            attack(first_attack, first_side, hp_second)
+            alive = (hp_first > 0) & (hp_second > 0)
+
+            state = (idx, hp_first, hp_second, regen_first, regen_second)
+            idx, hp_first, hp_second, regen_first, regen_second = _finish(
+                state, alive, final_first, final_second
+            )
+
+            regen(second, second_side, hp_second, regen_second)
+            # Реген не убивает — проверка после него в simulate ничего не меняет
+
+            attack(second_attack, second_side, hp_first)
+            alive = (hp_first > 0) & (hp_second > 0)
+
+            state = (idx, hp_first, hp_second, regen_first, regen_second)
+            idx, hp_first, hp_second, regen_first, regen_second = _finish(
+                state, alive, final_first, final_second
+            )
+
+            regen(first, first_side, hp_first, regen_first)
+
+        # Бои, дошедшие до MAX_ROUNDS
+        final_first[idx] = hp_first
+        final_second[idx] = hp_second
+
+        final_left, final_right = (
+            (final_second, final_first) if right_first else (final_first, final_second)
+        )
+        left_won = (final_left > 0) & (final_right <= 0)
+        right_won = (final_right > 0) & (final_left <= 0)
+
+        result.left_wins = int(np.count_nonzero(left_won))
+        result.right_wins = int(np.count_nonzero(right_won))
+        result.draws = n - result.left_wins - result.right_wins
+        result.rounds = np.bincount(rounds, minlength=MAX_ROUNDS + 1)
+        return result
+
+    @staticmethod
+    def _roll_damage(
+        params: _Attack,
+        side: str,
+        count: int,
+        rng: np.random.Generator,
+        result: BatchResult,
+    ) -> np.ndarray:
+        roll = rng.random(count)
+        miss = roll < params.miss
+        roll -= params.miss
+        block = ~miss & (roll < params.block)
+        roll -= params.block
+        crit = ~miss & ~block & (roll < params.crit)
+
+        raw = params.raw * rng.uniform(0.85, 1.15, count)
+        raw[crit] *= 2.0
+        damage = np.maximum(1, np.trunc(raw - params.defense).astype(np.int64))
+        damage[block] = np.maximum(1, np.trunc(damage[block] * 0.4).astype(np.int64))
+        damage[miss] = 0
+
+        hit = ~(miss | block | crit)
+        for event_type, mask in zip(DAMAGE_EVENTS, (hit, block, crit)):
+            values = damage[mask]
+            _add_count(result.events, side, event_type, values.size)
+            if values.size:
+                _add_histogram(result.damage, side, event_type, np.bincount(values))
+        _add_count(result.events, side, "miss", np.count_nonzero(miss))
+
+        return damage
+
+
+def _finish(state, alive: np.ndarray, final_first, final_second):
+    """Записывает итог завершённых боёв и убирает их из состояния."""
+    idx, hp_first, hp_second = state[:3]
+    if alive.all():
+        return state
+
+    done = ~alive
+    final_first[idx[done]] = hp_first[done]
+    final_second[idx[done]] = hp_second[done]
+    return tuple(array[alive] for array in state)
+
+
+def _with_kagune(fighter: BattleFighter, kagune: KaguneType) -> BattleFighter:
+    return BattleFighter(
+        name=fighter.name,
+        hp=fighter.hp,
+        max_hp=fighter.max_hp,
+        kagune_type=kagune,
+        strength=fighter.strength,
+        dexterity=fighter.dexterity,
+        speed=fighter.speed,
+        kagune_strength=fighter.kagune_strength,
+        regeneration=fighter.regeneration,
+    )
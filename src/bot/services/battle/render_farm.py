@@ -0,0 +1,353 @@
+# src/bot/services/battle/render_farm.py
+import asyncio
+import logging
+import multiprocessing
+import os
+import statistics
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+# ==========================================================
+# Код, выполняемый внутри процесса-воркера
+# ==========================================================
+
+def _render_in_process(
+    payload: Dict[str, Any], output_path: str, left_fighter_name: str = ""
+) -> str:
+    """Точка входа воркера: таймлайн приходит сериализованным dict."""
+    from src.bot.services.battle.generator import render_timeline_payload
+
+    return render_timeline_payload(
+        payload, output_path, left_fighter_name=left_fighter_name
+    )
+
+
+def _init_worker() -> None:
+    """Прогрев кеша клипов и атласа спрайтов при старте процесса — до первой задачи."""
+    from src.bot.services.battle.animation_loader import prewarm_clips
+    from src.bot.services.battle.sprites import prewarm_sprites
+
+    prewarm_clips()
+    prewarm_sprites()
+
+
+# ==========================================================
+# Задача и статистика
+# ==========================================================
+
+
+@dataclass(slots=True)
+class BattleRenderJob:
+    payload: Dict[str, Any]
+    output_path: Path
+    timeout: Optional[float] = None
+    left_fighter_name: str = ""
+    job_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    result: asyncio.Future[Path] = field(default_factory=asyncio.Future)
+    enqueued_at: float = field(default_factory=time.perf_counter)
+    # Farm закончила с задачей: процесс больше не пишет в output_path.
+    # Может наступить позже result — после таймаута или отмены
+    finished: asyncio.Event = field(default_factory=asyncio.Event)
+
+    def cancel(self) -> bool:
+        if not self.result.done():
+            self.result.cancel()
+            return True
+        return False
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self.result.cancelled()
+
+
+@dataclass
+class RenderFarmStats:
+    queue_depth: int
+    in_flight: int
+    submitted: int
+    completed: int
+    failed: int
+    timed_out: int
+    cancelled: int
+    avg_wait: float
+    avg_latency: float
+    p95_latency: float
+
+
+# ==========================================================
+# Render farm
+# ==========================================================
+
+
+class BattleRenderFarm:
+    def __init__(
+        self,
+        workers_count: Optional[int] = None,
+        max_queue_size: int = 32,
+        job_timeout: float = 120.0,
+        max_tasks_per_child: Optional[int] = 50,
+        stats_window: int = 256,
+    ):
+        """
+        Долгоживущий пул процессов для рендера боёв.
+
+        Args:
+            workers_count: Количество процессов (по умолчанию — число ядер)
+            max_queue_size: Максимальный размер очереди задач
+            job_timeout: Таймаут одной задачи по умолчанию, секунды
+            max_tasks_per_child: Перезапуск процесса после N видео (память)
+            stats_window: Сколько последних задач учитывать в латентности
+        """
+        self.workers_count = workers_count or os.cpu_count() or 1
+        self.job_timeout = job_timeout
+        self.max_tasks_per_child = max_tasks_per_child
+        self.queue: asyncio.Queue[BattleRenderJob] = asyncio.Queue(
+            maxsize=max_queue_size
+        )
+        self.tasks: list[asyncio.Task] = []
+
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._is_running = False
+
+        self._in_flight = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._timed_out = 0
+        self._cancelled = 0
+        self._waits: Deque[float] = deque(maxlen=stats_window)
+        self._latencies: Deque[float] = deque(maxlen=stats_window)
+
+        logger.info(f"Initializing BattleRenderFarm with {self.workers_count} workers")
+
+    async def start(self) -> None:
+        """Запускает пул процессов и диспетчеров"""
+        if self._is_running:
+            logger.warning("BattleRenderFarm is already running")
+            return
+
+        # spawn — форк процесса с event loop и потоками aiogram небезопасен
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers_count,
+            mp_context=multiprocessing.get_context("spawn"),
+            max_tasks_per_child=self.max_tasks_per_child,
+            initializer=_init_worker,
+        )
+        self._is_running = True
+
+        self.tasks = [
+            asyncio.create_task(self._dispatcher(i))
+            for i in range(self.workers_count)
+        ]
+        logger.info("BattleRenderFarm started")
+
+    async def render(
+        self,
+        payload: Dict[str, Any],
+        output_path: str | Path,
+        timeout: Optional[float] = None,
+        left_fighter_name: str = "",
+    ) -> Path:
+        """Ставит сериализованный таймлайн в очередь и ждёт готовый файл."""
+        job = BattleRenderJob(
+            payload=payload,
+            output_path=Path(output_path),
+            timeout=timeout,
+            left_fighter_name=left_fighter_name,
+        )
+        await self.enqueue(job)
+        return await job.result
+
+    async def enqueue(self, job: BattleRenderJob) -> None:
+        """
+        Добавляет задачу в очередь, не дожидаясь места.
+
+        Raises:
+            asyncio.QueueFull: Если очередь переполнена
+        """
+        if not self._is_running:
+            raise RuntimeError("BattleRenderFarm is not running")
+
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            logger.error(f"Render queue is full, rejecting job {job.job_id}")
+            raise
+
+        self._submitted += 1
+        logger.debug(f"Enqueued battle render job {job.job_id}")
+
+    def cancel(self, job: BattleRenderJob) -> bool:
+        cancelled = job.cancel()
+        if cancelled:
+            self._cancelled += 1
+        return cancelled
+
+    async def _dispatcher(self, dispatcher_id: int) -> None:
+        loop = asyncio.get_running_loop()
+
+        while self._is_running:
+            try:
+                job = await self.queue.get()
+            except asyncio.CancelledError:
+                break
+
+            future: Optional[asyncio.Future] = None
+            try:
+                if job.is_cancelled:
+                    logger.debug(f"Skipping cancelled render job {job.job_id}")
+                    continue
+
+                started_at = time.perf_counter()
+                self._waits.append(started_at - job.enqueued_at)
+                self._in_flight += 1
+
+                process_future = self._pool.submit(
+                    _render_in_process,
+                    job.payload,
+                    str(job.output_path),
+                    job.left_fighter_name,
+                )
+                future = asyncio.wrap_future(process_future, loop=loop)
+                # Отмена задачи до старта в процессе снимает её из пула.
+                # Уже запущенную отменить нельзя: диспетчер дождётся процесса
+                # и удалит файл, как после таймаута
+                job.result.add_done_callback(
+                    lambda r, f=process_future: f.cancel() if r.cancelled() else None
+                )
+
+                try:
+                    result = await asyncio.wait_for(
+                        asyncio.shield(future), timeout=job.timeout or self.job_timeout
+                    )
+                except asyncio.TimeoutError:
+                    self._timed_out += 1
+                    logger.error(f"Render job {job.job_id} timed out")
+                    future.add_done_callback(
+                        lambda _, p=job.output_path: p.unlink(missing_ok=True)
+                    )
+                    if not job.result.done():
+                        job.result.set_exception(
+                            TimeoutError(f"Battle render timed out: {job.job_id}")
+                        )
+                    # Процесс дорендеривает задачу и держит слот пула. Пока он
+                    # занят, диспетчер не берёт новую: иначе она простоит в
+                    # очереди пула, а её таймаут уже будет идти
+                    await asyncio.wait([future])
+                    continue
+                except asyncio.CancelledError:
+                    if future.cancelled():
+                        # Снята из пула до старта — процесс её не брал
+                        continue
+                    # stop() посреди рендера: процесс не ждём, но файл
+                    # удаляется, а вызывающий получает ошибку, а не висит
+                    process_future.add_done_callback(
+                        lambda _, p=job.output_path: p.unlink(missing_ok=True)
+                    )
+                    if not job.result.done():
+                        job.result.set_exception(
+                            RuntimeError(f"BattleRenderFarm stopped: {job.job_id}")
+                        )
+                    raise
+                except Exception as error:
+                    self._failed += 1
+                    logger.error(f"Render job {job.job_id} failed", exc_info=True)
+                    if not job.result.done():
+                        job.result.set_exception(error)
+                    continue
+                finally:
+                    self._in_flight -= 1
+
+                self._completed += 1
+                self._latencies.append(time.perf_counter() - job.enqueued_at)
+
+                if job.result.done():
+                    # Задачу отменили, пока она рендерилась
+                    Path(result).unlink(missing_ok=True)
+                else:
+                    job.result.set_result(Path(result))
+
+            finally:
+                if future is None or future.done():
+                    job.finished.set()
+                else:
+                    # Остановка farm: finished — когда процесс допишет файл
+                    future.add_done_callback(lambda _, e=job.finished: e.set())
+                self.queue.task_done()
+
+        logger.info(f"Render dispatcher {dispatcher_id} stopped")
+
+    async def stop(self, timeout: float = 30.0) -> None:
+        """
+        Останавливает диспетчеров и пул процессов.
+
+        Args:
+            timeout: Максимальное время ожидания текущих задач
+        """
+        if not self._is_running:
+            logger.warning("BattleRenderFarm is not running")
+            return
+
+        logger.info("Stopping BattleRenderFarm...")
+
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Shutdown timeout ({timeout}s), forcing cancel")
+
+        self._is_running = False
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks.clear()
+
+        while not self.queue.empty():
+            job = self.queue.get_nowait()
+            job.cancel()
+            job.finished.set()
+            self.queue.task_done()
+
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+        logger.info("BattleRenderFarm stopped")
+
+    @property
+    def stats(self) -> RenderFarmStats:
+        latencies = sorted(self._latencies)
+        p95 = (
+            latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            if latencies
+            else 0.0
+        )
+        return RenderFarmStats(
+            queue_depth=self.queue.qsize(),
+            in_flight=self._in_flight,
+            submitted=self._submitted,
+            completed=self._completed,
+            failed=self._failed,
+            timed_out=self._timed_out,
+            cancelled=self._cancelled,
+            avg_wait=statistics.fmean(self._waits) if self._waits else 0.0,
+            avg_latency=statistics.fmean(latencies) if latencies else 0.0,
+            p95_latency=p95,
+        )
+
+    @property
+    def queue_size(self) -> int:
+        """Текущий размер очереди"""
+        return self.queue.qsize()
+
+    @property
+    def is_running(self) -> bool:
+        """Статус render farm"""
+        return self._is_running
@@ -1,9 +1,18 @@
+from functools import lru_cache
 from typing import Optional, Tuple
 
 import numpy as np
 from PIL import Image, ImageDraw, ImageFont
 
+from src.bot.services.battle.compositor import PremultipliedSprite, blit, premultiply
 from src.bot.services.battle.sprite_animator import paste_sprite_transformed
+from src.bot.services.battle.stage_timer import stage
+from src.bot.services.battle.text_raster import (
+    AlphaMask,
+    blit_mask,
+    draw_text,
+    load_font,
+)
 
 FONT_MONO = "/usr/share/fonts/noto/NotoSansMono-Bold.ttf"
 FONT_CYR = "/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc"
@@ -35,14 +44,10 @@ EVENT_LABELS = {
 # ==========================================================
 # Шрифты — загружаются один раз при импорте модуля
 # ==========================================================
-_FONT_CACHE: dict = {}
 
 
 def _font(path: str, size: int) -> ImageFont.FreeTypeFont:
-    key = (path, size)
-    if key not in _FONT_CACHE:
-        _FONT_CACHE[key] = ImageFont.truetype(path, size)
-    return _FONT_CACHE[key]
+    return load_font(path, size)
 
 
 def _preload_fonts() -> None:
@@ -122,7 +127,7 @@ def draw_hp_bar(
 
 
 def draw_damage_number(
-    draw: ImageDraw.ImageDraw,
+    frame: np.ndarray,
     damage: int,
     event_type: str,
     progress: float,
@@ -144,12 +149,12 @@ def draw_damage_number(
     font = _font(FONT_MONO, size)
     offset_y = int(progress * H * 0.13)
 
-    draw.text((cx + 2, cy - offset_y + 2), text, font=font, fill=(0, 0, 0), anchor="mm")
-    draw.text((cx, cy - offset_y), text, font=font, fill=color, anchor="mm")
+    draw_text(frame, (cx + 2, cy - offset_y + 2), text, font, (0, 0, 0), anchor="mm")
+    draw_text(frame, (cx, cy - offset_y), text, font, color, anchor="mm")
 
 
 def draw_event_label(
-    draw: ImageDraw.ImageDraw,
+    frame: np.ndarray,
     event_type: str,
     progress: float,
 ) -> None:
@@ -157,7 +162,7 @@ def draw_event_label(
     if max(0.0, 1.0 - progress * 1.5) <= 0:
         return
     font = _font(FONT_MONO, int(H * 0.067))  # ~24px при 360
-    draw.text((W // 2, LABEL_Y), label, font=font, fill=color, anchor="mm")
+    draw_text(frame, (W // 2, LABEL_Y), label, font, color, anchor="mm")
 
 
 def paste_sprite(
@@ -174,6 +179,126 @@ def paste_sprite(
     img.paste(sprite, (x, y), mask=sprite.split()[3])
 
 
+# ==========================================================
+# Статичный HUD-слой — рендерится один раз на бой
+# ==========================================================
+
+
+def _draw_hud_static(
+    draw: ImageDraw.ImageDraw,
+    x: int,
+    y: int,
+    width: int,
+    name: str,
+    color: Tuple[int, int, int],
+    flip: bool = False,
+) -> None:
+    """Рисует неизменяемую часть HP бара: имя, подложку и рамку."""
+    font_name = _font(FONT_CYR, 14)
+
+    name_display = name[:12] + "…" if len(name) > 12 else name
+    name_offset = int(H * 0.055)
+
+    if flip:
+        draw.text(
+            (x + width, y - name_offset),
+            name_display,
+            font=font_name,
+            fill=color,
+            anchor="ra",
+        )
+    else:
+        draw.text((x, y - name_offset), name_display, font=font_name, fill=color)
+
+    draw.rectangle([x, y, x + width, y + BAR_H], fill=(40, 40, 40))
+    draw.rectangle([x, y, x + width, y + BAR_H], outline=color, width=2)
+
+
+@lru_cache(maxsize=64)
+def _hud_layer(
+    left_name: str,
+    right_name: str,
+    left_color: Tuple[int, int, int],
+    right_color: Tuple[int, int, int],
+) -> PremultipliedSprite:
+    """RGBA-слой с именами, рамками HP баров и надписью VS."""
+    layer = Image.new("RGBA", (W, H), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(layer)
+
+    _draw_hud_static(draw, BAR_X, BAR_Y, BAR_W, left_name, left_color, flip=False)
+    _draw_hud_static(
+        draw, W - BAR_X - BAR_W, BAR_Y, BAR_W, right_name, right_color, flip=True
+    )
+    draw.text(
+        (W // 2, BAR_Y + BAR_H // 2),
+        "VS",
+        font=_font(FONT_MONO, int(H * 0.044)),
+        fill=(100, 100, 100),
+        anchor="mm",
+    )
+
+    # premultiply обрезает слой до непрозрачной полосы — блендим не весь кадр
+    return premultiply(np.asarray(layer))
+
+
+def _fill_hp_bar(
+    frame: np.ndarray,
+    x: int,
+    y: int,
+    width: int,
+    hp: int,
+    max_hp: int,
+    flip: bool = False,
+) -> None:
+    """Заливка HP внутри рамки — рамка шириной 2px уже есть в HUD-слое."""
+    ratio = max(0.0, hp / max_hp)
+    filled = int(width * ratio)
+
+    if flip:
+        x0, x1 = x + width - filled, x + width
+    else:
+        x0, x1 = x, x + filled
+
+    x0 = max(x0, x + 2)
+    x1 = min(x1, x + width - 2)
+    if x1 < x0:
+        return
+
+    frame[y + 2 : y + BAR_H - 1, x0 : x1 + 1] = _hp_color(ratio)
+
+
+def _draw_hp_text(
+    frame: np.ndarray,
+    x: int,
+    y: int,
+    width: int,
+    hp: int,
+    max_hp: int,
+    flip: bool = False,
+) -> None:
+    hp_text = f"{max(0, hp)}/{max_hp}"
+    font_hp = _font(FONT_MONO, 12)
+    if flip:
+        draw_text(
+            frame,
+            (x + width, y + BAR_H + 3),
+            hp_text,
+            font_hp,
+            (200, 200, 200),
+            anchor="ra",
+        )
+    else:
+        draw_text(frame, (x, y + BAR_H + 3), hp_text, font_hp, (200, 200, 200))
+
+
+_BACKGROUND = np.full((H, W, 3), BG_COLOR, dtype=np.uint8)
+_BACKGROUND.setflags(write=False)
+
+
+def blank_frame() -> np.ndarray:
+    return _BACKGROUND.copy()
+
+
 def make_base_frame(
     left_hp: int,
     right_hp: int,
@@ -191,13 +316,12 @@ def make_base_frame(
     right_sprite_angle: float = 0.0,
     attacker_left: Optional[bool] = None,  # None = idle/pause
 ) -> np.ndarray:
-    img = Image.new("RGB", (W, H), BG_COLOR)
-    draw = ImageDraw.Draw(img)
+    frame = blank_frame()
 
     def _paste_left():
         if left_sprite is not None:
             paste_sprite_transformed(
-                img,
+                frame,
                 left_sprite,
                 cx=LEFT_CX,
                 ground_y=GROUND_Y,
@@ -209,7 +333,7 @@ def make_base_frame(
     def _paste_right():
         if right_sprite is not None:
             paste_sprite_transformed(
-                img,
+                frame,
                 right_sprite,
                 cx=RIGHT_CX,
                 ground_y=GROUND_Y,
@@ -219,46 +343,32 @@ def make_base_frame(
             )
 
     # Атакующий рисуется последним — он поверх защитника
-    if attacker_left is True:
-        _paste_left()
-        _paste_right()
-    else:
-        # attacker_left=False или None (idle) — правый поверх левого
-        _paste_right()
-        _paste_left()
+    with stage("sprite_composite"):
+        if attacker_left is True:
+            _paste_left()
+            _paste_right()
+        else:
+            # attacker_left=False или None (idle) — правый поверх левого
+            _paste_right()
+            _paste_left()
 
     # HP бары всегда поверх спрайтов
-    draw_hp_bar(
-        draw,
-        BAR_X,
-        BAR_Y,
-        BAR_W,
-        left_hp,
-        left_max_hp,
-        left_name,
-        left_color,
-        flip=False,
-    )
-    draw_hp_bar(
-        draw,
-        W - BAR_X - BAR_W,
-        BAR_Y,
-        BAR_W,
-        right_hp,
-        right_max_hp,
-        right_name,
-        right_color,
-        flip=True,
-    )
-    draw.text(
-        (W // 2, BAR_Y + BAR_H // 2),
-        "VS",
-        font=_font(FONT_MONO, int(H * 0.044)),
-        fill=(100, 100, 100),
-        anchor="mm",
-    )
+    right_bar_x = W - BAR_X - BAR_W
+    _draw_hp_text(frame, BAR_X, BAR_Y, BAR_W, left_hp, left_max_hp, flip=False)
+    _draw_hp_text(frame, right_bar_x, BAR_Y, BAR_W, right_hp, right_max_hp, flip=True)
+    with stage("hp_bars"):
+        blit(
+            frame,
+            _hud_layer(left_name, right_name, tuple(left_color), tuple(right_color)),
+            0,
+            0,
+        )
+        _fill_hp_bar(frame, BAR_X, BAR_Y, BAR_W, left_hp, left_max_hp, flip=False)
+        _fill_hp_bar(
+            frame, right_bar_x, BAR_Y, BAR_W, right_hp, right_max_hp, flip=True
+        )
 
-    return np.array(img)
+    return frame
 
 
 ACTION_ICONS = {
@@ -270,20 +380,57 @@ ACTION_ICONS = {
 }
 
 
+@lru_cache(maxsize=2)
+def _arrow_mask(attacker_left: bool) -> AlphaMask:
+    """Стрелка направления атаки — маска рисуется один раз."""
+    layer = Image.new("L", (W, H), 0)
+    draw = ImageDraw.Draw(layer)
+
+    arrow_dx = int(W * 0.08)
+    tip_x = W // 2 + (arrow_dx if attacker_left else -arrow_dx)
+    tail_x = W // 2 - (arrow_dx if attacker_left else -arrow_dx)
+
+    draw.line([(tail_x, ARROW_Y), (tip_x, ARROW_Y)], fill=255, width=2)
+
+    tip_size = int(W * 0.022)  # ~8px
+    if attacker_left:
+        draw.polygon(
+            [
+                (tip_x, ARROW_Y),
+                (tip_x - tip_size, ARROW_Y - tip_size // 2),
+                (tip_x - tip_size, ARROW_Y + tip_size // 2),
+            ],
+            fill=255,
+        )
+    else:
+        draw.polygon(
+            [
+                (tip_x, ARROW_Y),
+                (tip_x + tip_size, ARROW_Y - tip_size // 2),
+                (tip_x + tip_size, ARROW_Y + tip_size // 2),
+            ],
+            fill=255,
+        )
+
+    x0, y0, x1, y1 = layer.getbbox()
+    mask = np.asarray(layer.crop((x0, y0, x1, y1)))
+    mask.setflags(write=False)
+    return AlphaMask(mask=mask, x=x0, y=y0)
+
+
 def draw_action_overlay(
-    draw: ImageDraw.ImageDraw,
+    frame: np.ndarray,
     event_type: str,
     attacker_name: str,
     defender_name: str,
     attacker_color: Tuple[int, int, int],
     defender_color: Tuple[int, int, int],
     attacker_left: bool,
-    progress: float,
+    alpha_scale: float,  # overlay_alpha из скомпилированного таймлайна
 ) -> None:
     font_name = _font(FONT_CYR, int(H * 0.044))  # ~16px
     font_icon = _font(FONT_MONO, int(H * 0.05))  # ~18px
 
-    alpha_scale = max(0.0, 1.0 - progress * 1.2)
     fade = lambda c: tuple(int(v * alpha_scale) for v in c)
 
     icon = ACTION_ICONS.get(event_type, "?")
@@ -295,51 +442,30 @@ def draw_action_overlay(
         atk_x, atk_anchor = W - BAR_X, "ra"
         def_x, def_anchor = BAR_X, "la"
 
-    draw.text(
+    # Фейд — только тонировка закешированных масок, без FreeType
+    draw_text(
+        frame,
         (atk_x, LOG_Y),
         attacker_name,
-        font=font_name,
-        fill=fade(attacker_color),
+        font_name,
+        fade(attacker_color),
         anchor=atk_anchor,
     )
-    draw.text(
+    draw_text(
+        frame,
         (def_x, LOG_Y),
         defender_name,
-        font=font_name,
-        fill=fade(defender_color),
+        font_name,
+        fade(defender_color),
         anchor=def_anchor,
     )
-    draw.text(
+    draw_text(
+        frame,
         (W // 2, LOG_Y),
         f" {icon} ",
-        font=font_icon,
-        fill=fade((220, 220, 220)),
+        font_icon,
+        fade((220, 220, 220)),
         anchor="ma",
     )
 
-    arrow_dx = int(W * 0.08)
-    tip_x = W // 2 + (arrow_dx if attacker_left else -arrow_dx)
-    tail_x = W // 2 - (arrow_dx if attacker_left else -arrow_dx)
-    fade_gray = fade((200, 200, 200))
-
-    draw.line([(tail_x, ARROW_Y), (tip_x, ARROW_Y)], fill=fade_gray, width=2)
-
-    tip_size = int(W * 0.022)  # ~8px
-    if attacker_left:
-        draw.polygon(
-            [
-                (tip_x, ARROW_Y),
-                (tip_x - tip_size, ARROW_Y - tip_size // 2),
-                (tip_x - tip_size, ARROW_Y + tip_size // 2),
-            ],
-            fill=fade_gray,
-        )
-    else:
-        draw.polygon(
-            [
-                (tip_x, ARROW_Y),
-                (tip_x + tip_size, ARROW_Y - tip_size // 2),
-                (tip_x + tip_size, ARROW_Y + tip_size // 2),
-            ],
-            fill=fade_gray,
-        )
+    blit_mask(frame, _arrow_mask(attacker_left), 0, 0, fade((200, 200, 200)))
@@ -0,0 +1,78 @@
+import hashlib
+import json
+import random
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from src.bot.services.battle.mechanics import BattleMechanics, BattleResult
+from src.bot.services.battle.models import BattleFighter, TimelineEvent
+from src.bot.services.battle.serialization import fighter_from_dict, fighter_to_dict
+from src.bot.services.battle.timeline import BattleTimelineBuilder
+
+# Поднимать при любом изменении правил BattleMechanics или
+# BattleTimelineBuilder — старые записи перестанут воспроизводиться
+REPLAY_VERSION = 1
+
+
+# ==========================================================
+# Запись боя: сид + статы до боя
+# ==========================================================
+# Один генератор random.Random(seed) проходит через механику и
+# построение таймлайна (включая выбор спрайта), поэтому запись
+# из нескольких чисел восстанавливает и BattleResult, и таймлайн.
+
+
+@dataclass(frozen=True)
+class BattleReplay:
+    seed: int
+    left: Dict[str, Any]
+    right: Dict[str, Any]
+    version: int = REPLAY_VERSION
+
+    @classmethod
+    def record(
+        cls,
+        left: BattleFighter,
+        right: BattleFighter,
+        seed: Optional[int] = None,
+    ) -> "BattleReplay":
+        """Снимок бойцов до боя. Без сида берётся случайный."""
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(63)
+        return cls(seed=seed, left=fighter_to_dict(left), right=fighter_to_dict(right))
+
+    def play(self) -> tuple[BattleResult, List[TimelineEvent]]:
+        """Проигрывает бой заново на свежих копиях бойцов."""
+        if self.version != REPLAY_VERSION:
+            raise ValueError(f"Unsupported replay version: {self.version}")
+
+        rng = random.Random(self.seed)
+        left = fighter_from_dict(self.left)
+        right = fighter_from_dict(self.right)
+
+        result = BattleMechanics(rng=rng).simulate(left, right)
+        timeline = BattleTimelineBuilder().build(left, right, result, rng=rng)
+        return result, timeline
+
+    @property
+    def key(self) -> str:
+        """Стабильный ключ боя — одинаковые бои дают одинаковый ключ."""
+        raw = json.dumps(self.to_dict(), sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(raw.encode()).hexdigest()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "seed": self.seed,
+            "left": self.left,
+            "right": self.right,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "BattleReplay":
+        return cls(
+            seed=data["seed"],
+            left=data["left"],
+            right=data["right"],
+            version=data["version"],
+        )
@@ -0,0 +1,104 @@
+import logging
+from io import BytesIO
+from typing import Optional
+
+from PIL import Image
+
+from src.bot.services.battle.animation_loader import get_animation_path, get_clip_frame
+from src.bot.services.battle.compositor import PremultipliedSprite
+from src.bot.services.battle.mechanics import BattleResult
+from src.bot.services.battle.models import BattleFighter
+from src.bot.services.battle.renderer import (
+    DMG_Y,
+    FONT_CYR,
+    FONT_MONO,
+    H,
+    LABEL_Y,
+    LOG_Y,
+    W,
+    make_base_frame,
+)
+from src.bot.services.battle.sprites import get_sprite_rotations
+from src.bot.services.battle.text_raster import draw_text, load_font
+
+logger = logging.getLogger(__name__)
+
+
+# ==========================================================
+# Карточка итога боя
+# ==========================================================
+# Отправляется сразу после симуляции, пока видео ещё рендерится:
+# один кадр теми же примитивами, что и видео — HUD с итоговым HP,
+# бойцы в стойке, победитель и число раундов.
+
+
+def _idle_sprite(
+    fighter: BattleFighter, role: str, flip: bool
+) -> Optional[PremultipliedSprite]:
+    path = get_animation_path("idle", fighter.name, fighter.kagune_type, role=role)
+    if path:
+        return get_clip_frame(path, 0.0, flip=flip)
+    try:
+        return get_sprite_rotations(fighter, flip, fighter.sprite_path).get(0.0)
+    except FileNotFoundError:
+        logger.debug(f"No idle sprite for {fighter.name}, card without sprite")
+        return None
+
+
+def _final_hp(fighter: BattleFighter) -> int:
+    # Реген в механике не ограничен сверху, бар — ограничен
+    return max(0, min(fighter.max_hp, fighter.hp))
+
+
+def render_result_card(
+    result: BattleResult, left: BattleFighter, right: BattleFighter
+) -> bytes:
+    frame = make_base_frame(
+        left_hp=_final_hp(left),
+        right_hp=_final_hp(right),
+        left_max_hp=left.max_hp,
+        right_max_hp=right.max_hp,
+        left_name=left.name,
+        right_name=right.name,
+        left_color=left.color,
+        right_color=right.color,
+        left_sprite=_idle_sprite(left, "attacker", flip=False),
+        right_sprite=_idle_sprite(right, "defender", flip=True),
+    )
+
+    font_label = load_font(FONT_CYR, int(H * 0.067))
+    font_name = load_font(FONT_CYR, int(H * 0.09))
+    font_rounds = load_font(FONT_MONO, int(H * 0.044))
+
+    if result.is_draw:
+        draw_text(frame, (W // 2, DMG_Y), "НИЧЬЯ", font_name, (180, 180, 180), "mm")
+    else:
+        draw_text(
+            frame,
+            (W // 2, LABEL_Y + 8),
+            "ПОБЕДИТЕЛЬ",
+            font_label,
+            (200, 200, 200),
+            "mm",
+        )
+        draw_text(
+            frame,
+            (W // 2, DMG_Y + 8),
+            result.winner.name,
+            font_name,
+            result.winner.color,
+            "mm",
+        )
+
+    draw_text(
+        frame,
+        (W // 2, LOG_Y),
+        f"Раундов: {result.rounds}",
+        font_rounds,
+        (200, 200, 200),
+        "ma",
+    )
+
+    buf = BytesIO()
+    Image.fromarray(frame).save(buf, format="PNG", compress_level=1)
+    return buf.getvalue()
@@ -0,0 +1,277 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, wait
+from fractions import Fraction
+from pathlib import Path
+from typing import List, Optional
+
+import av
+
+from src.bot.services.battle.compiled_timeline import FPS, item_frame_count
+from src.bot.services.battle.models import TimelineEvent
+from src.bot.services.battle.render_farm import BattleRenderFarm, BattleRenderJob
+from src.bot.services.battle.serialization import timeline_to_dict
+
+logger = logging.getLogger(__name__)
+
+# Меньше этого числа кадров сегмент не дробим — старт x264 не бесплатный
+MIN_SEGMENT_FRAMES = 96
+
+
+# ==========================================================
+# Разбиение таймлайна
+# ==========================================================
+
+
+def split_timeline(
+    timeline: List[TimelineEvent],
+    segments_count: int,
+    min_segment_frames: int = MIN_SEGMENT_FRAMES,
+) -> List[List[TimelineEvent]]:
+    """
+    Делит таймлайн на последовательные куски примерно равной длины в кадрах.
+    Границы проходят только между элементами — каждый кусок кодируется
+    отдельным энкодером и начинается с ключевого кадра.
+    """
+    if not timeline:
+        return []
+
+    frame_counts = [item_frame_count(item) for item in timeline]
+    total = sum(frame_counts)
+
+    segments_count = max(1, min(segments_count, total // max(1, min_segment_frames)))
+    target = total / segments_count
+
+    segments: List[List[TimelineEvent]] = [[]]
+    accumulated = 0
+    for item, frames in zip(timeline, frame_counts):
+        boundary = target * len(segments)
+        if (
+            segments[-1]
+            and len(segments) < segments_count
+            and accumulated + frames / 2 > boundary
+        ):
+            segments.append([])
+        segments[-1].append(item)
+        accumulated += frames
+
+    return segments
+
+
+# ==========================================================
+# Склейка без перекодирования
+# ==========================================================
+
+
+def concat_segments(
+    segment_paths: List[Path],
+    frame_counts: List[int],
+    output_path: str | Path,
+) -> Path:
+    """
+    Ремуксит H.264 пакеты сегментов в один mp4, сдвигая pts/dts.
+    Все сегменты закодированы с одинаковыми параметрами, поэтому
+    SPS/PPS совпадают и перекодирование не нужно.
+    """
+    output_path = Path(output_path)
+    output = av.open(str(output_path), mode="w")
+    out_stream = None
+    offset_seconds = Fraction(0)
+
+    try:
+        for path, frames in zip(segment_paths, frame_counts):
+            with av.open(str(path)) as segment:
+                in_stream = segment.streams.video[0]
+                if out_stream is None:
+                    out_stream = output.add_stream_from_template(in_stream)
+
+                offset = round(offset_seconds / in_stream.time_base)
+
+                for packet in segment.demux(in_stream):
+                    # flush-пакет демуксера
+                    if packet.dts is None:
+                        continue
+                    packet.pts += offset
+                    packet.dts += offset
+                    packet.stream = out_stream
+                    output.mux(packet)
+
+            offset_seconds += Fraction(frames, FPS)
+    finally:
+        output.close()
+
+    logger.info(f"Concatenated {len(segment_paths)} segments into {output_path}")
+    return output_path
+
+
+# ==========================================================
+# Параллельный рендер сегментов
+# ==========================================================
+# Сегменты рендерятся задачами render farm (общий пул, очередь и
+# таймауты) или, без неё, в своём пуле процессов. Временная папка
+# удаляется только после того, как все процессы закончили писать в неё —
+# в том числе после отмены или ошибки соседнего сегмента.
+
+
+def _render_segment(payload: dict, output_path: str, left_fighter_name: str) -> str:
+    # generator импортирует этот модуль — импорт в момент вызова
+    from src.bot.services.battle.generator import render_timeline_payload
+
+    return render_timeline_payload(
+        payload, output_path, left_fighter_name=left_fighter_name
+    )
+
+
+class SegmentedBattleRenderer:
+    def __init__(
+        self,
+        render_farm: Optional[BattleRenderFarm] = None,
+        executor: Optional[Executor] = None,
+        workers_count: Optional[int] = None,
+        min_segment_frames: int = MIN_SEGMENT_FRAMES,
+    ):
+        """
+        Рендерит длинные таймлайны кусками в нескольких процессах.
+
+        Args:
+            render_farm: Farm, через которую идут сегменты, если она запущена
+            executor: Внешний пул; если не передан — создаётся свой по требованию
+            workers_count: На сколько сегментов делить (по умолчанию — процессы)
+            min_segment_frames: Минимальная длина сегмента в кадрах
+        """
+        self.render_farm = render_farm
+        self.workers_count = (
+            workers_count
+            or (render_farm.workers_count if render_farm is not None else None)
+            or os.cpu_count()
+            or 1
+        )
+        self.min_segment_frames = min_segment_frames
+        self._executor = executor
+        self._own_executor = False
+
+    def _pool(self) -> Executor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers_count,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            self._own_executor = True
+        return self._executor
+
+    def render(
+        self,
+        timeline: List[TimelineEvent],
+        output_path: str | Path,
+        left_fighter_name: str = "",
+    ) -> Path:
+        work_dir, jobs = self._prepare(timeline)
+        futures: List[Future] = []
+        try:
+            futures = self._submit(jobs, left_fighter_name)
+            for future in futures:
+                future.result()
+            return self._finish(jobs, output_path)
+        finally:
+            for future in futures:
+                future.cancel()
+            wait(futures)
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    async def render_async(
+        self,
+        timeline: List[TimelineEvent],
+        output_path: str | Path,
+        left_fighter_name: str = "",
+    ) -> Path:
+        if self.render_farm is not None and self.render_farm.is_running:
+            return await self._render_on_farm(timeline, output_path, left_fighter_name)
+
+        work_dir, jobs = self._prepare(timeline)
+        futures: List[Future] = []
+        try:
+            futures = self._submit(jobs, left_fighter_name)
+            await asyncio.gather(*(asyncio.wrap_future(f) for f in futures))
+            return await asyncio.to_thread(self._finish, jobs, output_path)
+        finally:
+            # Отменяются только не начатые; начатые дописываются в work_dir
+            for future in futures:
+                future.cancel()
+            await asyncio.to_thread(wait, futures)
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    async def _render_on_farm(
+        self,
+        timeline: List[TimelineEvent],
+        output_path: str | Path,
+        left_fighter_name: str,
+    ) -> Path:
+        work_dir, jobs = self._prepare(timeline)
+        farm_jobs: List[BattleRenderJob] = []
+        try:
+            for payload, path, _ in jobs:
+                job = BattleRenderJob(
+                    payload=payload,
+                    output_path=path,
+                    left_fighter_name=left_fighter_name,
+                )
+                await self.render_farm.enqueue(job)
+                farm_jobs.append(job)
+
+            await asyncio.gather(*(job.result for job in farm_jobs))
+            return await asyncio.to_thread(self._finish, jobs, output_path)
+        finally:
+            # finished наступает, когда процесс сегмента закончил писать
+            # в work_dir — и для отменённых посреди рендера задач тоже
+            for job in farm_jobs:
+                self.render_farm.cancel(job)
+            await asyncio.gather(*(job.finished.wait() for job in farm_jobs))
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def _submit(self, jobs, left_fighter_name: str) -> List[Future]:
+        pool = self._pool()
+        return [
+            pool.submit(_render_segment, payload, str(path), left_fighter_name)
+            for payload, path, _ in jobs
+        ]
+
+    def _prepare(self, timeline: List[TimelineEvent]):
+        segments = split_timeline(
+            timeline,
+            self.workers_count,
+            min_segment_frames=self.min_segment_frames,
+        )
+        work_dir = Path(tempfile.mkdtemp(prefix="battle_segments_"))
+
+        jobs = [
+            (
+                timeline_to_dict(segment),
+                work_dir / f"segment_{index:03d}.mp4",
+                sum(item_frame_count(item) for item in segment),
+            )
+            for index, segment in enumerate(segments)
+        ]
+        logger.debug(
+            f"Split timeline of {len(timeline)} items into {len(jobs)} segments"
+        )
+        return work_dir, jobs
+
+    def _finish(self, jobs, output_path: str | Path) -> Path:
+        paths = [path for _, path, _ in jobs]
+        frame_counts = [frames for _, _, frames in jobs]
+
+        if len(paths) == 1:
+            shutil.move(str(paths[0]), str(output_path))
+            return Path(output_path)
+
+        return concat_segments(paths, frame_counts, output_path)
+
+    def shutdown(self) -> None:
+        if self._own_executor and self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._own_executor = False
@@ -0,0 +1,151 @@
+from typing import Any, Dict, List, Optional
+
+from src.bot.services.battle.models import (
+    BattleEvent,
+    BattleFighter,
+    TimelineEvent,
+    TimelineEventData,
+)
+from src.bot.types import KaguneType
+
+TIMELINE_FORMAT_VERSION = 1
+
+# ==========================================================
+# Таймлайн <-> JSON-совместимый dict
+# ==========================================================
+# Нужен чтобы передавать таймлайн в другой процесс (render farm)
+# и хэшировать его без зависимости от pickle/identity объектов.
+
+
+def fighter_to_dict(fighter: BattleFighter) -> Dict[str, Any]:
+    return {
+        "name": fighter.name,
+        "hp": fighter.hp,
+        "max_hp": fighter.max_hp,
+        "kagune_type": fighter.kagune_type.name,
+        "strength": fighter.strength,
+        "dexterity": fighter.dexterity,
+        "speed": fighter.speed,
+        "kagune_strength": fighter.kagune_strength,
+        "regeneration": fighter.regeneration,
+        "regen_used": fighter.regen_used,
+        "sprite_path": fighter.sprite_path,
+    }
+
+
+def fighter_from_dict(data: Dict[str, Any]) -> BattleFighter:
+    return BattleFighter(
+        name=data["name"],
+        hp=data["hp"],
+        max_hp=data["max_hp"],
+        kagune_type=KaguneType[data["kagune_type"]],
+        strength=data["strength"],
+        dexterity=data["dexterity"],
+        speed=data["speed"],
+        kagune_strength=data["kagune_strength"],
+        regeneration=data["regeneration"],
+        regen_used=data["regen_used"],
+        sprite_path=data["sprite_path"],
+    )
+
+
+class _FighterTable:
+    """Один боец — одна запись, в событиях только индексы."""
+
+    def __init__(self) -> None:
+        self.items: List[Dict[str, Any]] = []
+        self._index: Dict[int, int] = {}
+
+    def ref(self, fighter: Optional[BattleFighter]) -> Optional[int]:
+        if fighter is None:
+            return None
+        key = id(fighter)
+        if key not in self._index:
+            self._index[key] = len(self.items)
+            self.items.append(fighter_to_dict(fighter))
+        return self._index[key]
+
+
+def timeline_to_dict(timeline: List[TimelineEvent]) -> Dict[str, Any]:
+    fighters = _FighterTable()
+    items: List[Dict[str, Any]] = []
+
+    for item in timeline:
+        data = item.data
+        event = data.battle_event
+
+        items.append(
+            {
+                "type": item.type,
+                "duration": item.duration,
+                "left": fighters.ref(data.left),
+                "right": fighters.ref(data.right),
+                "left_hp_before": data.left_hp_before,
+                "right_hp_before": data.right_hp_before,
+                "left_hp_after": data.left_hp_after,
+                "right_hp_after": data.right_hp_after,
+                "attacker_left": data.attacker_left,
+                "winner": fighters.ref(data.winner),
+                "is_draw": data.is_draw,
+                "battle_event": None
+                if event is None
+                else {
+                    "type": event.type,
+                    "attacker": fighters.ref(event.attacker),
+                    "defender": fighters.ref(event.defender),
+                    "hp_delta_attacker": event.hp_delta_attacker,
+                    "hp_delta_defender": event.hp_delta_defender,
+                },
+            }
+        )
+
+    return {
+        "version": TIMELINE_FORMAT_VERSION,
+        "fighters": fighters.items,
+        "items": items,
+    }
+
+
+def timeline_from_dict(payload: Dict[str, Any]) -> List[TimelineEvent]:
+    version = payload.get("version")
+    if version != TIMELINE_FORMAT_VERSION:
+        raise ValueError(f"Unsupported timeline format version: {version}")
+
+    fighters = [fighter_from_dict(f) for f in payload["fighters"]]
+
+    def _fighter(index: Optional[int]) -> Optional[BattleFighter]:
+        return None if index is None else fighters[index]
+
+    timeline: List[TimelineEvent] = []
+    for item in payload["items"]:
+        raw_event = item["battle_event"]
+        battle_event = None
+        if raw_event is not None:
+            battle_event = BattleEvent(
+                type=raw_event["type"],
+                attacker=fighters[raw_event["attacker"]],
+                defender=fighters[raw_event["defender"]],
+                hp_delta_attacker=raw_event["hp_delta_attacker"],
+                hp_delta_defender=raw_event["hp_delta_defender"],
+            )
+
+        timeline.append(
+            TimelineEvent(
+                type=item["type"],
+                duration=item["duration"],
+                data=TimelineEventData(
+                    left=fighters[item["left"]],
+                    right=fighters[item["right"]],
+                    left_hp_before=item["left_hp_before"],
+                    right_hp_before=item["right_hp_before"],
+                    left_hp_after=item["left_hp_after"],
+                    right_hp_after=item["right_hp_after"],
+                    attacker_left=item["attacker_left"],
+                    battle_event=battle_event,
+                    winner=_fighter(item["winner"]),
+                    is_draw=item["is_draw"],
+                ),
+            )
+        )
+
+    return timeline
@@ -5,8 +5,17 @@ from typing import Union
 import numpy as np
 from PIL import Image
 
+from src.bot.services.battle.compositor import (
+    PremultipliedSprite,
+    blit_anchored,
+    premultiply,
+)
+
 logger = logging.getLogger(__name__)
 
+IDLE_SWAY_DEG = 2.0  # амплитуда покачивания в покое
+ROTATION_STEP = 0.25  # шаг квантования угла в таблице поворотов
+
 
 def _rotate_sprite(sprite: Image.Image, angle: float) -> Image.Image:
     """Поворачивает спрайт вокруг нижнего центра (ног), не обрезая."""
@@ -14,6 +23,87 @@ def _rotate_sprite(sprite: Image.Image, angle: float) -> Image.Image:
     return sprite.rotate(angle, resample=Image.Resampling.BICUBIC, expand=True)
 
 
+def _expanded_size(width: int, height: int, angle: float) -> tuple[int, int]:
+    """Размер кадра после rotate(expand=True) — та же арифметика, что в PIL."""
+    rad = math.radians(angle)
+    cos, sin = round(math.cos(rad), 15), round(math.sin(rad), 15)
+    corners = [(0, 0), (width, 0), (width, height), (0, height)]
+    xs = [(x - width / 2) * cos + (y - height / 2) * sin for x, y in corners]
+    ys = [(y - height / 2) * cos - (x - width / 2) * sin for x, y in corners]
+    return (
+        math.ceil(max(xs) + width / 2) - math.floor(min(xs) + width / 2),
+        math.ceil(max(ys) + height / 2) - math.floor(min(ys) + height / 2),
+    )
+
+
+def _rotate_premultiplied(
+    sprite: PremultipliedSprite, angle: float
+) -> PremultipliedSprite:
+    """
+    Поворачивает обрезанный спрайт так, как повернулся бы весь исходный
+    кадр с expand=True: кадр растёт, а обрезанная область поворачивается
+    вместе с ним вокруг его центра и сохраняет место относительно ног.
+    """
+    h, w = sprite.pixels.shape[:2]
+    if not h or not w:
+        return sprite
+
+    # Режим RGBa — PIL не будет второй раз умножать на альфу
+    rotated = Image.frombytes("RGBa", (w, h), sprite.pixels.tobytes()).rotate(
+        angle, resample=Image.Resampling.BICUBIC, expand=True
+    )
+    width, height = _expanded_size(sprite.width, sprite.height, angle)
+
+    # Центр обрезанной области относительно центра исходного кадра;
+    # PIL поворачивает против часовой стрелки, ось y смотрит вниз
+    dx = sprite.offset_x + w / 2 - sprite.width / 2
+    dy = sprite.offset_y + h / 2 - sprite.height / 2
+    rad = math.radians(angle)
+    cx = width / 2 + dx * math.cos(rad) + dy * math.sin(rad)
+    cy = height / 2 - dx * math.sin(rad) + dy * math.cos(rad)
+
+    return PremultipliedSprite(
+        np.asarray(rotated),
+        width,
+        height,
+        offset_x=round(cx - rotated.width / 2),
+        offset_y=round(cy - rotated.height / 2),
+    )
+
+
+class RotationTable:
+    """
+    Повороты одного спрайта с шагом ROTATION_STEP, строятся лениво и
+    переиспользуются между боями. Каждый элемент — premultiplied спрайт
+    с размером расширенного кадра, так что привязка к ногам та же, что
+    и у поворота на лету.
+    """
+
+    def __init__(self, sprite: Image.Image, step: float = ROTATION_STEP):
+        self._source = sprite if sprite.mode == "RGBA" else sprite.convert("RGBA")
+        self.step = step
+        self._rotations: dict[int, PremultipliedSprite] = {}
+
+    def get(self, angle: float) -> PremultipliedSprite:
+        index = round(angle / self.step)
+        rotated = self._rotations.get(index)
+        if rotated is None:
+            quantized = index * self.step
+            img = self._source
+            if abs(quantized) > 0.1:
+                img = _rotate_sprite(img, quantized)
+            rotated = premultiply(np.asarray(img))
+            self._rotations[index] = rotated
+        return rotated
+
+    @property
+    def estimated_nbytes(self) -> int:
+        """Оценка сверху для таблицы на весь диапазон покачивания."""
+        steps = 2 * math.ceil(IDLE_SWAY_DEG / self.step) + 1
+        # expand=True при малых углах увеличивает кадр на несколько процентов
+        return int(steps * self._source.width * self._source.height * 4 * 1.1)
+
+
 def _apply_red_tint(sprite: Image.Image, intensity: float) -> Image.Image:
     """Накладывает красный оверлей поверх спрайта (intensity 0.0–1.0)."""
     tint = Image.new("RGBA", sprite.size, (220, 30, 30, int(intensity * 180)))
@@ -37,8 +127,8 @@ def _apply_blink(sprite: Image.Image, progress: float) -> Image.Image:
 
 
 def paste_sprite_transformed(
-    canvas: Image.Image,
-    sprite: Union[Image.Image, np.ndarray],
+    canvas: np.ndarray,
+    sprite: Union[PremultipliedSprite, RotationTable, Image.Image, np.ndarray],
     cx: int,
     ground_y: int,
     offset_x: int = 0,
@@ -46,54 +136,41 @@ def paste_sprite_transformed(
     angle: float = 0.0,
 ) -> None:
     """
-    Вставляет спрайт на canvas с трансформациями.
+    Вставляет спрайт на numpy-канвас с трансформациями.
     """
-    # Конвертируем numpy array в PIL Image если нужно
-    if isinstance(sprite, np.ndarray):
-        if sprite.shape[-1] == 4:
-            sprite = Image.fromarray(sprite, "RGBA")
-        else:
-            sprite = Image.fromarray(sprite)
-
-    if not isinstance(sprite, Image.Image):
-        raise ValueError(f"Expected PIL Image or numpy array, got {type(sprite)}")
-
-    # Применяем поворот если нужно
-    if abs(angle) > 0.1:
-        sprite = _rotate_sprite(sprite, angle)
-
-    # Получаем размеры после возможного поворота
-    sw, sh = sprite.size
-
-    # Вычисляем позицию для вставки
-    x = cx - sw // 2 + offset_x
-    y = ground_y - sh + offset_y
-
-    # Создаем маску из альфа-канала
-    if sprite.mode == "RGBA":
-        # Разделяем каналы
-        r, g, b, a = sprite.split()
-
-        # Для отладки сохраняем маску
-        if a.getextrema()[0] < 255:
-            logger.debug(f"Alpha channel range: {a.getextrema()}")
-
-        # Вставляем с маской
-        canvas.paste(sprite, (x, y), mask=a)
+    rotate = abs(angle) > 0.1
+
+    if isinstance(sprite, RotationTable):
+        sprite = sprite.get(angle)
+    elif isinstance(sprite, PremultipliedSprite):
+        if rotate:
+            sprite = _rotate_premultiplied(sprite, angle)
+    elif isinstance(sprite, (Image.Image, np.ndarray)):
+        if isinstance(sprite, np.ndarray):
+            if sprite.shape[-1] == 4:
+                sprite = Image.fromarray(sprite, "RGBA")
+            else:
+                sprite = Image.fromarray(sprite)
+        if rotate:
+            sprite = _rotate_sprite(sprite, angle)
+        sprite = premultiply(np.asarray(sprite.convert("RGBA")))
     else:
-        # Если нет альфа-канала, вставляем как есть
-        canvas.paste(sprite, (x, y))
+        raise ValueError(
+            f"Expected sprite, rotation table or numpy array, got {type(sprite)}"
+        )
+
+    blit_anchored(canvas, sprite, cx, ground_y, offset_x=offset_x, offset_y=offset_y)
 
 
 # ── Анимации ──────────────────────────────────────────────────────────────────
 
 
 def animate_idle(
-    sprite: Image.Image,
+    sprite: Union[Image.Image, RotationTable],
     progress: float,  # 0.0–1.0 от длительности паузы
-) -> tuple[Image.Image, int, int, float]:
+) -> tuple[Union[Image.Image, RotationTable], int, int, float]:
     """Лёгкое покачивание в покое. Возвращает (sprite, dx, dy, angle)."""
-    sway = math.sin(progress * math.pi * 2) * 2.0
+    sway = math.sin(progress * math.pi * 2) * IDLE_SWAY_DEG
     bob = abs(math.sin(progress * math.pi * 2)) * 1.5
     return sprite, 0, int(-bob), sway
 
@@ -0,0 +1,173 @@
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+SPRITES_DIR = Path("src/assets/sprites/battle")
+
+SPRITE_SIZE = (200, 360)  # ширина x высота под кадр 480x480
+
+SPRITE_ATLAS_PATH = Path("src/assets/cache/battle_sprites/atlas.npz")
+
+# Поднимать при изменении SPRITE_SIZE, ресемплинга или формата файла
+SPRITE_ATLAS_VERSION = 1
+
+# Колонки индекса: смещение в буфере, h, w. Спрайт i лежит в строке
+# 2 * i, его зеркальная копия — в строке 2 * i + 1
+_INDEX_COLUMNS = 3
+
+
+# ==========================================================
+# Атлас спрайтов бойцов
+# ==========================================================
+# Все png из папок кагуне, уже уменьшенные до SPRITE_SIZE, лежат в
+# одном непрерывном uint8 буфере RGBA вместе с зеркальными копиями.
+# Выбор файла — поиск в словаре папок вместо glob, спрайт — view
+# буфера по таблице смещений, flip — соседняя строка таблицы.
+# Атлас сохраняется на диск и пересобирается, если png поменялись.
+
+
+def _thumbnail(path: Path) -> np.ndarray:
+    img = Image.open(path).convert("RGBA")
+    img.thumbnail(SPRITE_SIZE, Image.Resampling.LANCZOS)
+    return np.asarray(img)
+
+
+def _stamp(path: Path) -> tuple[int, int]:
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+class SpriteAtlas:
+    def __init__(
+        self,
+        buffer: np.ndarray,
+        index: np.ndarray,
+        paths: List[str],
+        stamps: np.ndarray,
+    ):
+        buffer.setflags(write=False)
+        self.buffer = buffer
+        self.index = index
+        self.paths = paths
+        self.stamps = stamps
+
+        self._slots: Dict[str, int] = {path: i for i, path in enumerate(paths)}
+        self._folders: Dict[str, List[Path]] = {}
+        for path in paths:
+            self._folders.setdefault(str(Path(path).parent), []).append(Path(path))
+
+    def __contains__(self, path: str | Path) -> bool:
+        return str(path) in self._slots
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.buffer.nbytes)
+
+    def files(self, folder: str | Path) -> Optional[List[Path]]:
+        """Спрайты папки в порядке sorted(); None — папка не в атласе."""
+        return self._folders.get(str(folder))
+
+    def array(self, path: str | Path, flip: bool = False) -> np.ndarray:
+        """RGBA (h, w, 4) — read-only view буфера, без копирования."""
+        offset, h, w = self.index[2 * self._slots[str(path)] + flip].tolist()
+        return self.buffer[offset : offset + h * w * 4].reshape(h, w, 4)
+
+    def image(self, path: str | Path, flip: bool = False) -> Image.Image:
+        return Image.fromarray(self.array(path, flip), "RGBA")
+
+    def is_fresh(self, root: Path = SPRITES_DIR) -> bool:
+        """Совпадает ли атлас с png на диске (состав, mtime и размер)."""
+        current = sorted(root.rglob("*.png"))
+        if [str(path) for path in current] != self.paths:
+            return False
+        return all(
+            _stamp(path) == tuple(stamp)
+            for path, stamp in zip(current, self.stamps.tolist())
+        )
+
+    def save(self, path: Path = SPRITE_ATLAS_PATH) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as file:
+            np.savez(
+                file,
+                version=SPRITE_ATLAS_VERSION,
+                buffer=self.buffer,
+                index=self.index,
+                paths=np.array(self.paths, dtype=str),
+                stamps=self.stamps,
+            )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path = SPRITE_ATLAS_PATH) -> "SpriteAtlas":
+        with np.load(path, allow_pickle=False) as data:
+            version = int(data["version"])
+            if version != SPRITE_ATLAS_VERSION:
+                raise ValueError(f"Unsupported sprite atlas version: {version}")
+            return cls(
+                buffer=data["buffer"],
+                index=data["index"],
+                paths=[str(p) for p in data["paths"]],
+                stamps=data["stamps"],
+            )
+
+
+def build_sprite_atlas(root: Path = SPRITES_DIR) -> SpriteAtlas:
+    # sorted — порядок glob зависит от ФС, а выбор спрайта повторяется по сиду
+    sources = sorted(root.rglob("*.png"))
+
+    sprites: List[np.ndarray] = []
+    for source in sources:
+        sprite = _thumbnail(source)
+        sprites.extend((sprite, sprite[:, ::-1]))
+
+    index = np.zeros((len(sprites), _INDEX_COLUMNS), dtype=np.int64)
+    offset = 0
+    for i, sprite in enumerate(sprites):
+        index[i] = (offset, sprite.shape[0], sprite.shape[1])
+        offset += sprite.size
+
+    buffer = np.empty(offset, dtype=np.uint8)
+    for sprite, (start, _, _) in zip(sprites, index.tolist()):
+        buffer[start : start + sprite.size] = sprite.reshape(-1)
+
+    stamps = np.array([_stamp(path) for path in sources], dtype=np.int64)
+    return SpriteAtlas(
+        buffer=buffer,
+        index=index,
+        paths=[str(path) for path in sources],
+        stamps=stamps.reshape(len(sources), 2),
+    )
+
+
+def load_or_build_sprite_atlas(
+    path: Path = SPRITE_ATLAS_PATH, root: Path = SPRITES_DIR
+) -> SpriteAtlas:
+    """Атлас с диска, если он актуален, иначе сборка и сохранение."""
+    if path.is_file():
+        try:
+            atlas = SpriteAtlas.load(path)
+            if atlas.is_fresh(root):
+                logger.debug(f"Loaded sprite atlas: {len(atlas)} sprites")
+                return atlas
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Broken sprite atlas, rebuilding: {e}")
+
+    atlas = build_sprite_atlas(root)
+    try:
+        atlas.save(path)
+    except OSError as e:
+        logger.warning(f"Failed to save sprite atlas: {e}")
+
+    logger.info(f"Built sprite atlas: {len(atlas)} sprites, {atlas.nbytes} bytes")
+    return atlas
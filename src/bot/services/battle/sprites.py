@@ -1,17 +1,21 @@
 import random
-from functools import lru_cache
+import threading
 from pathlib import Path
 from typing import Optional
 
 from PIL import Image
 
+from src.bot.services.battle.frame_cache import ByteBudgetCache, FrameCacheStats
 from src.bot.services.battle.models import BattleFighter
+from src.bot.services.battle.sprite_animator import RotationTable
+from src.bot.services.battle.sprite_atlas import (
+    SPRITE_SIZE,
+    SPRITES_DIR,
+    SpriteAtlas,
+    load_or_build_sprite_atlas,
+)
 from src.bot.types import KaguneType
 
-SPRITES_DIR = Path("src/assets/sprites/battle")
-
-SPRITE_SIZE = (200, 360)  # ширина x высота под кадр 480x480
-
 KAGUNE_SPRITES = {
     KaguneType.UKAKU: SPRITES_DIR / "ukaku",
     KaguneType.KOUKAKU: SPRITES_DIR / "koukaku",
@@ -20,23 +24,113 @@ KAGUNE_SPRITES = {
 }
 
 
-@lru_cache(maxsize=32)
-def load_sprite(path: str) -> Image.Image:
+SPRITE_CACHE_MAX_BYTES = 32 * 1024 * 1024
+ROTATION_CACHE_MAX_BYTES = 48 * 1024 * 1024
+
+_sprites: ByteBudgetCache[Image.Image] = ByteBudgetCache(
+    name="battle_sprites",
+    max_bytes=SPRITE_CACHE_MAX_BYTES,
+    sizeof=lambda img: img.width * img.height * 4,
+)
+
+_rotation_tables: ByteBudgetCache[RotationTable] = ByteBudgetCache(
+    name="battle_sprite_rotations",
+    max_bytes=ROTATION_CACHE_MAX_BYTES,
+    sizeof=lambda table: table.estimated_nbytes,
+)
+
+
+_atlas: Optional[SpriteAtlas] = None
+_atlas_lock = threading.Lock()
+
+
+def get_sprite_atlas() -> SpriteAtlas:
+    """Атлас собирается один раз на процесс — при старте или первом бое."""
+    global _atlas
+    if _atlas is None:
+        with _atlas_lock:
+            if _atlas is None:
+                _atlas = load_or_build_sprite_atlas()
+    return _atlas
+
+
+def prewarm_sprites() -> int:
+    return len(get_sprite_atlas())
+
+
+def _load_sprite(path: str) -> Image.Image:
     img = Image.open(path).convert("RGBA")
     img.thumbnail(SPRITE_SIZE, Image.Resampling.LANCZOS)
     return img
 
 
-def get_sprite(
-    fighter: "BattleFighter", flip: bool = False, path: Optional[str] = None
-) -> Image.Image:
-    # любой файл из папки с типом кагуне
+def load_sprite(path: str | Path, flip: bool = False) -> Image.Image:
+    atlas = get_sprite_atlas()
+    if path in atlas:
+        return atlas.image(path, flip)
 
-    path_to_folder = (
-        path or fighter.sprite_path or str(KAGUNE_SPRITES[fighter.kagune_type])
-    )
-    path_to_file = random.choice(list(Path(path_to_folder).glob("*.png")))
-    sprite = load_sprite(path_to_file)
+    # Спрайт вне SPRITES_DIR (явный sprite_path) — по-старому, через кеш
+    sprite = _sprites.get_or_load(str(path), lambda: _load_sprite(path))
     if flip:
         sprite = sprite.transpose(Image.Transpose.FLIP_LEFT_RIGHT)
     return sprite
+
+
+def sprite_cache_stats() -> FrameCacheStats:
+    return _sprites.stats
+
+
+def rotation_cache_stats() -> FrameCacheStats:
+    return _rotation_tables.stats
+
+
+def pick_sprite_file(
+    fighter: "BattleFighter",
+    path: Optional[str] = None,
+    rng: Optional[random.Random] = None,
+) -> Optional[Path]:
+    """
+    Файл спрайта бойца. sprite_path может указывать на папку (тогда
+    файл выбирается случайно через rng) или уже на конкретный файл.
+    """
+    source = Path(
+        path or fighter.sprite_path or KAGUNE_SPRITES[fighter.kagune_type]
+    )
+    atlas = get_sprite_atlas()
+    if source in atlas:
+        return source
+
+    candidates = atlas.files(source)
+    if candidates is None:
+        if source.is_file():
+            return source
+        # sorted — порядок glob зависит от ФС, а выбор должен повторяться по сиду
+        candidates = sorted(source.glob("*.png"))
+    if not candidates:
+        return None
+    return (rng if rng is not None else random).choice(candidates)
+
+
+def _sprite_file(fighter: "BattleFighter", path: Optional[str]) -> Path:
+    path_to_file = pick_sprite_file(fighter, path)
+    if path_to_file is None:
+        raise FileNotFoundError(f"No battle sprites for {fighter.name}")
+    return path_to_file
+
+
+def get_sprite(
+    fighter: "BattleFighter", flip: bool = False, path: Optional[str] = None
+) -> Image.Image:
+    return load_sprite(_sprite_file(fighter, path), flip)
+
+
+def get_sprite_rotations(
+    fighter: "BattleFighter", flip: bool = False, path: Optional[str] = None
+) -> RotationTable:
+    """Таблица поворотов для покачивания — общая для всех боёв с этим спрайтом."""
+    path_to_file = _sprite_file(fighter, path)
+
+    def _build() -> RotationTable:
+        return RotationTable(load_sprite(path_to_file, flip))
+
+    return _rotation_tables.get_or_load((str(path_to_file), flip), _build)
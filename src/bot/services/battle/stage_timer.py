@@ -0,0 +1,107 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterator, List, Optional
+
+# ==========================================================
+# Замеры стадий рендера
+# ==========================================================
+# Рендер размечен вызовами stage("..."). Пока сборщик не включён через
+# collect(), stage() возвращает общий nullcontext — в проде это одна
+# проверка на None. Время считается эксклюзивно: вложенная стадия
+# (текст внутри эффектов) вычитается из родительской.
+
+STAGES = (
+    "clip_decode",
+    "sprite_composite",
+    "text",
+    "hp_bars",
+    "effects",
+    "colorspace",
+    "encode",
+    "mux",
+)
+
+# Стадии из потоков конвейера энкода не привязаны к элементу таймлайна
+PIPELINE_ITEM = "pipeline"
+
+_NOOP = nullcontext()
+
+
+class StageTimer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # item_type -> stage -> [секунды, вызовы]
+        self._totals: Dict[str, Dict[str, List[float]]] = defaultdict(
+            lambda: defaultdict(lambda: [0.0, 0])
+        )
+
+    @contextmanager
+    def measure(self, name: str) -> Iterator[None]:
+        stack = self._stack()
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            children = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            self._add(name, elapsed - children)
+
+    @contextmanager
+    def item(self, item_type: str) -> Iterator[None]:
+        previous = getattr(self._local, "item", None)
+        self._local.item = item_type
+        try:
+            yield
+        finally:
+            self._local.item = previous
+
+    def _stack(self) -> List[float]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _add(self, name: str, seconds: float) -> None:
+        item_type = getattr(self._local, "item", None) or PIPELINE_ITEM
+        with self._lock:
+            total = self._totals[item_type][name]
+            total[0] += seconds
+            total[1] += 1
+
+    def totals(self) -> Dict[str, Dict[str, tuple[float, int]]]:
+        """item_type -> stage -> (секунды, вызовы)."""
+        with self._lock:
+            return {
+                item_type: {name: (t[0], int(t[1])) for name, t in stages.items()}
+                for item_type, stages in self._totals.items()
+            }
+
+
+_active: Optional[StageTimer] = None
+
+
+def stage(name: str):
+    timer = _active
+    return _NOOP if timer is None else timer.measure(name)
+
+
+def item_scope(item_type: str):
+    timer = _active
+    return _NOOP if timer is None else timer.item(item_type)
+
+
+@contextmanager
+def collect() -> Iterator[StageTimer]:
+    """Включает замеры на время блока. Только для бенчмарков."""
+    global _active
+    previous, _active = _active, StageTimer()
+    try:
+        yield _active
+    finally:
+        _active = previous
@@ -0,0 +1,95 @@
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Tuple
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from src.bot.services.battle.stage_timer import stage
+
+# ==========================================================
+# Кеш растеризованного текста
+# ==========================================================
+# FreeType вызывается один раз на (шрифт, строка, anchor) — дальше
+# маска только тонируется цветом и блендится numpy-срезом. Цвет и
+# прозрачность задаются при блите, поэтому фейды не перерисовывают текст.
+
+
+@dataclass(frozen=True)
+class AlphaMask:
+    """Маска uint8 (h, w) и смещение её угла относительно точки привязки."""
+
+    mask: np.ndarray
+    x: int
+    y: int
+
+
+@lru_cache(maxsize=64)
+def load_font(path: str, size: int) -> ImageFont.FreeTypeFont:
+    return ImageFont.truetype(path, size)
+
+
+@lru_cache(maxsize=2048)
+def text_mask(
+    font: ImageFont.FreeTypeFont,
+    text: str,
+    anchor: str = "la",
+) -> AlphaMask:
+    x0, y0, x1, y1 = font.getbbox(text, anchor=anchor)
+    width, height = max(0, x1 - x0), max(0, y1 - y0)
+
+    img = Image.new("L", (width, height), 0)
+    if width and height:
+        ImageDraw.Draw(img).text((-x0, -y0), text, font=font, fill=255, anchor=anchor)
+
+    mask = np.asarray(img)
+    mask.setflags(write=False)
+    return AlphaMask(mask=mask, x=x0, y=y0)
+
+
+def blit_mask(
+    frame: np.ndarray,
+    alpha_mask: AlphaMask,
+    x: int,
+    y: int,
+    color: Tuple[int, int, int],
+    opacity: float = 1.0,
+) -> None:
+    """Тонирует маску цветом и накладывает в точку привязки (x, y)."""
+    if opacity <= 0:
+        return
+
+    mx, my = x + alpha_mask.x, y + alpha_mask.y
+    mh, mw = alpha_mask.mask.shape
+    fh, fw = frame.shape[:2]
+
+    x0, y0 = max(mx, 0), max(my, 0)
+    x1, y1 = min(mx + mw, fw), min(my + mh, fh)
+    if x1 <= x0 or y1 <= y0:
+        return
+
+    alpha = alpha_mask.mask[y0 - my : y1 - my, x0 - mx : x1 - mx, None].astype(
+        np.uint16
+    )
+    if opacity < 1.0:
+        alpha = (alpha * int(opacity * 255) + 127) // 255
+
+    region = frame[y0:y1, x0:x1]
+    ink = np.asarray(color, dtype=np.uint16)
+    region[:] = (region * (255 - alpha) + ink * alpha + 127) // 255
+
+
+def draw_text(
+    frame: np.ndarray,
+    xy: Tuple[int, int],
+    text: str,
+    font: ImageFont.FreeTypeFont,
+    color: Tuple[int, int, int],
+    anchor: str = "la",
+    opacity: float = 1.0,
+) -> None:
+    """Аналог ImageDraw.text для numpy-кадра."""
+    if not text:
+        return
+    with stage("text"):
+        blit_mask(frame, text_mask(font, text, anchor), xy[0], xy[1], color, opacity)
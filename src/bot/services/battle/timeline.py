@@ -1,4 +1,6 @@
-from typing import List
+import random
+from dataclasses import replace
+from typing import List, Optional
 
 from src.bot.services.battle.mechanics import BattleResult
 from src.bot.services.battle.models import (
@@ -6,6 +8,40 @@ from src.bot.services.battle.models import (
     TimelineEvent,
     TimelineEventData,
 )
+from src.bot.services.battle.sprites import pick_sprite_file
+
+# В режиме хайлайтов остаются первый размен, эти события и добивание
+HIGHLIGHT_EVENTS = ("crit", "regen")
+FIRST_EXCHANGE_ATTACKS = 2
+
+
+def select_highlights(timeline: List[TimelineEvent]) -> List[TimelineEvent]:
+    """
+    Сжимает таймлайн до первого размена, критов, регенов и последнего
+    удара. Пропущенные раунды просто выпадают: пауза перед следующим
+    показанным событием рисует HP уже после них, и полоски прыгают.
+    """
+    event_indices = [
+        i for i, item in enumerate(timeline) if item.data.battle_event is not None
+    ]
+    if not event_indices:
+        return list(timeline)
+
+    attacks = [i for i in event_indices if timeline[i].type != "regen"]
+    keep = set(attacks[:FIRST_EXCHANGE_ATTACKS])
+    keep.update(i for i in event_indices if timeline[i].type in HIGHLIGHT_EVENTS)
+    keep.add(event_indices[-1])
+
+    highlights: List[TimelineEvent] = []
+    for i, item in enumerate(timeline):
+        if item.type in ("intro", "outro"):
+            highlights.append(item)
+        elif i in keep:
+            # У каждого события своя пауза прямо перед ним
+            if i > 0 and timeline[i - 1].type == "pause":
+                highlights.append(timeline[i - 1])
+            highlights.append(item)
+    return highlights
 
 
 class BattleTimelineBuilder:
@@ -14,9 +50,15 @@ class BattleTimelineBuilder:
         left: BattleFighter,
         right: BattleFighter,
         result: BattleResult,
+        rng: Optional[random.Random] = None,
     ) -> List[TimelineEvent]:
         events: List[TimelineEvent] = []
 
+        # Спрайт выбирается здесь, а не при рендере — тогда таймлайн
+        # (и его сериализация для render farm) полностью определён сидом
+        left = self._with_sprite(left, rng)
+        right = self._with_sprite(right, rng)
+
         left_hp = left.max_hp
         right_hp = right.max_hp
 
@@ -115,3 +157,13 @@ class BattleTimelineBuilder:
         )
 
         return events
+
+    @staticmethod
+    def _with_sprite(
+        fighter: BattleFighter, rng: Optional[random.Random]
+    ) -> BattleFighter:
+        """Копия бойца с выбранным файлом спрайта; входной боец не меняется."""
+        sprite_file = pick_sprite_file(fighter, rng=rng)
+        if sprite_file is None:
+            return fighter
+        return replace(fighter, sprite_path=str(sprite_file))
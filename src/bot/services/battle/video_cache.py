@@ -0,0 +1,163 @@
+import asyncio
+import hashlib
+import json
+import logging
+import shutil
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from src.bot.services.battle.compiled_timeline import FPS
+from src.bot.services.battle.generator import RENDERER_VERSION
+from src.bot.services.battle.models import TimelineEvent
+from src.bot.services.battle.renderer import H, W
+from src.bot.services.file_id_cache import CachedFile, FileIdCache
+
+logger = logging.getLogger(__name__)
+
+VIDEO_CACHE_DIR = Path("src/assets/cache/battle_videos")
+VIDEO_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# Записей только с file_id (файл уже вытеснен) — они почти ничего не весят
+VIDEO_CACHE_MAX_ENTRIES = 20_000
+
+# Как часто изменённый индекс сбрасывается на диск, секунды
+VIDEO_CACHE_FLUSH_INTERVAL = 30.0
+
+
+# ==========================================================
+# Кеш готовых видео боёв
+# ==========================================================
+# Ключ — хэш того, что видно в кадре: бойцы, переходы HP, типы
+# событий и длительности, плюс версия рендера и разрешение. Хранение
+# file_id и MP4, LRU по диску и запись индекса — в FileIdCache.
+
+
+def timeline_fingerprint(
+    timeline: List[TimelineEvent],
+    width: int = W,
+    height: int = H,
+    fps: int = FPS,
+    renderer_version: int = RENDERER_VERSION,
+) -> str:
+    fighters: Dict[int, int] = {}
+    fighter_rows: List[list] = []
+
+    def ref(fighter) -> Optional[int]:
+        if fighter is None:
+            return None
+        if id(fighter) not in fighters:
+            fighters[id(fighter)] = len(fighter_rows)
+            fighter_rows.append(
+                [
+                    fighter.name,
+                    fighter.kagune_type.name,
+                    fighter.max_hp,
+                    fighter.sprite_path,
+                ]
+            )
+        return fighters[id(fighter)]
+
+    items = []
+    for item in timeline:
+        data = item.data
+        event = data.battle_event
+        items.append(
+            [
+                item.type,
+                item.duration,
+                ref(data.left),
+                ref(data.right),
+                data.left_hp_before,
+                data.right_hp_before,
+                data.left_hp_after,
+                data.right_hp_after,
+                data.attacker_left,
+                ref(data.winner),
+                data.is_draw,
+                None
+                if event is None
+                else [
+                    event.type,
+                    ref(event.attacker),
+                    ref(event.defender),
+                    event.hp_delta_attacker,
+                    event.hp_delta_defender,
+                ],
+            ]
+        )
+
+    raw = json.dumps(
+        [renderer_version, width, height, fps, fighter_rows, items],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+CachedBattleVideo = CachedFile
+
+
+class BattleVideoCache(FileIdCache):
+    def __init__(
+        self,
+        cache_dir: Path = VIDEO_CACHE_DIR,
+        max_bytes: int = VIDEO_CACHE_MAX_BYTES,
+        max_entries: int = VIDEO_CACHE_MAX_ENTRIES,
+    ):
+        super().__init__(
+            name="battle video",
+            cache_dir=cache_dir,
+            max_bytes=max_bytes,
+            max_entries=max_entries,
+            flush_interval=VIDEO_CACHE_FLUSH_INTERVAL,
+        )
+        self._render_locks: Dict[str, asyncio.Lock] = {}
+
+    def key(self, timeline: List[TimelineEvent]) -> str:
+        return timeline_fingerprint(timeline)
+
+    def put_file(self, key: str, source: str | Path) -> Path:
+        """Регистрирует отрендеренный файл, переносит его в кеш при необходимости."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        target = self.path_for(key)
+        source = Path(source)
+        if source.resolve() != target.resolve():
+            shutil.move(str(source), target)
+        self._add_file(key, target)
+        return target
+
+    async def get_or_render(
+        self,
+        timeline: List[TimelineEvent],
+        render: Callable[[List[TimelineEvent], Path], Awaitable[Path]],
+    ) -> CachedBattleVideo:
+        """
+        Отдаёт видео из кеша или рендерит его один раз. Одновременные
+        запросы одного боя ждут первый рендер, а не запускают свои.
+        """
+        key = self.key(timeline)
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+
+        lock = self._render_locks.setdefault(key, asyncio.Lock())
+        try:
+            async with lock:
+                # Пока ждали лок, бой мог отрендерить соседний запрос
+                cached = self._get(key, record=False)
+                if cached is not None:
+                    return cached
+
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                tmp_path = self.cache_dir / f"{key}.tmp.mp4"
+                try:
+                    rendered = await render(timeline, tmp_path)
+                    path = self.put_file(key, rendered)
+                finally:
+                    tmp_path.unlink(missing_ok=True)
+
+                logger.info(f"Battle video cached: {key}")
+                return CachedBattleVideo(key=key, path=path)
+        finally:
+            if not lock.locked():
+                self._render_locks.pop(key, None)
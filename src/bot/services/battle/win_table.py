@@ -0,0 +1,211 @@
+import itertools
+import logging
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+
+from src.bot.services.battle.models import BattleFighter
+from src.bot.services.battle.monte_carlo import MonteCarloSimulator
+from src.bot.types import KaguneType
+
+logger = logging.getLogger(__name__)
+
+WIN_TABLE_PATH = Path("src/assets/data/battle_win_table.npz")
+WIN_TABLE_VERSION = 1
+
+# Оси таблицы — log2 отношения характеристик левого к правому.
+# "power" — не чистая атака: strength и kagune_strength входят и в урон,
+# и в защиту (BattleMechanics._calculate_damage), а развести их через
+# эти два стата нельзя — система почти вырождена. Ось масштабирует оба
+# стата разом, то есть атаку и защиту вместе; вопрос «что даёт одна
+# атака» таблица не решает
+FEATURES = ("hp", "power", "speed", "dexterity")
+LOG2_LIMIT = 2.0  # перевес больше чем в 4 раза упирается в край таблицы
+LOG2_STEP = 0.5
+FIGHTS_PER_CELL = 512
+
+# Правый боец в каждой ячейке — эталон, левый — эталон со сдвинутыми статами
+REFERENCE = BattleFighter(
+    name="reference",
+    hp=1000,
+    max_hp=1000,
+    kagune_type=KaguneType.RINKAKU,
+    strength=50,
+    dexterity=40,
+    speed=35,
+    kagune_strength=60,
+    regeneration=20,
+)
+
+
+# ==========================================================
+# Шанс победы по таблице
+# ==========================================================
+# Шанс считается офлайн MonteCarloSimulator (те же правила, что
+# BattleMechanics) на сетке отношений статов для каждой пары кагуне.
+# Онлайн — только индекс в массиве: превью в инлайн-клавиатуре не
+# ждёт симуляции. Урон в механике зависит и от абсолютных статов,
+# так что таблица точна для бойцов порядка эталона.
+#
+# Таблица собирается src/bot/utils/build_battle_win_table.py и лежит
+# в репозитории; после изменения механики её нужно пересобрать.
+
+
+def _attack(fighter: BattleFighter) -> float:
+    return fighter.strength * 0.8 + fighter.kagune_strength * 1.2
+
+
+def _defense(fighter: BattleFighter) -> float:
+    return fighter.strength * 0.3 + fighter.kagune_strength * 0.5
+
+
+def _features(fighter: BattleFighter) -> np.ndarray:
+    return np.array(
+        [
+            # Реген разовый — считаем его прибавкой к запасу HP
+            fighter.max_hp + fighter.regeneration * 10,
+            # Среднее геометрическое атаки и защиты: у эталона со
+            # сдвинутой осью power обе меняются в одно и то же число раз
+            (_attack(fighter) * _defense(fighter)) ** 0.5,
+            fighter.speed,
+            fighter.dexterity,
+        ],
+        dtype=np.float64,
+    )
+
+
+def stat_ratios(left: BattleFighter, right: BattleFighter) -> np.ndarray:
+    """log2 отношения характеристик левого бойца к правому."""
+    return np.log2(np.maximum(_features(left), 1) / np.maximum(_features(right), 1))
+
+
+def _scaled_fighter(
+    base: BattleFighter, log2_ratios: Sequence[float], kagune: KaguneType
+) -> BattleFighter:
+    hp, power, speed, dexterity = (2.0**r for r in log2_ratios)
+    max_hp = max(1, round(base.max_hp * hp))
+    return BattleFighter(
+        name=base.name,
+        hp=max_hp,
+        max_hp=max_hp,
+        kagune_type=kagune,
+        strength=max(1, round(base.strength * power)),
+        dexterity=max(1, round(base.dexterity * dexterity)),
+        speed=max(1, round(base.speed * speed)),
+        kagune_strength=max(1, round(base.kagune_strength * power)),
+        regeneration=max(1, round(base.regeneration * hp)),
+    )
+
+
+@dataclass(frozen=True)
+class WinProbabilityTable:
+    # [левое кагуне, правое кагуне, hp, power, speed, dexterity]
+    win: np.ndarray
+    axis: np.ndarray
+    kagunes: tuple[str, ...]
+    fights_per_cell: int
+
+    def probability(
+        self,
+        left: BattleFighter,
+        right: BattleFighter,
+        interpolate: bool = True,
+    ) -> float:
+        """Шанс победы левого бойца (ничья — половина)."""
+        cells = self.win[
+            self.kagunes.index(left.kagune_type.name),
+            self.kagunes.index(right.kagune_type.name),
+        ]
+
+        step = self.axis[1] - self.axis[0]
+        last = self.axis.size - 1
+        position = (stat_ratios(left, right) - self.axis[0]) / step
+        position = np.clip(position, 0, last)
+
+        if not interpolate:
+            return float(cells[tuple(np.rint(position).astype(int))])
+
+        # Полилинейная интерполяция по 2^4 соседним ячейкам
+        low = np.minimum(np.floor(position).astype(int), last - 1)
+        frac = position - low
+        result = 0.0
+        for corner in itertools.product((0, 1), repeat=len(FEATURES)):
+            weight = np.prod(np.where(corner, frac, 1 - frac))
+            if weight:
+                result += weight * cells[tuple(low + corner)]
+        return float(result)
+
+    def save(self, path: Path = WIN_TABLE_PATH) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as file:
+            np.savez(
+                file,
+                version=WIN_TABLE_VERSION,
+                win=self.win,
+                axis=self.axis,
+                kagunes=np.array(self.kagunes),
+                fights_per_cell=self.fights_per_cell,
+            )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load_optional(
+        cls, path: Path = WIN_TABLE_PATH
+    ) -> Optional["WinProbabilityTable"]:
+        """Таблица с диска или None, если её нет или она устарела."""
+        try:
+            return cls.load(path)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Battle win table is unavailable: {e}")
+            return None
+
+    @classmethod
+    def load(cls, path: Path = WIN_TABLE_PATH) -> "WinProbabilityTable":
+        with np.load(path, allow_pickle=False) as data:
+            version = int(data["version"])
+            if version != WIN_TABLE_VERSION:
+                raise ValueError(f"Unsupported win table version: {version}")
+            return cls(
+                win=data["win"],
+                axis=data["axis"],
+                kagunes=tuple(str(name) for name in data["kagunes"]),
+                fights_per_cell=int(data["fights_per_cell"]),
+            )
+
+
+def build_win_table(
+    fights_per_cell: int = FIGHTS_PER_CELL,
+    rng: np.random.Generator | int | None = None,
+    kagunes: Sequence[KaguneType] = tuple(KaguneType),
+    limit: float = LOG2_LIMIT,
+    step: float = LOG2_STEP,
+    simulator: Optional[MonteCarloSimulator] = None,
+) -> WinProbabilityTable:
+    simulator = simulator or MonteCarloSimulator()
+    rng = np.random.default_rng(rng)
+    axis = np.arange(-limit, limit + step / 2, step)
+
+    shape = (len(kagunes), len(kagunes)) + (axis.size,) * len(FEATURES)
+    win = np.empty(shape, dtype=np.float32)
+
+    for (i, left_kagune), (j, right_kagune) in itertools.product(
+        enumerate(kagunes), repeat=2
+    ):
+        right = _scaled_fighter(REFERENCE, (0.0,) * len(FEATURES), right_kagune)
+        for cell in np.ndindex(*shape[2:]):
+            left = _scaled_fighter(REFERENCE, axis[list(cell)], left_kagune)
+            result = simulator.simulate(left, right, fights_per_cell, rng)
+            win[(i, j) + cell] = (result.left_wins + 0.5 * result.draws) / result.n
+
+        logger.info(f"Win table: {left_kagune.name} vs {right_kagune.name} done")
+
+    return WinProbabilityTable(
+        win=win,
+        axis=axis,
+        kagunes=tuple(kagune.name for kagune in kagunes),
+        fights_per_cell=fights_per_cell,
+    )
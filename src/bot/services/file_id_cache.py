@@ -0,0 +1,253 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from aiogram.types import FSInputFile
+
+logger = logging.getLogger(__name__)
+
+
+# ==========================================================
+# Кеш отправленных файлов: Telegram file_id + файл на диске
+# ==========================================================
+# По ключу хранится file_id (повторная отправка без загрузки) и, в
+# пределах бюджета на диск, сам файл как запасной вариант. Файлы
+# вытесняются по LRU, file_id остаются; записей не больше max_entries.
+#
+# Индекс живёт в памяти: чтения и записи только помечают его изменённым,
+# а на диск он уходит из фоновой задачи autosave (в отдельном потоке) и
+# при остановке бота. После падения теряется не больше интервала записи:
+# пропавшие файлы get() сам вычёркивает из индекса.
+
+
+@dataclass
+class CachedFile:
+    key: str
+    file_id: Optional[str] = None
+    path: Optional[Path] = None
+
+    @property
+    def media(self) -> str | FSInputFile:
+        """Что передать в send_video/reply_animation: file_id, если уже загружали."""
+        if self.file_id:
+            return self.file_id
+        return FSInputFile(self.path)
+
+
+@dataclass
+class FileIdCacheStats:
+    name: str
+    file_id_hits: int
+    disk_hits: int
+    misses: int
+    evictions: int
+    entries: int
+    files: int
+    bytes: int
+    max_bytes: int
+
+    @property
+    def hit_rate(self) -> float:
+        hits = self.file_id_hits + self.disk_hits
+        total = hits + self.misses
+        return hits / total if total else 0.0
+
+
+class FileIdCache:
+    def __init__(
+        self,
+        name: str,
+        cache_dir: Path,
+        max_bytes: int,
+        max_entries: int,
+        flush_interval: float,
+        suffix: str = ".mp4",
+    ):
+        self.name = name
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.flush_interval = flush_interval
+        self.suffix = suffix
+        self._index_path = self.cache_dir / "index.json"
+
+        self._lock = threading.Lock()
+        # Запись файла индекса — не под _lock, чтобы не держать читателей
+        self._write_lock = threading.Lock()
+        self._dirty = False
+        self._entries: Dict[str, Dict[str, Any]] = self._load_index()
+
+        self._file_id_hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    # ======================================================
+    # Чтение
+    # ======================================================
+
+    def path_for(self, key: str, suffix: Optional[str] = None) -> Path:
+        return self.cache_dir / f"{key}{suffix or self.suffix}"
+
+    def _entry_path(self, key: str, entry: Dict[str, Any]) -> Path:
+        return self.path_for(key, entry.get("suffix"))
+
+    def get(self, key: str) -> Optional[CachedFile]:
+        return self._get(key, record=True)
+
+    def _get(self, key: str, record: bool) -> Optional[CachedFile]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += record
+                return None
+
+            path = self._entry_path(key, entry) if entry.get("size") else None
+            if path is not None and not path.is_file():
+                # Файл удалили руками — запись о нём больше не верна
+                entry["size"] = 0
+                path = None
+
+            if not entry.get("file_id") and path is None:
+                del self._entries[key]
+                self._misses += record
+                self._dirty = True
+                return None
+
+            if entry.get("file_id"):
+                self._file_id_hits += record
+            else:
+                self._disk_hits += record
+
+            entry["last_used"] = time.time()
+            self._dirty = True
+            return CachedFile(key=key, file_id=entry.get("file_id"), path=path)
+
+    # ======================================================
+    # Запись
+    # ======================================================
+
+    def _add_file(self, key: str, path: Path) -> None:
+        """Записывает в индекс файл, уже лежащий по path_for(key, path.suffix)."""
+        with self._lock:
+            entry = self._entries.setdefault(key, {})
+            entry["suffix"] = path.suffix
+            entry["size"] = path.stat().st_size
+            entry["last_used"] = time.time()
+            self._evict_locked(keep=key)
+            self._dirty = True
+
+    def set_file_id(self, key: str, file_id: str) -> None:
+        """Вызывается после первой отправки — дальше файл не грузится заново."""
+        with self._lock:
+            entry = self._entries.setdefault(key, {})
+            entry["file_id"] = file_id
+            entry["last_used"] = time.time()
+            self._evict_locked(keep=key)
+            self._dirty = True
+
+    def forget_file_id(self, key: str) -> None:
+        """Вычёркивает file_id, который Telegram больше не принимает."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or "file_id" not in entry:
+                return
+            del entry["file_id"]
+            if not entry.get("size"):
+                del self._entries[key]
+            self._dirty = True
+
+    # ======================================================
+    # Вытеснение и индекс
+    # ======================================================
+
+    def _evict_locked(self, keep: Optional[str] = None) -> None:
+        used = sum(entry.get("size", 0) for entry in self._entries.values())
+        by_age = sorted(
+            self._entries.items(), key=lambda kv: kv[1].get("last_used", 0)
+        )
+
+        for key, entry in by_age:
+            if used <= self.max_bytes:
+                break
+            if key == keep or not entry.get("size"):
+                continue
+            self._entry_path(key, entry).unlink(missing_ok=True)
+            used -= entry["size"]
+            entry["size"] = 0
+            self._evictions += 1
+            logger.debug(f"Evicted {self.name} {key}")
+
+        # Записи без файла и без file_id бесполезны; лишние — самые старые
+        for key, entry in by_age:
+            if key == keep:
+                continue
+            useless = not entry.get("size") and not entry.get("file_id")
+            if useless or len(self._entries) > self.max_entries:
+                if entry.get("size"):
+                    self._entry_path(key, entry).unlink(missing_ok=True)
+                self._entries.pop(key)
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        if not self._index_path.is_file():
+            return {}
+        try:
+            return json.loads(self._index_path.read_text())
+        except (OSError, ValueError) as e:
+            logger.warning(f"Broken {self.name} index, starting empty: {e}")
+            return {}
+
+    def flush(self) -> bool:
+        """Пишет индекс на диск, если он менялся. Блокирующий."""
+        with self._write_lock:
+            with self._lock:
+                if not self._dirty:
+                    return False
+                raw = json.dumps(self._entries)
+                self._dirty = False
+
+            try:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                tmp = self._index_path.with_name(self._index_path.name + ".tmp")
+                tmp.write_text(raw)
+                os.replace(tmp, self._index_path)
+            except OSError:
+                with self._lock:
+                    self._dirty = True
+                raise
+            return True
+
+    async def autosave(self, interval: Optional[float] = None) -> None:
+        """Фоновая задача: сбрасывает индекс раз в interval секунд и при отмене."""
+        interval = interval or self.flush_interval
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    await asyncio.to_thread(self.flush)
+                except OSError as e:
+                    logger.warning(f"Failed to save {self.name} index: {e}")
+        finally:
+            self.flush()
+
+    @property
+    def stats(self) -> FileIdCacheStats:
+        with self._lock:
+            sizes = [entry.get("size", 0) for entry in self._entries.values()]
+            return FileIdCacheStats(
+                name=self.name,
+                file_id_hits=self._file_id_hits,
+                disk_hits=self._disk_hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                entries=len(self._entries),
+                files=sum(1 for size in sizes if size),
+                bytes=sum(sizes),
+                max_bytes=self.max_bytes,
+            )
@@ -1,6 +1,6 @@
-import asyncio
 import logging
 import random
+from pathlib import Path
 
 from aiogram.exceptions import TelegramBadRequest
 from aiogram.types import FSInputFile, Message
@@ -11,7 +11,9 @@ from ...repositories.lottery import LotteryRepository
 from ...services.cooldown import CooldownService
 from ...services.dialog import DialogService
 from ...services.ghoul import GhoulService
+from ...services.lottery_pool import LotteryPoolIndex
 from ...services.media import MediaService
+from ...services.scheduler import DelayedActionScheduler
 from ...services.user import UserService
 from ...types.dep import DepColor, DepResult
 
@@ -35,6 +37,8 @@ class LotteryService:
         cooldown_service: CooldownService,
         user_service: UserService,
         lottery_repository: LotteryRepository,
+        lottery_pool: LotteryPoolIndex,
+        scheduler: DelayedActionScheduler,
     ):
         self.media_service = media_service
         self.ghoul_service = ghoul_service
@@ -42,6 +46,8 @@ class LotteryService:
         self.cooldown_service = cooldown_service
         self.user_service = user_service
         self.lottery_repository = lottery_repository
+        self.lottery_pool = lottery_pool
+        self.scheduler = scheduler
 
     async def execute(
         self, user_id: int, chosen_color: DepColor, bet_amount: int
@@ -81,10 +87,8 @@ class LotteryService:
             )
 
         folder_name = COLOR_TO_FOLDER.get(winning_color.value, "red")
-        video_path = await self.media_service.get_random_lottery_video(
-            color_folder=folder_name
-        )
-        video_file_id = None
+        video = self.lottery_pool.pick(folder_name)
+        video_file_id = video.file_id if video else None
 
         lottery_record = await self.lottery_repository.insert(
             telegram_id=user_id,
@@ -105,6 +109,7 @@ class LotteryService:
             is_won=is_won,
             earned=earned if is_won else -bet_amount,
             video_file_id=video_file_id,
+            video_path=video.path if video else None,
         )
 
     def _get_random_color_by_chance(self) -> DepColor:
@@ -117,6 +122,12 @@ class LotteryService:
         chosen_color_str = random.choices(colors, weights=chances, k=1)[0]
         return DepColor(chosen_color_str)
 
+    def _remember_file_id(self, video_path: Path, file_id: str) -> None:
+        for entry in self.lottery_pool.entries():
+            if entry.path == video_path:
+                self.lottery_pool.set_file_id(entry, file_id)
+                return
+
     def parse_color(self, color_str: str) -> DepColor:
         color_str = color_str.lower().strip()
 
@@ -131,35 +142,15 @@ class LotteryService:
     async def send_answer(
         self, message: Message, dep_result: DepResult
     ) -> Message | None:
-        folder_name = COLOR_TO_FOLDER.get(dep_result.winning_color.value, "red")
-        video_path = await self.media_service.get_random_lottery_video(
-            color_folder=folder_name
-        )
+        video_path = dep_result.video_path
+
+        # Текст собирается сейчас, пока сессия с пользователем жива
+        text = self._result_text(dep_result)
 
         if not video_path:
-            if dep_result.is_won:
-                multiplier = LOTTERY_CONFIG.get_multiplier(
-                    dep_result.winning_color.value
-                )
-                text = self.dialog_service.text(
-                    key="lottery_win",
-                    chosen_color=dep_result.chosen_color.value,
-                    winning_color=dep_result.winning_color.value,
-                    bet=dep_result.bet_amount,
-                    earned=dep_result.earned,
-                    balance=dep_result.user.balance,
-                    multiplier=f"{multiplier}x",
-                )
-            else:
-                text = self.dialog_service.text(
-                    key="lottery_lose",
-                    chosen_color=dep_result.chosen_color.value,
-                    winning_color=dep_result.winning_color.value,
-                    bet=dep_result.bet_amount,
-                    balance=dep_result.user.balance,
-                )
             return await message.reply(text=text)
 
+        uploaded = not dep_result.video_file_id
         try:
             if dep_result.video_file_id:
                 video_message = await message.reply_animation(
@@ -171,26 +162,35 @@ class LotteryService:
                 )
 
         except TelegramBadRequest:
+            # Протухший file_id — грузим файл заново и запоминаем новый
             video_message = await message.reply_animation(
                 animation=FSInputFile(video_path)
             )
+            uploaded = True
 
             if not video_message.animation:
                 raise
 
-            await self.media_service.update_telegram_file_id(
-                path=str(video_path), new_file_id=video_message.animation.file_id
-            )
+        if uploaded and video_message.animation:
+            self._remember_file_id(video_path, video_message.animation.file_id)
 
         animation_duration = (
             video_message.animation.duration if video_message.animation else 2
         )
 
-        await asyncio.sleep(animation_duration + 1)
+        # Итог приходит после анимации, но хендлер не ждёт его — иначе
+        # сессия БД висела бы открытой всё время проигрывания
+        self.scheduler.schedule(
+            animation_duration + 1,
+            lambda: message.reply(text=text),
+            name=f"lottery_result:{message.chat.id}:{message.message_id}",
+        )
+        return video_message
 
+    def _result_text(self, dep_result: DepResult) -> str:
         if dep_result.is_won:
             multiplier = LOTTERY_CONFIG.get_multiplier(dep_result.winning_color.value)
-            text = self.dialog_service.text(
+            return self.dialog_service.text(
                 key="lottery_win",
                 chosen_color=dep_result.chosen_color.value,
                 winning_color=dep_result.winning_color.value,
@@ -199,16 +199,14 @@ class LotteryService:
                 balance=dep_result.user.balance,
                 multiplier=f"{multiplier}x",
             )
-        else:
-            text = self.dialog_service.text(
-                key="lottery_lose",
-                chosen_color=dep_result.chosen_color.value,
-                winning_color=dep_result.winning_color.value,
-                bet=dep_result.bet_amount,
-                balance=dep_result.user.balance,
-            )
 
-        return await message.reply(text=text)
+        return self.dialog_service.text(
+            key="lottery_lose",
+            chosen_color=dep_result.chosen_color.value,
+            winning_color=dep_result.winning_color.value,
+            bet=dep_result.bet_amount,
+            balance=dep_result.user.balance,
+        )
 
 
 __all__ = ["LotteryService"]
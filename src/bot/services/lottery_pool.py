@@ -0,0 +1,431 @@
+import asyncio
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import av
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError, TelegramRetryAfter
+from aiogram.types import FSInputFile
+
+from src.bot.services.lottery_video_genertor import LotteryGenerator
+
+logger = logging.getLogger(__name__)
+
+LOTTERY_POOL_DIR = Path("src/assets/videos/lottery")
+LOTTERY_MANIFEST = "manifest.json"
+LOTTERY_MANIFEST_VERSION = 1
+LOTTERY_FILE_IDS = "file_ids.json"
+
+# Как часто бот проверяет, не пересобран ли пул
+LOTTERY_INDEX_REFRESH_INTERVAL = 30.0
+
+VIDEOS_PER_COLOR = 10
+
+# Те же форматы, что принимал прежний поиск видео по папкам
+LOTTERY_VIDEO_SUFFIXES = (".mp4", ".gif", ".webm", ".mov")
+
+# Недописанный файл — не видео по суффиксу, поэтому пул его не увидит
+PARTIAL_SUFFIX = ".part"
+
+
+# ==========================================================
+# Пул лотерейных видео
+# ==========================================================
+# Видео рендерятся в пуле процессов: каждое пишется во временный
+# *.part и переименовывается в .mp4 только целиком. Готовые видео
+# записываются в manifest.json (длительность, размер, sha256) сразу
+# по мере готовности — прерванная сборка продолжается с того же
+# места. Пул добирается до нужного числа видео на цвет, а rebuild
+# перерисовывает всё после правок стиля.
+
+
+@dataclass
+class LotteryVideo:
+    color: str
+    path: str  # относительно корня пула
+    duration: float
+    size: int
+    sha256: str
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _probe_duration(path: Path) -> float:
+    """Длительность в секундах; бросает исключение на битом файле."""
+    with av.open(str(path)) as container:
+        if not container.streams.video or not container.duration:
+            raise ValueError(f"No video in {path}")
+        return container.duration / av.time_base
+
+
+def _describe(root: Path, color: str, path: Path) -> LotteryVideo:
+    return LotteryVideo(
+        color=color,
+        path=path.relative_to(root).as_posix(),
+        duration=_probe_duration(path),
+        size=path.stat().st_size,
+        sha256=_sha256(path),
+    )
+
+
+def _render_video(
+    root: str, color: str, name: str, options: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Точка входа воркера: рендер во временный файл и атомарная подмена."""
+    root_path = Path(root)
+    target = root_path / color / name
+    partial = target.with_name(target.name + PARTIAL_SUFFIX)
+
+    try:
+        LotteryGenerator(output_dir=root, **options).generate_video(
+            color, str(partial)
+        )
+        with open(partial, "rb") as file:
+            os.fsync(file.fileno())
+        video = _describe(root_path, color, partial)
+        os.replace(partial, target)
+    finally:
+        partial.unlink(missing_ok=True)
+
+    video.path = target.relative_to(root_path).as_posix()
+    return asdict(video)
+
+
+class LotteryPoolManifest:
+    def __init__(self, root: Path = LOTTERY_POOL_DIR):
+        self.root = Path(root)
+        self.path = self.root / LOTTERY_MANIFEST
+        self.videos: Dict[str, LotteryVideo] = self._load()
+
+    def _load(self) -> Dict[str, LotteryVideo]:
+        if not self.path.is_file():
+            return {}
+        try:
+            data = json.loads(self.path.read_text())
+            if data.get("version") != LOTTERY_MANIFEST_VERSION:
+                raise ValueError(f"Unsupported manifest version: {data.get('version')}")
+            return {
+                entry["path"]: LotteryVideo(**entry) for entry in data["videos"]
+            }
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Broken lottery manifest, rescanning pool: {e}")
+            return {}
+
+    def save(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        data = {
+            "version": LOTTERY_MANIFEST_VERSION,
+            "videos": [asdict(video) for _, video in sorted(self.videos.items())],
+        }
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2))
+        os.replace(tmp, self.path)
+
+    def add(self, video: LotteryVideo) -> None:
+        self.videos[video.path] = video
+
+    def by_color(self, color: str) -> List[LotteryVideo]:
+        return [video for video in self.videos.values() if video.color == color]
+
+    def is_intact(self, video: LotteryVideo, verify_checksum: bool = False) -> bool:
+        file = self.root / video.path
+        if not file.is_file() or file.stat().st_size != video.size:
+            return False
+        return not verify_checksum or _sha256(file) == video.sha256
+
+
+class LotteryPoolBuilder:
+    def __init__(
+        self,
+        root: str | Path = LOTTERY_POOL_DIR,
+        videos_per_color: int = VIDEOS_PER_COLOR,
+        workers: Optional[int] = None,
+        generator_options: Optional[Dict[str, Any]] = None,
+        colors: Optional[List[str]] = None,
+    ):
+        self.root = Path(root)
+        self.videos_per_color = videos_per_color
+        self.workers = workers or os.cpu_count()
+        self.generator_options = generator_options or {}
+        self.colors = colors or list(LotteryGenerator.colors)
+        self.manifest = LotteryPoolManifest(self.root)
+
+    def reconcile(self, verify_checksums: bool = False) -> None:
+        """
+        Сверяет манифест с диском: убирает записи о пропавших и
+        изменившихся файлах, удаляет недописанные *.part и принимает
+        в манифест целые видео, записанные старым генератором или
+        положенные в папки цветов руками.
+        """
+        for path, video in list(self.manifest.videos.items()):
+            if not self.manifest.is_intact(video, verify_checksums):
+                logger.warning(f"Lottery video changed or missing: {path}")
+                del self.manifest.videos[path]
+
+        for color in self.colors:
+            color_dir = self.root / color
+            if not color_dir.is_dir():
+                continue
+            for file in sorted(color_dir.iterdir()):
+                if file.name.endswith(PARTIAL_SUFFIX):
+                    file.unlink(missing_ok=True)
+                    continue
+                relative = file.relative_to(self.root).as_posix()
+                if (
+                    file.suffix.lower() not in LOTTERY_VIDEO_SUFFIXES
+                    or relative in self.manifest.videos
+                ):
+                    continue
+                try:
+                    self.manifest.add(_describe(self.root, color, file))
+                except Exception as e:
+                    logger.warning(f"Removing broken lottery video {file}: {e}")
+                    file.unlink(missing_ok=True)
+
+        self.manifest.save()
+
+    def _free_names(self, color: str, count: int) -> List[str]:
+        taken = {Path(video.path).name for video in self.manifest.by_color(color)}
+        names: List[str] = []
+        index = 1
+        while len(names) < count:
+            name = f"{color}_{index:03d}.mp4"
+            if name not in taken:
+                names.append(name)
+            index += 1
+        return names
+
+    def plan(self, rebuild: bool = False) -> List[tuple[str, str]]:
+        """Список (цвет, имя файла), которые нужно отрендерить."""
+        jobs: List[tuple[str, str]] = []
+        for color in self.colors:
+            existing = sorted(video.path for video in self.manifest.by_color(color))
+            if rebuild:
+                # Перерисовка поверх старых имён — пул не пустеет во время сборки
+                names = [Path(path).name for path in existing]
+                names += self._free_names(color, self.videos_per_color - len(names))
+                names = names[: self.videos_per_color]
+            else:
+                missing = self.videos_per_color - len(existing)
+                names = self._free_names(color, missing) if missing > 0 else []
+            jobs.extend((color, name) for name in names)
+        return jobs
+
+    def build(self, rebuild: bool = False, verify_checksums: bool = False) -> int:
+        """Доводит пул до videos_per_color на цвет. Возвращает число новых видео."""
+        self.reconcile(verify_checksums)
+        jobs = self.plan(rebuild)
+        if not jobs:
+            logger.info("Lottery pool is complete")
+            return 0
+
+        for color in {color for color, _ in jobs}:
+            (self.root / color).mkdir(parents=True, exist_ok=True)
+
+        logger.info(f"Rendering {len(jobs)} lottery videos on {self.workers} workers")
+
+        done = 0
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as pool:
+            futures = {
+                pool.submit(
+                    _render_video, str(self.root), color, name, self.generator_options
+                ): (color, name)
+                for color, name in jobs
+            }
+            for future in as_completed(futures):
+                color, name = futures[future]
+                try:
+                    video = LotteryVideo(**future.result())
+                except Exception as e:
+                    logger.error(f"Failed to render lottery video {color}/{name}: {e}")
+                    continue
+
+                self.manifest.add(video)
+                self.manifest.save()
+                done += 1
+                logger.info(f"[{done}/{len(jobs)}] {video.path} ({video.size} bytes)")
+
+        return done
+
+
+# ==========================================================
+# Индекс пула в памяти
+# ==========================================================
+# Бот читает манифест один раз и держит по цвету список видео с
+# Telegram file_id. Ставка выбирает видео из списка и отправляет
+# file_id — без iterdir и без загрузки файла. Манифест перечитывается,
+# если сборщик его обновил (проверка mtime не чаще refresh_interval).
+# Пул без манифеста (собранный старым генератором) один раз сверяется
+# в load() при старте — sha256 всех видео считается в потоке, а не
+# в обработчике ставки.
+# file_id хранятся в file_ids.json по sha256 видео: перерисованное
+# видео получает новый file_id, переименованное — сохраняет старый.
+# Прогрев один раз загружает в служебный чат всё, у чего file_id нет.
+
+
+@dataclass
+class LotteryPoolEntry:
+    color: str
+    path: Path
+    duration: float
+    sha256: str
+    file_id: Optional[str] = None
+
+
+class LotteryPoolIndex:
+    def __init__(
+        self,
+        root: str | Path = LOTTERY_POOL_DIR,
+        refresh_interval: float = LOTTERY_INDEX_REFRESH_INTERVAL,
+    ):
+        self.root = Path(root)
+        self.refresh_interval = refresh_interval
+        self._file_ids_path = self.root / LOTTERY_FILE_IDS
+
+        self._entries: Dict[str, List[LotteryPoolEntry]] = {}
+        self._file_ids: Dict[str, str] = {}
+        self._manifest_mtime: Optional[int] = None
+        self._checked_at = float("-inf")
+
+    # ======================================================
+    # Загрузка
+    # ======================================================
+
+    def _refresh(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.refresh_interval:
+            return
+        self._checked_at = now
+
+        manifest_path = self.root / LOTTERY_MANIFEST
+        try:
+            mtime = manifest_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if not force and mtime == self._manifest_mtime and self._entries:
+            return
+        self._manifest_mtime = mtime
+
+        self._file_ids = self._load_file_ids()
+        videos = LotteryPoolManifest(self.root).videos
+
+        entries: Dict[str, List[LotteryPoolEntry]] = {}
+        for video in sorted(videos.values(), key=lambda v: v.path):
+            entries.setdefault(video.color, []).append(
+                LotteryPoolEntry(
+                    color=video.color,
+                    path=self.root / video.path,
+                    duration=video.duration,
+                    sha256=video.sha256,
+                    file_id=self._file_ids.get(video.sha256),
+                )
+            )
+        self._entries = entries
+
+        total = sum(len(videos) for videos in entries.values())
+        logger.info(f"Lottery pool index loaded: {total} videos")
+        if not total:
+            logger.warning(f"Lottery pool is empty: {self.root}")
+
+    def load(self) -> None:
+        """
+        Блокирующий: при отсутствии манифеста собирает его по файлам
+        пула и читает индекс. Вызывается через asyncio.to_thread до
+        начала обработки апдейтов.
+        """
+        if not (self.root / LOTTERY_MANIFEST).is_file() and self.root.is_dir():
+            logger.info(f"No lottery manifest, indexing pool: {self.root}")
+            LotteryPoolBuilder(self.root).reconcile()
+        self._refresh(force=True)
+
+    def _load_file_ids(self) -> Dict[str, str]:
+        if not self._file_ids_path.is_file():
+            return {}
+        try:
+            return json.loads(self._file_ids_path.read_text())
+        except (OSError, ValueError) as e:
+            logger.warning(f"Broken lottery file_id store, starting empty: {e}")
+            return {}
+
+    def _save_file_ids(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self._file_ids_path.with_name(self._file_ids_path.name + ".tmp")
+        tmp.write_text(json.dumps(self._file_ids, indent=2))
+        os.replace(tmp, self._file_ids_path)
+
+    # ======================================================
+    # Выбор и file_id
+    # ======================================================
+
+    def pick(
+        self, color: str, rng: Optional[random.Random] = None
+    ) -> Optional[LotteryPoolEntry]:
+        self._refresh()
+        videos = self._entries.get(color)
+        if not videos:
+            logger.warning(f"No lottery videos for color '{color}'")
+            return None
+        return (rng if rng is not None else random).choice(videos)
+
+    def set_file_id(self, entry: LotteryPoolEntry, file_id: str) -> None:
+        entry.file_id = file_id
+        self._file_ids[entry.sha256] = file_id
+        self._save_file_ids()
+
+    def entries(self) -> List[LotteryPoolEntry]:
+        self._refresh()
+        return [entry for videos in self._entries.values() for entry in videos]
+
+    async def warm_up(self, bot: Bot, chat_id: int) -> int:
+        """
+        Загружает в служебный чат видео без file_id. Возвращает число
+        загруженных. Повторный вызов грузит только новые видео.
+        """
+        self._refresh(force=True)
+        uploaded = 0
+
+        for entry in self.entries():
+            if entry.file_id:
+                continue
+            while True:
+                try:
+                    message = await bot.send_animation(
+                        chat_id=chat_id,
+                        animation=FSInputFile(entry.path),
+                        disable_notification=True,
+                    )
+                    break
+                except TelegramRetryAfter as e:
+                    await asyncio.sleep(e.retry_after)
+                except TelegramAPIError as e:
+                    logger.error(f"Lottery warm-up failed on {entry.path}: {e}")
+                    return uploaded
+
+            media = message.animation or message.video or message.document
+            if media is None:
+                logger.error(f"Telegram returned no media for {entry.path}")
+                continue
+
+            self.set_file_id(entry, media.file_id)
+            uploaded += 1
+
+        logger.info(f"Lottery warm-up uploaded {uploaded} videos")
+        return uploaded
@@ -2,16 +2,12 @@ import logging
 import os
 import random
 from pathlib import Path
+from typing import Iterator, List, Optional
 
+import av
 import numpy as np
-from moviepy import VideoClip, concatenate_videoclips
 from PIL import Image, ImageDraw
 
-logging.basicConfig(
-    level=logging.DEBUG,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    datefmt="%H:%M:%S",
-)
 logger = logging.getLogger(__name__)
 
 
@@ -48,18 +44,11 @@ class LotteryGenerator:
         self.strip_y = self.video_h // 2
         self.arrow_color = (255, 255, 255)
         self.arrow_size = 30
+        self.background = (10, 10, 10)
 
     def _ease_out_cubic(self, t: float) -> float:
         return 1 - (1 - t) ** 3
 
-    def _slot_color(
-        self, slot_index: int, winner_slot: int, winner_color: str, seed: int
-    ) -> str:
-        if slot_index == winner_slot:
-            return winner_color
-        rng = random.Random(seed ^ (slot_index * 2654435761 & 0xFFFFFFFF))
-        return rng.choice(list(self.colors.keys()))
-
     def _compute_scroll(self, t: float, total_scroll: float) -> float:
         norm = min(t / self.spin_duration, 1.0)
         scroll_phase1 = total_scroll * 0.45
@@ -95,87 +84,171 @@ class LotteryGenerator:
         lighter = tuple(min(255, c + 80) for c in color)
         draw.ellipse([bx - br, by - br // 2, bx + br, by + br // 2], fill=lighter)
 
-    def _make_frame(
-        self, scroll: float, winner_slot: int, winner_color: str, seed: int
+    # ======================================================
+    # Лента слотов одной текстурой
+    # ======================================================
+    # Вся лента, которую проедет стрелка, рисуется один раз. Кадр —
+    # горизонтальный срез текстуры, затемнение к краям (постоянное в
+    # координатах экрана) и статичный слой с рамкой окна и стрелкой.
+
+    def _band(self) -> tuple[int, int]:
+        """Строки кадра, которые занимают круги вместе с тенью."""
+        return (
+            self.strip_y - self.circle_radius - 1,
+            self.strip_y + self.circle_radius + 6,
+        )
+
+    def _render_strip(
+        self,
+        start_scroll: int,
+        final_scroll: int,
+        winner_slot: int,
+        winner_color: str,
+        rng: random.Random,
     ) -> np.ndarray:
-        img = Image.new("RGB", (self.video_w, self.video_h), (10, 10, 10))
-        draw = ImageDraw.Draw(img)
+        """
+        Текстура ленты высотой с полосу кругов. Хранится превышение над
+        фоном — так затемнение не трогает сам фон. Столбец x текстуры
+        соответствует мировой координате start_scroll - center_x + x.
+        """
+        y0, y1 = self._band()
         center_x = self.video_w // 2
+        origin = start_scroll - center_x
+        width = final_scroll - start_scroll + self.video_w + 1
+
+        img = Image.new("RGB", (width, y1 - y0), self.background)
+        draw = ImageDraw.Draw(img)
+
         pad = self.circle_radius + 30
+        first = (origin - pad) // self.circle_spacing
+        last = (origin + width + pad) // self.circle_spacing + 1
+        names = rng.choices(list(self.colors), k=last - first + 1)
+
+        for i, name in zip(range(first, last + 1), names):
+            if i == winner_slot:
+                name = winner_color
+            cx = i * self.circle_spacing - origin
+            self._draw_circle(draw, cx, self.strip_y - y0, self.colors[name])
 
-        slot_left = int((scroll - center_x - pad) / self.circle_spacing) - 1
-        slot_right = int((scroll + center_x + pad) / self.circle_spacing) + 1
-
-        for i in range(slot_left, slot_right + 1):
-            cx = int(center_x + i * self.circle_spacing - scroll)
-            if cx < -pad or cx > self.video_w + pad:
-                continue
-            color_name = self._slot_color(i, winner_slot, winner_color, seed)
-            color_rgb = self.colors[color_name]
-            dist = abs(cx - center_x)
-            max_dist = self.video_w // 2 + self.circle_radius
-            alpha = max(0.3, 1.0 - dist / max_dist * 0.7)
-            faded = tuple(int(c * alpha) for c in color_rgb)
-            self._draw_circle(draw, cx, self.strip_y, faded)
+        strip = np.asarray(img, dtype=np.int16) - np.array(self.background)
+        return np.maximum(strip, 0).astype(np.uint16)
+
+    def _fade(self) -> np.ndarray:
+        """Яркость столбца экрана 0–256: 1.0 в центре, 0.3 у краёв."""
+        center_x = self.video_w // 2
+        max_dist = self.video_w // 2 + self.circle_radius
+        dist = np.abs(np.arange(self.video_w) - center_x)
+        alpha = np.maximum(0.3, 1.0 - dist / max_dist * 0.7)
+        return np.rint(alpha * 256).astype(np.uint16)[None, :, None]
+
+    def _overlay(self) -> tuple[np.ndarray, np.ndarray]:
+        """Фон с рамкой окна и стрелкой + маска рамки внутри полосы кругов."""
+        img = Image.new("RGB", (self.video_w, self.video_h), self.background)
+        draw = ImageDraw.Draw(img)
+        center_x = self.video_w // 2
 
         win_half = self.circle_radius + 15
         lc = (180, 180, 180)
-        draw.line(
-            [
-                (center_x - win_half, self.strip_y - self.circle_radius - 20),
-                (center_x - win_half, self.strip_y + self.circle_radius + 20),
-            ],
-            fill=lc,
-            width=2,
-        )
-        draw.line(
-            [
-                (center_x + win_half, self.strip_y - self.circle_radius - 20),
-                (center_x + win_half, self.strip_y + self.circle_radius + 20),
-            ],
-            fill=lc,
-            width=2,
-        )
+        for x in (center_x - win_half, center_x + win_half):
+            draw.line(
+                [
+                    (x, self.strip_y - self.circle_radius - 20),
+                    (x, self.strip_y + self.circle_radius + 20),
+                ],
+                fill=lc,
+                width=2,
+            )
 
         self._draw_arrow(draw, center_x, self.strip_y + self.circle_radius + 25)
-        return np.array(img)
+
+        base = np.array(img)
+        y0, y1 = self._band()
+        mask = (base[y0:y1] != self.background).any(axis=2, keepdims=True)
+        return base, mask
+
+    def _frames(
+        self,
+        strip: np.ndarray,
+        scrolls: List[int],
+    ) -> Iterator[np.ndarray]:
+        base, mask = self._overlay()
+        fade = self._fade()
+        background = np.array(self.background, dtype=np.uint16)
+        y0, y1 = self._band()
+        overlay_band = base[y0:y1]
+
+        for offset in scrolls:
+            frame = base.copy()
+            band = strip[:, offset : offset + self.video_w] * fade
+            band >>= 8
+            band += background
+            frame[y0:y1] = band
+            np.copyto(frame[y0:y1], overlay_band, where=mask)
+            yield frame
+
+    # ======================================================
+    # Кодирование
+    # ======================================================
 
     def generate_video(self, winner_color: str, output_path: str):
-        seed = random.randint(0, 2**31)
-        start_scroll = random.randint(50, 200) * self.circle_spacing
-        extra_slots = random.randint(15, 30)
-        jitter = random.uniform(-0.3, 0.3)
+        rng = random.Random()
+        start_scroll = rng.randint(50, 200) * self.circle_spacing
+        extra_slots = rng.randint(15, 30)
+        jitter = rng.uniform(-0.3, 0.3)
         winner_slot = round((start_scroll / self.circle_spacing) + extra_slots + jitter)
         final_scroll = winner_slot * self.circle_spacing
         total_scroll = final_scroll - start_scroll
 
         logger.debug(
-            "Params: seed=%d winner_slot=%d total_scroll=%.1f",
-            seed,
-            winner_slot,
-            total_scroll,
+            "Params: winner_slot=%d total_scroll=%.1f", winner_slot, total_scroll
         )
 
-        def spin_frame(t):
-            s = start_scroll + self._compute_scroll(t, total_scroll)
-            return self._make_frame(s, winner_slot, winner_color, seed)
-
-        spin_clip = VideoClip(spin_frame, duration=self.spin_duration)
-        winner_frame = self._make_frame(final_scroll, winner_slot, winner_color, seed)
-        pause_clip = VideoClip(lambda _: winner_frame, duration=self.pause_duration)
-        full_clip = concatenate_videoclips([spin_clip, pause_clip])
-
-        full_clip.write_videofile(
-            output_path,
-            fps=self.fps,
-            codec="libx264",
-            audio=False,
-            logger=None,
-            ffmpeg_params=["-crf", "28", "-preset", "fast"],
+        strip = self._render_strip(
+            start_scroll, final_scroll, winner_slot, winner_color, rng
         )
-        spin_clip.close()
-        pause_clip.close()
-        full_clip.close()
+
+        spin_frames = int(self.spin_duration * self.fps)
+        pause_frames = int(self.pause_duration * self.fps)
+        offsets = [
+            int(start_scroll + self._compute_scroll(i / self.fps, total_scroll))
+            - start_scroll
+            for i in range(spin_frames)
+        ]
+
+        # Формат задан явно — пул пишет во временный файл *.part
+        container = av.open(str(output_path), mode="w", format="mp4")
+        stream = container.add_stream("libx264", rate=self.fps)
+        stream.width = self.video_w
+        stream.height = self.video_h
+        stream.pix_fmt = "yuv420p"
+        stream.options = {"crf": "28", "preset": "fast"}
+
+        def encode(video_frame: Optional[av.VideoFrame]) -> None:
+            for packet in stream.encode(video_frame):
+                container.mux(packet)
+
+        try:
+            pts = 0
+            for frame in self._frames(strip, offsets):
+                video_frame = av.VideoFrame.from_ndarray(frame, format="rgb24")
+                video_frame.pts = pts
+                encode(video_frame)
+                pts += 1
+
+            # Пауза — один и тот же кадр: конвертируется один раз, а x264
+            # кодирует повторы пропущенными макроблоками почти бесплатно
+            (winner,) = self._frames(strip, [total_scroll])
+            winner_frame = av.VideoFrame.from_ndarray(winner, format="rgb24")
+            winner_frame = winner_frame.reformat(format="yuv420p")
+            for _ in range(pause_frames):
+                winner_frame.pts = pts
+                encode(winner_frame)
+                pts += 1
+
+            encode(None)
+        finally:
+            container.close()
+
         logger.debug("Saved: %s", output_path)
 
     def get_random_video(self, winner_color: str) -> str:
@@ -188,33 +261,27 @@ class LotteryGenerator:
         logger.debug("Selected video: %s", chosen)
         return os.path.join(folder, chosen)
 
-    def generate_all(self):
-        os.makedirs(self.output_dir, exist_ok=True)
-        total = len(self.colors) * self.videos_per_color
-        done = 0
-
-        logger.info(
-            "Starting generation: %d colors × %d videos = %d total",
-            len(self.colors),
-            self.videos_per_color,
-            total,
-        )
+    def options(self) -> dict:
+        """Параметры стиля — чтобы воссоздать генератор в другом процессе."""
+        return {
+            "video_size": (self.video_w, self.video_h),
+            "fps": self.fps,
+            "spin_duration": self.spin_duration,
+            "pause_duration": self.pause_duration,
+            "circle_radius": self.circle_radius,
+            "circle_spacing": self.circle_spacing,
+            "deceleration_start": self.deceleration_start,
+        }
 
-        for color_name in self.colors:
-            color_dir = os.path.join(self.output_dir, color_name)
-            os.makedirs(color_dir, exist_ok=True)
-
-            for idx in range(1, self.videos_per_color + 1):
-                filename = f"{color_name}_{idx:03d}.mp4"
-                output_path = os.path.join(color_dir, filename)
-
-                if os.path.exists(output_path):
-                    logger.debug("Skipping %s, already exists", filename)
-                    done += 1
-                    continue
-
-                logger.info("[%d/%d] Generating %s ...", done + 1, total, filename)
-                self.generate_video(color_name, output_path)
-                done += 1
+    def generate_all(self, workers: Optional[int] = None, rebuild: bool = False):
+        from src.bot.services.lottery_pool import LotteryPoolBuilder
 
+        builder = LotteryPoolBuilder(
+            root=self.output_dir,
+            videos_per_color=self.videos_per_color,
+            workers=workers,
+            generator_options=self.options(),
+            colors=list(self.colors),
+        )
+        done = builder.build(rebuild=rebuild)
         logger.info("Finished! %d videos saved to '%s/'", done, self.output_dir)
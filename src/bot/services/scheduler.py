@@ -0,0 +1,72 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Set
+
+logger = logging.getLogger(__name__)
+
+
+# ==========================================================
+# Отложенные действия
+# ==========================================================
+# Хендлер не должен спать: DatabaseMiddleware держит сессию (и
+# соединение из пула с открытой транзакцией) до выхода из хендлера.
+# Всё, что нужно сделать «через N секунд», ставится сюда — хендлер
+# сразу возвращается и коммитит, а действие выполняет фоновая задача.
+# Действия не должны трогать сессию: всё нужное из БД вычисляется
+# до планирования.
+
+
+class DelayedActionScheduler:
+    def __init__(self) -> None:
+        self._tasks: Set[asyncio.Task] = set()
+        self._wake = asyncio.Event()
+
+    def schedule(
+        self,
+        delay: float,
+        action: Callable[[], Awaitable[Any]],
+        name: str = "delayed_action",
+    ) -> asyncio.Task:
+        """Выполняет action() через delay секунд, не задерживая вызывающего."""
+        task = asyncio.create_task(self._run(delay, action, name), name=name)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _run(
+        self, delay: float, action: Callable[[], Awaitable[Any]], name: str
+    ) -> None:
+        try:
+            # При остановке бота ждать не нужно — действие выполняется сразу
+            await asyncio.wait_for(self._wake.wait(), timeout=max(delay, 0.0))
+        except asyncio.TimeoutError:
+            pass
+
+        try:
+            await action()
+        except Exception:
+            logger.error(f"Delayed action '{name}' failed", exc_info=True)
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """
+        Выполняет все ожидающие действия без оставшейся задержки.
+
+        Args:
+            timeout: Сколько ждать их завершения перед отменой
+        """
+        if not self._tasks:
+            return
+
+        logger.info(f"Flushing {len(self._tasks)} delayed actions")
+        self._wake.set()
+
+        tasks = list(self._tasks)
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    @property
+    def pending(self) -> int:
+        """Сколько действий ещё не выполнено"""
+        return len(self._tasks)
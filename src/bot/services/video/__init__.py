@@ -1,4 +1,11 @@
+from .clip_cache import AnimeClipCache
 from .cutter import VideoCutterService
+from .keyframes import KeyframeIndexStore
 from .worker import VideoWorker
 
-__all__ = ["VideoWorker", "VideoCutterService"]
+__all__ = [
+    "VideoWorker",
+    "VideoCutterService",
+    "KeyframeIndexStore",
+    "AnimeClipCache",
+]
@@ -0,0 +1,87 @@
+import hashlib
+import json
+import shutil
+from pathlib import Path
+from typing import Optional
+
+from src.bot.services.file_id_cache import CachedFile, FileIdCache
+
+CLIP_CACHE_DIR = Path("src/assets/cache/anime_clips")
+
+# 0 — файлы отрывков не хранятся, кешируются только file_id
+CLIP_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+CLIP_CACHE_MAX_ENTRIES = 20_000
+
+# Как часто изменённый индекс сбрасывается на диск, секунды
+CLIP_CACHE_FLUSH_INTERVAL = 30.0
+
+CLIP_FORMAT_VIDEO = "video"
+CLIP_FORMAT_GIF = "gif"
+
+
+# ==========================================================
+# Кеш отрывков /anime
+# ==========================================================
+# Ключ — сезон, серия, таймкоды и формат плюс mtime и размер файла
+# серии: заменили серию — старые отрывки просто перестают находиться.
+# По file_id повтор уходит без нарезки и без загрузки; хранение, LRU
+# по диску и запись индекса — в FileIdCache, как у BattleVideoCache.
+
+CachedAnimeClip = CachedFile
+
+
+class AnimeClipCache(FileIdCache):
+    def __init__(
+        self,
+        cache_dir: Path = CLIP_CACHE_DIR,
+        max_bytes: int = CLIP_CACHE_MAX_BYTES,
+        max_entries: int = CLIP_CACHE_MAX_ENTRIES,
+    ):
+        super().__init__(
+            name="anime clip",
+            cache_dir=cache_dir,
+            max_bytes=max_bytes,
+            max_entries=max_entries,
+            flush_interval=CLIP_CACHE_FLUSH_INTERVAL,
+        )
+
+    @staticmethod
+    def key(
+        source: Path,
+        season: str,
+        episode: str,
+        start_time: Optional[str] = None,
+        end_time: Optional[str] = None,
+        clip_format: str = CLIP_FORMAT_VIDEO,
+    ) -> str:
+        """Без таймкодов — ключ серии целиком."""
+        stat = source.stat()
+        raw = json.dumps(
+            [
+                season,
+                episode,
+                start_time,
+                end_time,
+                clip_format,
+                stat.st_mtime_ns,
+                stat.st_size,
+            ]
+        )
+        return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+    def put_file(self, key: str, source: str | Path) -> Path:
+        """
+        Забирает нарезанный файл в кеш и возвращает новый путь. При
+        нулевом бюджете файл остаётся на месте — его удалит вызывающий.
+        """
+        source = Path(source)
+        if self.max_bytes <= 0:
+            return source
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        target = self.path_for(key, source.suffix)
+        shutil.move(str(source), target)
+
+        self._add_file(key, target)
+        return target
@@ -1,20 +1,39 @@
 # src/bot/services/video/cutter.py
 import asyncio
 import logging
+import os
 import re
 import uuid
 from pathlib import Path
+from typing import Optional
 
+import av
 import ffmpeg
 
+from .keyframes import KeyframeIndexStore
+
 logger = logging.getLogger(__name__)
 
 
+# ==========================================================
+# Нарезка без перекодирования
+# ==========================================================
+# Для mp4 пакеты копируются PyAV с ближайшего keyframe не позже начала
+# (по индексу KeyframeIndexStore). Временные метки сдвигаются на время
+# начала: кадры до него получают отрицательный pts, и mp4 муксер пишет
+# edit list — плеер декодирует с keyframe, а показывает ровно с начала.
+# Видео обрывается по dts: пакеты с dts < end нужны как опорные, поэтому
+# конец может быть длиннее на окно переупорядочивания B-кадров (пара
+# кадров). Аудио копируется только в пределах [start, end). GIF и любые
+# ошибки копирования уходят в прежнюю перекодировку через ffmpeg.
+
+
 class VideoCutterService:
     PATH_TO_CUTTED = Path("src/assets/videos/cutter")
 
-    def __init__(self) -> None:
+    def __init__(self, keyframes: Optional[KeyframeIndexStore] = None) -> None:
         self.PATH_TO_CUTTED.mkdir(exist_ok=True, parents=True)
+        self.keyframes = keyframes or KeyframeIndexStore()
 
     @staticmethod
     def validate_time_format(time_str: str) -> bool:
@@ -25,6 +44,12 @@ class VideoCutterService:
         minutes, seconds = map(int, time_str.split(":"))
         return seconds < 60
 
+    @staticmethod
+    def to_seconds(time_str: str) -> int:
+        """MM:SS → секунды"""
+        minutes, seconds = map(int, time_str.split(":"))
+        return minutes * 60 + seconds
+
     def parse_duration(self, start_time: str, end_time: str) -> int:
         """Вычисляет длительность в секундах"""
         if not self.validate_time_format(start_time):
@@ -32,12 +57,7 @@ class VideoCutterService:
         if not self.validate_time_format(end_time):
             raise ValueError("Invalid end time format. Use MM:SS.")
 
-        start_minutes, start_seconds = map(int, start_time.split(":"))
-        end_minutes, end_seconds = map(int, end_time.split(":"))
-
-        start_total = start_minutes * 60 + start_seconds
-        end_total = end_minutes * 60 + end_seconds
-        duration = end_total - start_total
+        duration = self.to_seconds(end_time) - self.to_seconds(start_time)
 
         if duration <= 0:
             raise ValueError("End time must be greater than start time.")
@@ -48,10 +68,9 @@ class VideoCutterService:
         self, input_filename: str | Path, is_gif: bool = False
     ) -> Path:
         """Генерирует уникальный путь для выходного файла"""
+        suffix = ".gif" if is_gif else ".mp4"
         return self.PATH_TO_CUTTED / (
-            Path(input_filename).stem + "_" + str(uuid.uuid4()) + ".gif"
-            if is_gif
-            else ".mp4"
+            Path(input_filename).stem + "_" + str(uuid.uuid4()) + suffix
         )
 
     async def cut_video_async(
@@ -63,7 +82,8 @@ class VideoCutterService:
     ) -> Path:
         """
         АСИНХРОННАЯ нарезка видео без блокировки event loop.
-        Использует asyncio.create_subprocess_exec для настоящей асинхронности.
+        mp4 режется копированием потоков в отдельном потоке, остальное —
+        перекодированием через asyncio.create_subprocess_exec.
         """
         logger.info(
             f"Starting async video cut: {input_file_path} -> {output_file_path}"
@@ -71,6 +91,97 @@ class VideoCutterService:
 
         duration = self.parse_duration(start_time, end_time)
 
+        if Path(output_file_path).suffix == ".mp4":
+            start = self.to_seconds(start_time)
+            try:
+                await asyncio.to_thread(
+                    self._cut_stream_copy,
+                    Path(input_file_path),
+                    Path(output_file_path),
+                    start,
+                    start + duration,
+                )
+                logger.info(f"Video cut completed (stream copy): {output_file_path}")
+                return Path(output_file_path)
+            except Exception as e:
+                logger.warning(f"Stream copy failed, re-encoding: {e}")
+
+        return await self._cut_reencode(
+            input_file_path, output_file_path, start_time, duration
+        )
+
+    def _cut_stream_copy(
+        self, input_path: Path, output_path: Path, start: float, end: float
+    ) -> None:
+        """Копирует пакеты [keyframe ≤ start, end) в mp4. Блокирующий."""
+        keyframe = self.keyframes.get(input_path).at_or_before(start)
+        tmp = output_path.with_name(output_path.name + ".part")
+
+        try:
+            with av.open(str(input_path)) as source:
+                video = source.streams.video[0]
+                audio = source.streams.audio[0] if source.streams.audio else None
+
+                with av.open(
+                    str(tmp),
+                    mode="w",
+                    format="mp4",
+                    options={"movflags": "+faststart"},
+                ) as output:
+                    inputs = [video] if audio is None else [video, audio]
+                    # По индексу потока: PyAV не гарантирует тот же объект
+                    # Stream у packet.stream
+                    targets = {
+                        stream.index: output.add_stream_from_template(stream)
+                        for stream in inputs
+                    }
+                    offsets = {
+                        stream.index: int(round(start / stream.time_base))
+                        for stream in inputs
+                    }
+
+                    source.seek(int(keyframe / video.time_base), stream=video)
+
+                    done = set()
+                    copied = 0
+                    for packet in source.demux(*inputs):
+                        i = packet.stream.index
+                        if packet.dts is None or i in done:
+                            continue
+
+                        time = float(packet.dts * packet.time_base)
+                        if time >= end:
+                            done.add(i)
+                            if len(done) == len(targets):
+                                break
+                            continue
+                        # Видео нужно с keyframe, аудио — строго с начала
+                        if i != video.index and time < start:
+                            continue
+
+                        packet.dts -= offsets[i]
+                        if packet.pts is not None:
+                            packet.pts -= offsets[i]
+                        packet.stream = targets[i]
+                        output.mux(packet)
+                        copied += i == video.index
+
+            if not copied:
+                raise ValueError(f"No video packets in [{start}, {end})")
+
+            os.replace(tmp, output_path)
+        finally:
+            tmp.unlink(missing_ok=True)
+
+    async def _cut_reencode(
+        self,
+        input_file_path: str | Path,
+        output_file_path: str | Path,
+        start_time: str,
+        duration: int,
+    ) -> Path:
+        """Точная нарезка с перекодированием через ffmpeg."""
+
         cmd = (
             ffmpeg.input(str(input_file_path), ss=start_time)
             .output(str(output_file_path), t=duration)
@@ -0,0 +1,137 @@
+import bisect
+import hashlib
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List
+
+import av
+
+logger = logging.getLogger(__name__)
+
+KEYFRAME_INDEX_DIR = Path("src/assets/cache/keyframes")
+
+# Поднимать при изменении формата файла индекса
+KEYFRAME_INDEX_VERSION = 1
+
+
+# ==========================================================
+# Индекс ключевых кадров серии
+# ==========================================================
+# Времена keyframe видеопотока собираются одним проходом demux — без
+# декодирования — и сохраняются в JSON рядом с кешем. По индексу
+# нарезка знает, с какого keyframe начинать копирование потока.
+# Индекс пересобирается, если у файла серии изменились mtime или размер.
+
+
+@dataclass(frozen=True)
+class KeyframeIndex:
+    source: str
+    mtime_ns: int
+    size: int
+    keyframes: List[float]  # секунды, по возрастанию
+
+    def at_or_before(self, time: float) -> float:
+        """Последний keyframe не позже time (или первый в файле)."""
+        i = bisect.bisect_right(self.keyframes, time)
+        return self.keyframes[max(i - 1, 0)]
+
+    def after(self, time: float) -> float | None:
+        """Первый keyframe строго позже time."""
+        i = bisect.bisect_right(self.keyframes, time)
+        return self.keyframes[i] if i < len(self.keyframes) else None
+
+    def matches(self, path: Path) -> bool:
+        stat = path.stat()
+        return stat.st_mtime_ns == self.mtime_ns and stat.st_size == self.size
+
+
+def scan_keyframes(path: str | Path) -> List[float]:
+    with av.open(str(path)) as container:
+        stream = container.streams.video[0]
+        keyframes = [
+            float(packet.pts * packet.time_base)
+            for packet in container.demux(stream)
+            if packet.is_keyframe and packet.pts is not None
+        ]
+    return sorted(keyframes)
+
+
+class KeyframeIndexStore:
+    def __init__(self, cache_dir: Path = KEYFRAME_INDEX_DIR):
+        self.cache_dir = Path(cache_dir)
+        self._indexes: Dict[str, KeyframeIndex] = {}
+        self._lock = threading.Lock()
+        # Серии строятся независимо — долгий скан одной не держит другие
+        self._build_locks: Dict[str, threading.Lock] = {}
+
+    def _index_path(self, source: Path) -> Path:
+        digest = hashlib.sha1(str(source.resolve()).encode()).hexdigest()[:16]
+        return self.cache_dir / f"{source.stem}_{digest}.json"
+
+    def get(self, source: str | Path) -> KeyframeIndex:
+        """Индекс из памяти, с диска или построенный заново. Блокирующий."""
+        source = Path(source)
+        key = str(source)
+
+        index = self._indexes.get(key)
+        if index is not None and index.matches(source):
+            return index
+
+        with self._lock:
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        with build_lock:
+            index = self._indexes.get(key)
+            if index is None or not index.matches(source):
+                index = self._load(source) or self._build(source)
+                self._indexes[key] = index
+            return index
+
+    def _load(self, source: Path) -> KeyframeIndex | None:
+        path = self._index_path(source)
+        if not path.is_file():
+            return None
+        try:
+            data = json.loads(path.read_text())
+            if data.pop("version") != KEYFRAME_INDEX_VERSION:
+                return None
+            index = KeyframeIndex(**data)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Broken keyframe index {path}: {e}")
+            return None
+        return index if index.matches(source) else None
+
+    def _build(self, source: Path) -> KeyframeIndex:
+        stat = source.stat()
+        keyframes = scan_keyframes(source)
+        if not keyframes:
+            raise ValueError(f"No keyframes found in {source}")
+
+        index = KeyframeIndex(
+            source=str(source),
+            mtime_ns=stat.st_mtime_ns,
+            size=stat.st_size,
+            keyframes=keyframes,
+        )
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._index_path(source)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(
+            json.dumps({"version": KEYFRAME_INDEX_VERSION, **index.__dict__})
+        )
+        os.replace(tmp, path)
+
+        logger.info(f"Indexed {len(keyframes)} keyframes of {source}")
+        return index
+
+    def build_all(self, root: str | Path, pattern: str = "*.mp4") -> int:
+        """Индексирует все серии заранее. Возвращает число файлов."""
+        sources = sorted(Path(root).glob(pattern))
+        for source in sources:
+            self.get(source)
+        return len(sources)
@@ -1,5 +1,6 @@
 from dataclasses import dataclass
 from enum import Enum
+from pathlib import Path
 
 from src.database.models import Ghoul, User
 
@@ -22,3 +23,4 @@ class DepResult:
     is_won: bool
     earned: int
     video_file_id: str | None = None
+    video_path: Path | None = None
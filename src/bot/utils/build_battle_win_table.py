@@ -0,0 +1,24 @@
+import argparse
+import logging
+import pathlib
+import sys
+
+sys.path.append(str(pathlib.Path(__file__).parent.parent.parent.parent))
+from src.bot.services.battle.win_table import (
+    FIGHTS_PER_CELL,
+    WIN_TABLE_PATH,
+    build_win_table,
+)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    parser = argparse.ArgumentParser(description="Таблица шансов победы в бою")
+    parser.add_argument("--fights", type=int, default=FIGHTS_PER_CELL)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=pathlib.Path, default=WIN_TABLE_PATH)
+    args = parser.parse_args()
+
+    table = build_win_table(fights_per_cell=args.fights, rng=args.seed)
+    table.save(args.output)
+    logging.info(f"Saved win table {table.win.shape} to {args.output}")
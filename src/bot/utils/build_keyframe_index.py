@@ -0,0 +1,19 @@
+import logging
+import pathlib
+import sys
+
+sys.path.append(str(pathlib.Path(__file__).parent.parent.parent.parent))
+from src.bot.services.video.keyframes import KeyframeIndexStore
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    root = (
+        pathlib.Path(__file__).parent.parent.parent.parent
+        / "src"
+        / "assets"
+        / "videos"
+        / "tokio_ghoul"
+    )
+    indexed = KeyframeIndexStore().build_all(root)
+    logging.info(f"Indexed {indexed} episodes")
@@ -0,0 +1,14 @@
+import logging
+import pathlib
+import sys
+
+sys.path.append(str(pathlib.Path(__file__).parent.parent.parent.parent))
+from src.bot.services.battle.animation_loader import compile_animations
+from src.bot.services.battle.sprite_atlas import load_or_build_sprite_atlas
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    compiled = compile_animations()
+    logging.info(f"Compiled {compiled} battle animation clips")
+    atlas = load_or_build_sprite_atlas()
+    logging.info(f"Sprite atlas: {len(atlas)} sprites, {atlas.nbytes} bytes")
@@ -1,15 +1,31 @@
+import argparse
+import logging
 import pathlib
 import sys
 
 sys.path.append(str(pathlib.Path(__file__).parent.parent.parent.parent))
+from src.bot.services.lottery_pool import VIDEOS_PER_COLOR, LotteryPoolBuilder
 from src.bot.services.lottery_video_genertor import LotteryGenerator
 
 if __name__ == "__main__":
-    generator = LotteryGenerator(
-        output_dir=pathlib.Path(__file__).parent.parent.parent.parent
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    parser = argparse.ArgumentParser(description="Пул лотерейных видео")
+    parser.add_argument("--per-color", type=int, default=VIDEOS_PER_COLOR)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--rebuild", action="store_true")
+    parser.add_argument("--verify", action="store_true")
+    args = parser.parse_args()
+
+    builder = LotteryPoolBuilder(
+        root=pathlib.Path(__file__).parent.parent.parent.parent
         / "src"
         / "assets"
         / "videos"
         / "lottery",
+        videos_per_color=args.per_color,
+        workers=args.workers,
+        generator_options=LotteryGenerator().options(),
     )
-    generator.generate_all()
+    built = builder.build(rebuild=args.rebuild, verify_checksums=args.verify)
+    logging.info(f"Rendered {built} lottery videos")
@@ -0,0 +1,29 @@
+import argparse
+import logging
+import pathlib
+import sys
+
+sys.path.append(str(pathlib.Path(__file__).parent.parent.parent.parent))
+from src.bot.services.battle.alpha_matting import (
+    MATTING_BATCH_SIZE,
+    MATTING_MODEL,
+    matte_animations,
+)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    parser = argparse.ArgumentParser(description="Маски rembg для клипов боя")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=MATTING_BATCH_SIZE)
+    parser.add_argument("--model", default=MATTING_MODEL)
+    parser.add_argument("--force", action="store_true")
+    args = parser.parse_args()
+
+    matted = matte_animations(
+        workers=args.workers,
+        batch_size=args.batch_size,
+        model=args.model,
+        force=args.force,
+    )
+    logging.info(f"Matted {matted} battle animation clips")
@@ -21,6 +21,9 @@ class Settings(BaseSettings):
     HTTPS_PROXY: str = Field(default="")
     ALL_PROXY: str = Field(default="")
 
+    # Служебный чат для прогрева file_id лотерейных видео; 0 — без прогрева
+    LOTTERY_STORAGE_CHAT_ID: int = Field(default=0)
+
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf8")
 
 
@@ -0,0 +1,87 @@
+from src.bot.services.video.clip_cache import (
+    CLIP_FORMAT_GIF,
+    CLIP_FORMAT_VIDEO,
+    AnimeClipCache,
+)
+
+
+def write_clip(path, size: int):
+    path.write_bytes(b"\0" * size)
+    return path
+
+
+def test_key_depends_on_format_and_episode_file(tmp_path):
+    episode = write_clip(tmp_path / "Season_1_Episode_1.mp4", 10)
+
+    video = AnimeClipCache.key(episode, "1", "1", "00:10", "00:20", CLIP_FORMAT_VIDEO)
+    gif = AnimeClipCache.key(episode, "1", "1", "00:10", "00:20", CLIP_FORMAT_GIF)
+    assert video != gif
+
+    write_clip(episode, 20)
+    assert AnimeClipCache.key(
+        episode, "1", "1", "00:10", "00:20", CLIP_FORMAT_VIDEO
+    ) != video
+
+
+def test_file_then_file_id_hit(tmp_path):
+    cache = AnimeClipCache(cache_dir=tmp_path / "cache", max_bytes=100)
+    assert cache.get("a") is None
+
+    path = cache.put_file("a", write_clip(tmp_path / "cut.gif", 10))
+    assert path == cache.path_for("a", ".gif")
+    assert cache.get("a").path == path
+
+    cache.set_file_id("a", "file-a")
+    assert cache.get("a").media == "file-a"
+
+    stats = cache.stats
+    assert (stats.misses, stats.disk_hits, stats.file_id_hits) == (1, 1, 1)
+
+
+def test_zero_budget_keeps_only_file_id(tmp_path):
+    cache = AnimeClipCache(cache_dir=tmp_path / "cache", max_bytes=0)
+    cut = write_clip(tmp_path / "cut.mp4", 10)
+
+    assert cache.put_file("a", cut) == cut
+    assert cache.get("a") is None
+
+    cache.set_file_id("a", "file-a")
+    cache.flush()
+    restored = AnimeClipCache(cache_dir=tmp_path / "cache", max_bytes=0)
+    assert restored.get("a").file_id == "file-a"
+
+
+def test_evicts_oldest_file_but_keeps_file_id(tmp_path):
+    cache = AnimeClipCache(cache_dir=tmp_path / "cache", max_bytes=25)
+    cache.put_file("a", write_clip(tmp_path / "a.mp4", 10))
+    cache.set_file_id("a", "file-a")
+    cache.put_file("b", write_clip(tmp_path / "b.mp4", 10))
+    cache.put_file("c", write_clip(tmp_path / "c.mp4", 10))
+
+    assert not cache.path_for("a", ".mp4").exists()
+    assert cache.get("a").file_id == "file-a"
+    assert cache.stats.bytes <= 25
+
+
+def test_reads_do_not_rewrite_index(tmp_path):
+    cache = AnimeClipCache(cache_dir=tmp_path / "cache")
+    cache.set_file_id("a", "file-a")
+    assert cache.flush()
+
+    index = tmp_path / "cache" / "index.json"
+    before = index.stat().st_mtime_ns
+    cache.get("a")
+    assert index.stat().st_mtime_ns == before
+
+
+def test_forget_file_id_falls_back_to_file(tmp_path):
+    cache = AnimeClipCache(cache_dir=tmp_path / "cache", max_bytes=100)
+    path = cache.put_file("a", write_clip(tmp_path / "cut.mp4", 10))
+    cache.set_file_id("a", "file-a")
+    cache.set_file_id("b", "file-b")
+
+    cache.forget_file_id("a")
+    cache.forget_file_id("b")
+
+    assert cache.get("a").media.path == path
+    assert cache.get("b") is None
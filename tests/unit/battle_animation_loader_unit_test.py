@@ -0,0 +1,33 @@
+import json
+
+import numpy as np
+
+from src.bot.services.battle import animation_loader
+from src.bot.services.battle.frame_cache import ByteBudgetCache
+
+
+def test_prewarm_stops_once_budget_is_full(tmp_path, monkeypatch):
+    clips = []
+    for i in range(5):
+        clip = tmp_path / f"clip{i}.webm"
+        clip.write_bytes(b"clip")
+        clips.append(str(clip))
+    manifest = tmp_path / "manifest.json"
+    manifest.write_text(json.dumps([{"path": path, "height": 8} for path in clips]))
+
+    cache = ByteBudgetCache(
+        name="test_clips",
+        max_bytes=250,
+        sizeof=lambda frames: sum(frame.nbytes for frame in frames),
+    )
+    monkeypatch.setattr(animation_loader, "_clip_frames", cache)
+    monkeypatch.setattr(
+        animation_loader,
+        "_load_clip",
+        lambda path, height: [np.zeros(100, dtype=np.uint8)],
+    )
+
+    # Третий клип вытесняет первый — на этом прогрев останавливается
+    assert animation_loader.prewarm_clips(manifest) == 2
+    assert (clips[1], 8) in cache
+    assert cache.stats.evictions == 1
@@ -0,0 +1,77 @@
+import time
+
+from src.bot.services.battle.benchmark import (
+    FIXTURES,
+    Fixture,
+    build_timeline,
+    compare_reports,
+    run_fixture,
+)
+from src.bot.services.battle.generator import BattleVideoGenerator
+from src.bot.services.battle.mechanics import MAX_ROUNDS
+from src.bot.services.battle.stage_timer import PIPELINE_ITEM, STAGES, collect, stage
+
+
+def make_report(wall: float, text: float) -> dict:
+    return {
+        "fixtures": {
+            "short": {
+                "wall_per_frame_ms": wall,
+                "stages": {"text": {"per_frame_ms": text}},
+            }
+        }
+    }
+
+
+def test_stage_is_noop_without_collector():
+    with stage("text"):
+        pass
+
+
+def test_nested_stage_time_is_exclusive():
+    with collect() as timer:
+        with stage("effects"):
+            with stage("text"):
+                time.sleep(0.02)
+
+    totals = timer.totals()[PIPELINE_ITEM]
+    assert totals["text"][0] >= 0.02
+    assert totals["effects"][0] < 0.01
+    assert totals["text"][1] == 1
+
+
+def test_compare_flags_growth_over_threshold():
+    baseline = make_report(wall=10.0, text=1.0)
+    current = make_report(wall=12.0, text=1.05)
+
+    regressions = compare_reports(current, baseline, threshold=0.15)
+
+    assert len(regressions) == 1
+    assert regressions[0].startswith("short/wall")
+
+
+def test_compare_ignores_noise_floor():
+    baseline = make_report(wall=0.01, text=0.01)
+    current = make_report(wall=0.03, text=0.03)
+
+    assert compare_reports(current, baseline, noise_floor_ms=0.05) == []
+
+
+def test_fixtures_differ_in_rounds():
+    rounds = [build_timeline(fixture)[0].rounds for fixture in FIXTURES]
+
+    # short < medium < long с запасом, и длинный бой не упирается в лимит
+    assert rounds[0] + 2 <= rounds[1] and rounds[1] + 2 <= rounds[2]
+    assert rounds[-1] < MAX_ROUNDS
+
+
+def test_fixture_renders_end_to_end(tmp_path):
+    # Один раунд — несколько сотен кадров, рендер за секунды
+    fixture = Fixture("smoke", seed=1, hp=60)
+    generator = BattleVideoGenerator(output_dir=tmp_path)
+
+    report = run_fixture(fixture, generator, tmp_path / "smoke.mp4")
+
+    assert (tmp_path / "smoke.mp4").stat().st_size > 0
+    assert report["frames"] > 0 and report["wall_per_frame_ms"] > 0
+    assert set(report["stages"]) == set(STAGES)
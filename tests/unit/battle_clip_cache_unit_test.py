@@ -0,0 +1,75 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from src.bot.services.battle.clip_cache import (
+    clip_cache_path,
+    clip_cache_ready,
+    load_clip_cache,
+    prune_clip_cache,
+    write_clip_cache,
+)
+from src.bot.services.battle.compositor import premultiply
+
+
+def frames():
+    rgba = np.zeros((8, 6, 4), dtype=np.uint8)
+    rgba[2:6, 1:4] = (10, 20, 30, 255)
+    return [premultiply(rgba)]
+
+
+def test_round_trip_and_ready_needs_index(tmp_path):
+    source = tmp_path / "idle.webm"
+    source.write_bytes(b"clip")
+    cache = tmp_path / "cache"
+
+    data_path = write_clip_cache(source, 8, frames(), cache_dir=cache)
+    assert clip_cache_ready(source, 8, cache_dir=cache)
+    loaded = load_clip_cache(source, 8, cache_dir=cache)
+    assert np.array_equal(loaded[0].pixels, frames()[0].pixels)
+
+    # Буфер без индекса — прерванная компиляция
+    data_path.with_name(data_path.name[: -len(".npy")] + ".idx.npy").unlink()
+    assert data_path.is_file()
+    assert not clip_cache_ready(source, 8, cache_dir=cache)
+
+
+def test_prune_matches_whole_names_with_dots(tmp_path):
+    cache = tmp_path / "cache"
+    left = tmp_path / "attack.left.webm"
+    right = tmp_path / "attack.right.webm"
+    for source in (left, right):
+        source.write_bytes(b"clip")
+        write_clip_cache(source, 8, frames(), cache_dir=cache)
+    stale = clip_cache_path(left, 8, cache_dir=cache)
+
+    # Клип перезаписан — ключ сменился, старый кеш устарел
+    os.utime(left, ns=(1, 1))
+    write_clip_cache(left, 8, frames(), cache_dir=cache)
+
+    keep = [clip_cache_path(source, 8, cache_dir=cache) for source in (left, right)]
+    prune_clip_cache(keep, cache_dir=cache)
+
+    assert not stale.exists()
+    assert clip_cache_ready(left, 8, cache_dir=cache)
+    assert clip_cache_ready(right, 8, cache_dir=cache)
+    assert len(list(cache.glob("*.npy"))) == 4
+
+
+def test_concurrent_writers_do_not_share_tmp_file(tmp_path):
+    source = tmp_path / "idle.webm"
+    source.write_bytes(b"clip")
+    cache = tmp_path / "cache"
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        paths = list(
+            pool.map(
+                lambda _: write_clip_cache(source, 8, frames(), cache_dir=cache),
+                range(8),
+            )
+        )
+
+    assert len(set(paths)) == 1
+    assert clip_cache_ready(source, 8, cache_dir=cache)
+    assert not list(cache.glob("*.tmp"))
@@ -0,0 +1,52 @@
+from src.bot.services.battle.compiled_timeline import (
+    NO_CLIP,
+    compile_timeline,
+    item_frame_count,
+    timeline_frame_count,
+)
+from src.bot.services.battle.models import BattleFighter
+from src.bot.services.battle.replay import BattleReplay
+from src.bot.types import KaguneType
+
+
+def make_timeline():
+    left = BattleFighter(name="left", hp=300, max_hp=300, kagune_type=KaguneType.UKAKU)
+    right = BattleFighter(
+        name="right", hp=300, max_hp=300, kagune_type=KaguneType.KOUKAKU
+    )
+    return BattleReplay.record(left, right, seed=5).play()[1]
+
+
+def test_total_frames_matches_item_counts():
+    timeline = make_timeline()
+    compiled = compile_timeline(timeline)
+
+    assert compiled.total_frames == timeline_frame_count(timeline)
+    for index, item in enumerate(timeline):
+        assert len(compiled.item_frames(index)) == item_frame_count(item)
+
+
+def test_hp_matches_per_frame_interpolation():
+    timeline = make_timeline()
+    compiled = compile_timeline(timeline)
+
+    for index, item in enumerate(timeline):
+        if item.data.battle_event is None:
+            continue
+        frames = compiled.item_frames(index)
+        data = item.data
+        for i, frame in enumerate(frames):
+            progress = i / len(frames)
+            expected = int(
+                data.left_hp_before
+                + (data.left_hp_after - data.left_hp_before) * progress
+            )
+            assert compiled.left_hp[frame] == expected
+            assert compiled.progress[frame] == progress
+
+
+def test_missing_clips_are_marked():
+    compiled = compile_timeline(make_timeline())
+
+    assert (compiled.left_clip == NO_CLIP).all()
+    assert (compiled.left_clip_frame == -1).all()
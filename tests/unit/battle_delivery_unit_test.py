@@ -0,0 +1,124 @@
+import asyncio
+from types import SimpleNamespace
+
+from aiogram.types import Message
+
+from src.bot.services.battle.battle_log import format_battle_log
+from src.bot.services.battle.delivery import BattleDeliveryService
+from src.bot.services.battle.models import BattleFighter
+from src.bot.services.battle.replay import BattleReplay
+from src.bot.services.battle.timeline import select_highlights
+from src.bot.services.battle.video_cache import CachedBattleVideo
+from src.bot.services.scheduler import DelayedActionScheduler
+from src.bot.types import KaguneType
+
+
+class FakeVideoCache:
+    def __init__(self, path):
+        self.path = path
+        self.release = asyncio.Event()
+        self.file_ids = {}
+        self.timelines = []
+
+    async def get_or_render(self, timeline, render):
+        self.timelines.append(timeline)
+        await self.release.wait()
+        return CachedBattleVideo(key="battle-key", path=self.path)
+
+    def set_file_id(self, key, file_id):
+        self.file_ids[key] = file_id
+
+
+class FakeCard:
+    def __init__(self):
+        self.edits = []
+
+    async def edit_media(self, media):
+        self.edits.append(media)
+        return Message.model_construct(video=SimpleNamespace(file_id="video-id"))
+
+
+async def test_send_returns_card_before_render(tmp_path):
+    left = BattleFighter(
+        name="Канеки", hp=500, max_hp=500, kagune_type=KaguneType.RINKAKU
+    )
+    right = BattleFighter(
+        name="Хайсе", hp=500, max_hp=500, kagune_type=KaguneType.RINKAKU
+    )
+    result, timeline = BattleReplay.record(left, right, seed=3).play()
+
+    card = FakeCard()
+
+    async def answer_photo(photo, caption):
+        return card
+
+    video = tmp_path / "battle.mp4"
+    video.write_bytes(b"video")
+    cache = FakeVideoCache(video)
+    scheduler = DelayedActionScheduler()
+    delivery = BattleDeliveryService(
+        generator=SimpleNamespace(generate_timeline_async=None),
+        video_cache=cache,
+        scheduler=scheduler,
+    )
+
+    sent = await delivery.send(
+        SimpleNamespace(answer_photo=answer_photo), result, left, right, timeline
+    )
+
+    # Хендлер уже свободен, рендер ещё идёт
+    assert sent is card
+    assert scheduler.pending == 1
+    assert card.edits == []
+
+    cache.release.set()
+    await scheduler.stop()
+
+    assert len(card.edits) == 1
+    assert cache.file_ids == {"battle-key": "video-id"}
+
+
+async def test_highlights_render_short_video_and_send_full_log(tmp_path):
+    left = BattleFighter(
+        name="Канеки", hp=2000, max_hp=2000, kagune_type=KaguneType.RINKAKU
+    )
+    right = BattleFighter(
+        name="Хайсе", hp=2000, max_hp=2000, kagune_type=KaguneType.RINKAKU
+    )
+    result, timeline = BattleReplay.record(left, right, seed=3).play()
+
+    card = FakeCard()
+    texts = []
+
+    async def answer_photo(photo, caption):
+        return card
+
+    async def answer(text):
+        texts.append(text)
+
+    video = tmp_path / "battle.mp4"
+    video.write_bytes(b"video")
+    cache = FakeVideoCache(video)
+    cache.release.set()
+    scheduler = DelayedActionScheduler()
+    delivery = BattleDeliveryService(
+        generator=SimpleNamespace(generate_timeline_async=None),
+        video_cache=cache,
+        scheduler=scheduler,
+    )
+
+    await delivery.send(
+        SimpleNamespace(answer_photo=answer_photo, answer=answer),
+        result,
+        left,
+        right,
+        timeline,
+        highlights=True,
+    )
+    await scheduler.stop()
+
+    # Видео — только хайлайты, а в логе каждый удар
+    assert cache.timelines == [select_highlights(timeline)]
+    assert len(cache.timelines[0]) < len(timeline)
+    assert texts == [format_battle_log(timeline)]
+    assert len(card.edits) == 1
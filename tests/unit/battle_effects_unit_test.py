@@ -0,0 +1,44 @@
+import numpy as np
+
+from src.bot.services.battle.effects import (
+    render_block,
+    render_hit,
+    render_turn_arrow,
+)
+
+
+def blank():
+    return np.zeros((360, 360, 3), dtype=np.uint8)
+
+
+def test_hit_touches_only_its_bounding_box():
+    frame = blank()
+    out = render_hit(frame, 0.0, 1.0, (200, 0, 0), 100, 100, radius=40)
+
+    # Эффект рисует прямо во входной кадр
+    assert out is frame
+    ys, xs = np.nonzero(out[..., 0])
+    assert ys.min() >= 100 - 20 and ys.max() <= 100 + 20
+    assert xs.min() >= 100 - 20 and xs.max() <= 100 + 20
+    assert not out[..., 1:].any()
+
+
+def test_additive_flash_saturates_instead_of_wrapping():
+    frame = np.full((360, 360, 3), 250, dtype=np.uint8)
+    out = render_block(frame, 0.0, 1.0, (255, 255, 255), 180, 180)
+
+    assert out[180, 180].tolist() == [255, 255, 255]
+    assert out[0, 0].tolist() == [250, 250, 250]
+
+
+def test_finished_effect_is_noop_and_edges_are_clipped():
+    assert not render_hit(blank(), 1.0, 1.0, (255, 255, 255), 0, 0).any()
+    assert render_hit(blank(), 0.0, 1.0, (255, 255, 255), 0, 0)[0, 0].any()
+
+
+def test_turn_arrow_points_towards_defender():
+    left = render_turn_arrow(blank(), 0.0, 1.0, attacker_left=True)
+    right = render_turn_arrow(blank(), 0.0, 1.0, attacker_left=False)
+
+    assert left[:, :180].any() and not left[:, 180:].any()
+    assert right[:, 180:].any() and not right[:, :180].any()
@@ -0,0 +1,50 @@
+from src.bot.services.battle.battle_log import format_battle_log
+from src.bot.services.battle.compiled_timeline import timeline_frame_count
+from src.bot.services.battle.models import BattleFighter
+from src.bot.services.battle.replay import BattleReplay
+from src.bot.services.battle.timeline import select_highlights
+from src.bot.types import KaguneType
+
+
+def play():
+    left = BattleFighter(
+        name="Канеки", hp=2000, max_hp=2000, kagune_type=KaguneType.UKAKU
+    )
+    right = BattleFighter(
+        name="Хайсе", hp=2000, max_hp=2000, kagune_type=KaguneType.KOUKAKU
+    )
+    return BattleReplay.record(left, right, seed=11).play()
+
+
+def test_highlights_keep_first_exchange_specials_and_final_blow():
+    _, timeline = play()
+    highlights = select_highlights(timeline)
+
+    events = [item for item in timeline if item.data.battle_event is not None]
+    kept = [item for item in highlights if item.data.battle_event is not None]
+
+    assert highlights[0].type == "intro"
+    assert highlights[-1].type == "outro"
+    assert kept[-1] is events[-1]
+    assert [e for e in events if e.type != "regen"][:2] == [
+        e for e in kept if e.type != "regen"
+    ][:2]
+    assert all(e in kept for e in events if e.type in ("crit", "regen"))
+    assert timeline_frame_count(highlights) < timeline_frame_count(timeline)
+
+
+def test_every_kept_event_has_its_pause():
+    _, timeline = play()
+    highlights = select_highlights(timeline)
+
+    for i, item in enumerate(highlights):
+        if item.data.battle_event is not None:
+            assert highlights[i - 1].type == "pause"
+
+
+def test_log_lists_every_event():
+    result, timeline = play()
+    log = format_battle_log(timeline)
+
+    assert log.count("\n") >= len(result.events)
+    assert "Раунд 1" in log
@@ -0,0 +1,58 @@
+import random
+
+from src.bot.services.battle.mechanics import MAX_ROUNDS, BattleMechanics
+from src.bot.services.battle.models import BattleFighter
+from src.bot.services.battle.monte_carlo import MonteCarloSimulator
+from src.bot.types import KaguneType
+
+
+def make_fighter(name: str, kagune: KaguneType, **stats) -> BattleFighter:
+    params = dict(
+        hp=600,
+        max_hp=600,
+        strength=50,
+        dexterity=40,
+        speed=35,
+        kagune_strength=60,
+        regeneration=20,
+    )
+    params.update(stats)
+    return BattleFighter(name=name, kagune_type=kagune, **params)
+
+
+def make_pair():
+    left = make_fighter("left", KaguneType.KOUKAKU)
+    right = make_fighter("right", KaguneType.BIKAKU, speed=40, strength=45)
+    return left, right
+
+
+def test_batch_matches_scalar_simulation():
+    random.seed(7)
+    mechanics = BattleMechanics()
+    fights = 3000
+    left_wins = 0
+    for _ in range(fights):
+        left, right = make_pair()
+        result = mechanics.simulate(left, right)
+        if not result.is_draw and result.winner is left:
+            left_wins += 1
+
+    batch = MonteCarloSimulator().simulate(*make_pair(), n=200_000, rng=7)
+
+    assert abs(batch.left_win_rate - left_wins / fights) < 0.04
+
+
+def test_counts_are_consistent():
+    batch = MonteCarloSimulator(chunk_size=3000).simulate(*make_pair(), n=10_000, rng=1)
+
+    assert batch.n == 10_000
+    assert batch.left_wins + batch.right_wins + batch.draws == batch.n
+    assert batch.rounds.sum() == batch.n
+    assert batch.rounds.size == MAX_ROUNDS + 1
+
+
+def test_regen_triggers_at_most_once_per_fighter():
+    batch = MonteCarloSimulator().simulate(*make_pair(), n=10_000, rng=2)
+
+    for side in ("left", "right"):
+        assert 0 < batch.events[side]["regen"] <= batch.n
@@ -0,0 +1,80 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.bot.services.battle import render_farm as render_farm_module
+from src.bot.services.battle.render_farm import BattleRenderFarm, BattleRenderJob
+
+
+class SlowRender:
+    """Вместо процесса — поток, который пишет файл по сигналу."""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, payload, output_path, left_fighter_name=""):
+        self.started.set()
+        self.release.wait(timeout=5)
+        with open(output_path, "wb") as file:
+            file.write(b"video")
+        return output_path
+
+
+@pytest.fixture
+def slow_render(monkeypatch):
+    render = SlowRender()
+    monkeypatch.setattr(render_farm_module, "_render_in_process", render)
+    monkeypatch.setattr(
+        render_farm_module,
+        "ProcessPoolExecutor",
+        lambda max_workers, **_: ThreadPoolExecutor(max_workers=max_workers),
+    )
+    yield render
+    render.release.set()
+
+
+async def wait_started(render):
+    await asyncio.to_thread(render.started.wait, 5)
+
+
+async def test_cancel_while_rendering_waits_for_process(tmp_path, slow_render):
+    farm = BattleRenderFarm(workers_count=1)
+    await farm.start()
+    output = tmp_path / "battle.mp4"
+    job = BattleRenderJob(payload={}, output_path=output)
+
+    await farm.enqueue(job)
+    await wait_started(slow_render)
+    assert farm.cancel(job)
+
+    # Процесс ещё пишет — задача не закончена и слот занят
+    await asyncio.sleep(0.05)
+    assert not job.finished.is_set()
+    assert farm.stats.in_flight == 1
+
+    slow_render.release.set()
+    await asyncio.wait_for(job.finished.wait(), timeout=5)
+    assert not output.exists()
+    assert farm.stats.in_flight == 0
+
+    await farm.stop()
+
+
+async def test_stop_fails_in_flight_render(tmp_path, slow_render):
+    farm = BattleRenderFarm(workers_count=1)
+    await farm.start()
+    output = tmp_path / "battle.mp4"
+
+    render = asyncio.create_task(farm.render({}, output))
+    await wait_started(slow_render)
+    await farm.stop(timeout=0.05)
+
+    with pytest.raises(RuntimeError, match="stopped"):
+        await asyncio.wait_for(render, timeout=5)
+
+    slow_render.release.set()
+    await asyncio.sleep(0.1)
+    assert not output.exists()
@@ -0,0 +1,78 @@
+import random
+
+from src.bot.services.battle.mechanics import BattleMechanics
+from src.bot.services.battle.models import BattleFighter
+from src.bot.services.battle.replay import BattleReplay
+from src.bot.services.battle.serialization import timeline_to_dict
+from src.bot.services.battle.timeline import BattleTimelineBuilder
+from src.bot.types import KaguneType
+
+
+def make_pair():
+    left = BattleFighter(
+        name="left", hp=500, max_hp=500, kagune_type=KaguneType.UKAKU, strength=40
+    )
+    right = BattleFighter(
+        name="right", hp=500, max_hp=500, kagune_type=KaguneType.KOUKAKU, speed=5
+    )
+    return left, right
+
+
+def test_same_seed_gives_same_battle():
+    first = BattleMechanics(rng=random.Random(42)).simulate(*make_pair())
+    second = BattleMechanics(rng=random.Random(42)).simulate(*make_pair())
+
+    assert [e.type for e in first.events] == [e.type for e in second.events]
+    assert [e.hp_delta_defender for e in first.events] == [
+        e.hp_delta_defender for e in second.events
+    ]
+
+
+def test_replay_regenerates_result_and_timeline():
+    replay = BattleReplay.record(*make_pair(), seed=123)
+
+    result_a, timeline_a = replay.play()
+    result_b, timeline_b = BattleReplay.from_dict(replay.to_dict()).play()
+
+    assert result_a.rounds == result_b.rounds
+    assert result_a.winner.name == result_b.winner.name
+    assert timeline_to_dict(timeline_a) == timeline_to_dict(timeline_b)
+
+
+def test_replay_does_not_mutate_recorded_fighters():
+    left, right = make_pair()
+    replay = BattleReplay.record(left, right, seed=1)
+    replay.play()
+
+    assert replay.left["hp"] == 500
+    assert left.hp == 500
+
+
+def test_timeline_picks_sprites_on_copies():
+    left = BattleFighter(
+        name="left", hp=500, max_hp=500, kagune_type=KaguneType.RINKAKU
+    )
+    right = BattleFighter(
+        name="right", hp=500, max_hp=500, kagune_type=KaguneType.RINKAKU
+    )
+    result = BattleMechanics(rng=random.Random(7)).simulate(left, right)
+
+    timeline = BattleTimelineBuilder().build(
+        left, right, result, rng=random.Random(7)
+    )
+
+    assert left.sprite_path is None and right.sprite_path is None
+    intro = timeline[0].data
+    assert intro.left.sprite_path and intro.right.sprite_path
+    assert all(item.data.left is intro.left for item in timeline)
+
+
+def test_replay_key_depends_on_seed():
+    left, right = make_pair()
+
+    assert BattleReplay.record(left, right, seed=1).key == (
+        BattleReplay.record(left, right, seed=1).key
+    )
+    assert BattleReplay.record(left, right, seed=1).key != (
+        BattleReplay.record(left, right, seed=2).key
+    )
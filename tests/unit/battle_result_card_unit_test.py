@@ -0,0 +1,25 @@
+from io import BytesIO
+
+from PIL import Image
+
+from src.bot.services.battle.models import BattleFighter
+from src.bot.services.battle.renderer import H, W
+from src.bot.services.battle.replay import BattleReplay
+from src.bot.services.battle.result_card import render_result_card
+from src.bot.types import KaguneType
+
+
+def test_result_card_is_png_of_video_size():
+    left = BattleFighter(
+        name="Канеки", hp=500, max_hp=500, kagune_type=KaguneType.UKAKU
+    )
+    right = BattleFighter(
+        name="Хайсе", hp=500, max_hp=500, kagune_type=KaguneType.KOUKAKU
+    )
+    result, timeline = BattleReplay.record(left, right, seed=3).play()
+    outro = timeline[-1].data
+
+    card = render_result_card(result, outro.left, outro.right)
+
+    assert card.startswith(b"\x89PNG")
+    assert Image.open(BytesIO(card)).size == (W, H)
@@ -0,0 +1,135 @@
+import asyncio
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import av
+import pytest
+
+from src.bot.services.battle import render_farm as render_farm_module
+from src.bot.services.battle.benchmark import make_fighter
+from src.bot.services.battle.compiled_timeline import (
+    item_frame_count,
+    timeline_frame_count,
+)
+from src.bot.services.battle.render_farm import BattleRenderFarm
+from src.bot.services.battle.replay import BattleReplay
+from src.bot.services.battle.segments import SegmentedBattleRenderer, split_timeline
+from src.bot.types import KaguneType
+
+
+class RecordingExecutor(ThreadPoolExecutor):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.futures = []
+
+    def submit(self, *args, **kwargs):
+        future = super().submit(*args, **kwargs)
+        self.futures.append(future)
+        return future
+
+
+@pytest.fixture
+def timeline():
+    # В репозитории лежат ассеты только для ринкаку
+    left = make_fighter("Канеки", KaguneType.RINKAKU, 250)
+    right = make_fighter("Хайсе", KaguneType.RINKAKU, 250)
+    _, timeline = BattleReplay.record(left, right, seed=1).play()
+    return timeline
+
+
+@pytest.fixture
+def renderer(tmp_path, monkeypatch):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    with RecordingExecutor(max_workers=3) as executor:
+        yield SegmentedBattleRenderer(
+            executor=executor, workers_count=3, min_segment_frames=24
+        )
+
+
+def decoded_frames(path) -> int:
+    with av.open(str(path)) as container:
+        return sum(1 for _ in container.decode(video=0))
+
+
+def test_split_keeps_order_and_frames(timeline):
+    segments = split_timeline(timeline, 3, min_segment_frames=24)
+
+    assert len(segments) > 1
+    assert [item for segment in segments for item in segment] == timeline
+    assert sum(
+        item_frame_count(item) for segment in segments for item in segment
+    ) == timeline_frame_count(timeline)
+
+
+async def test_segmented_render_is_playable(timeline, renderer, tmp_path):
+    output = tmp_path / "battle.mp4"
+
+    await renderer.render_async(timeline, output)
+
+    assert decoded_frames(output) == timeline_frame_count(timeline)
+    with av.open(str(output)) as container:
+        first = next(container.demux(video=0))
+        assert first.is_keyframe
+    assert not list(tmp_path.glob("battle_segments_*"))
+
+
+async def test_cancel_waits_for_segments_before_cleanup(timeline, renderer, tmp_path):
+    task = asyncio.create_task(renderer.render_async(timeline, tmp_path / "x.mp4"))
+    await asyncio.sleep(0.2)
+    task.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    # Начатые сегменты дописаны до удаления временной папки
+    assert renderer._executor.futures
+    assert all(future.done() for future in renderer._executor.futures)
+    assert not list(tmp_path.glob("battle_segments_*"))
+    assert not (tmp_path / "x.mp4").exists()
+
+
+async def test_farm_cleanup_waits_for_running_segment(
+    tmp_path, monkeypatch, timeline
+):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    monkeypatch.setattr(
+        render_farm_module,
+        "ProcessPoolExecutor",
+        lambda max_workers, **_: ThreadPoolExecutor(max_workers=max_workers),
+    )
+    release = threading.Event()
+    writes = []
+
+    def render(payload, output_path, left_fighter_name=""):
+        if output_path.endswith("segment_000.mp4"):
+            raise RuntimeError("segment failed")
+        release.wait(timeout=5)
+        # Каталог сегментов ещё на месте — иначе open упадёт
+        with open(output_path, "wb") as file:
+            file.write(b"segment")
+        writes.append(output_path)
+        return output_path
+
+    monkeypatch.setattr(render_farm_module, "_render_in_process", render)
+
+    farm = BattleRenderFarm(workers_count=2)
+    await farm.start()
+    renderer = SegmentedBattleRenderer(
+        render_farm=farm, workers_count=2, min_segment_frames=24
+    )
+    task = asyncio.create_task(
+        renderer.render_async(timeline, tmp_path / "battle.mp4")
+    )
+
+    await asyncio.sleep(0.2)
+    assert not task.done()
+    assert list(tmp_path.glob("battle_segments_*"))
+
+    release.set()
+    with pytest.raises(RuntimeError, match="segment failed"):
+        await asyncio.wait_for(task, timeout=5)
+
+    assert len(writes) == 1
+    assert not list(tmp_path.glob("battle_segments_*"))
+    await farm.stop()
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.bot.services.battle.compositor import premultiply
+from src.bot.services.battle.sprite_animator import (
+    _expanded_size,
+    paste_sprite_transformed,
+)
+
+
+def off_center_sprite():
+    """Кадр 200x300, непрозрачна только область в правом верхнем углу."""
+    rgba = np.zeros((300, 200, 4), dtype=np.uint8)
+    rgba[40:120, 120:180] = (200, 60, 30, 255)
+    return Image.fromarray(rgba, "RGBA")
+
+
+def alpha_box(canvas):
+    ys, xs = np.nonzero(canvas.any(axis=2))
+    return ys.min(), ys.max(), xs.min(), xs.max(), ys.mean(), xs.mean()
+
+
+@pytest.mark.parametrize("size", [(200, 300), (201, 299), (64, 64)])
+@pytest.mark.parametrize("angle", [-2.0, 0.7, 2.0, 15.0])
+def test_expanded_size_matches_pil(size, angle):
+    expected = Image.new("L", size).rotate(angle, expand=True).size
+    assert _expanded_size(*size, angle) == expected
+
+
+@pytest.mark.parametrize("angle", [-2.0, 2.0, 10.0])
+def test_rotated_premultiplied_sprite_keeps_its_place(angle):
+    image = off_center_sprite()
+
+    reference = np.zeros((400, 400, 3), dtype=np.uint8)
+    paste_sprite_transformed(reference, image, 200, 380, angle=angle)
+
+    canvas = np.zeros((400, 400, 3), dtype=np.uint8)
+    sprite = premultiply(np.asarray(image))
+    assert sprite.offset_x and sprite.offset_y
+    paste_sprite_transformed(canvas, sprite, 200, 380, angle=angle)
+
+    # Та же область на том же месте: центр — до полупикселя, края
+    # расходятся только на размытие бикубики у края обрезки
+    box, expected = alpha_box(canvas), alpha_box(reference)
+    assert np.allclose(box[4:], expected[4:], atol=0.5)
+    assert np.allclose(box[:4], expected[:4], atol=2)
@@ -0,0 +1,48 @@
+import numpy as np
+from PIL import Image
+
+from src.bot.services.battle.sprite_atlas import (
+    SPRITE_SIZE,
+    SpriteAtlas,
+    build_sprite_atlas,
+    load_or_build_sprite_atlas,
+)
+
+
+def make_sprites(root):
+    folder = root / "rinkaku"
+    folder.mkdir(parents=True)
+    for name, size in (("b.png", (400, 600)), ("a.png", (50, 80))):
+        pixels = np.random.default_rng(len(name)).integers(
+            0, 256, (size[1], size[0], 4), dtype=np.uint8
+        )
+        Image.fromarray(pixels, "RGBA").save(folder / name)
+    return folder
+
+
+def test_atlas_indexes_folders_and_stores_mirrors(tmp_path):
+    folder = make_sprites(tmp_path)
+    atlas = build_sprite_atlas(tmp_path)
+
+    assert atlas.files(folder) == [folder / "a.png", folder / "b.png"]
+    assert atlas.files(tmp_path / "ukaku") is None
+
+    big = atlas.array(folder / "b.png")
+    assert big.shape[1] <= SPRITE_SIZE[0] and big.shape[0] <= SPRITE_SIZE[1]
+    assert np.array_equal(atlas.array(folder / "b.png", flip=True), big[:, ::-1])
+    assert not big.flags.writeable
+
+
+def test_atlas_round_trip_and_rebuild_on_change(tmp_path):
+    folder = make_sprites(tmp_path / "sprites")
+    path = tmp_path / "atlas.npz"
+
+    built = load_or_build_sprite_atlas(path, tmp_path / "sprites")
+    loaded = SpriteAtlas.load(path)
+    assert loaded.paths == built.paths
+    assert np.array_equal(loaded.buffer, built.buffer)
+    assert loaded.is_fresh(tmp_path / "sprites")
+
+    Image.new("RGBA", (10, 10)).save(folder / "c.png")
+    assert not loaded.is_fresh(tmp_path / "sprites")
+    assert len(load_or_build_sprite_atlas(path, tmp_path / "sprites")) == 3
@@ -0,0 +1,86 @@
+import asyncio
+
+from src.bot.services.battle.video_cache import BattleVideoCache
+
+
+def write_video(path, size: int):
+    path.write_bytes(b"\0" * size)
+    return path
+
+
+def test_miss_then_disk_then_file_id_hit(tmp_path):
+    cache = BattleVideoCache(cache_dir=tmp_path / "cache", max_bytes=100)
+    assert cache.get("a") is None
+
+    cache.put_file("a", write_video(tmp_path / "a.mp4", 10))
+    cached = cache.get("a")
+    assert cached.path.is_file()
+    assert cached.file_id is None
+
+    cache.set_file_id("a", "file-a")
+    assert cache.get("a").file_id == "file-a"
+
+    stats = cache.stats
+    assert (stats.misses, stats.disk_hits, stats.file_id_hits) == (1, 1, 1)
+
+
+def test_evicts_oldest_file_but_keeps_file_id(tmp_path):
+    cache = BattleVideoCache(cache_dir=tmp_path / "cache", max_bytes=25)
+    cache.put_file("a", write_video(tmp_path / "a.mp4", 10))
+    cache.set_file_id("a", "file-a")
+    cache.put_file("b", write_video(tmp_path / "b.mp4", 10))
+    cache.put_file("c", write_video(tmp_path / "c.mp4", 10))
+
+    assert not cache.path_for("a").exists()
+    assert cache.get("a").file_id == "file-a"
+    assert cache.get("c").path.is_file()
+    assert cache.stats.bytes <= 25
+
+
+def test_entry_limit_removes_files_of_dropped_entries(tmp_path):
+    cache = BattleVideoCache(cache_dir=tmp_path / "cache", max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.put_file(key, write_video(tmp_path / f"{key}.mp4", 10))
+
+    assert cache.get("a") is None
+    assert not cache.path_for("a").exists()
+    assert sorted(p.name for p in (tmp_path / "cache").glob("*.mp4")) == [
+        "b.mp4",
+        "c.mp4",
+    ]
+
+
+def test_index_survives_restart(tmp_path):
+    cache = BattleVideoCache(cache_dir=tmp_path / "cache")
+    cache.set_file_id("a", "file-a")
+    cache.flush()
+
+    restored = BattleVideoCache(cache_dir=tmp_path / "cache")
+    assert restored.get("a").file_id == "file-a"
+
+
+def test_reads_do_not_rewrite_index(tmp_path):
+    cache = BattleVideoCache(cache_dir=tmp_path / "cache")
+    cache.set_file_id("a", "file-a")
+    assert cache.flush()
+
+    index = tmp_path / "cache" / "index.json"
+    before = index.stat().st_mtime_ns
+    cache.get("a")
+    assert index.stat().st_mtime_ns == before
+
+    assert cache.flush()
+    assert not cache.flush()
+
+
+async def test_autosave_flushes_on_cancel(tmp_path):
+    cache = BattleVideoCache(cache_dir=tmp_path / "cache")
+    task = asyncio.create_task(cache.autosave(interval=3600))
+    await asyncio.sleep(0)
+    cache.set_file_id("a", "file-a")
+
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+    restored = BattleVideoCache(cache_dir=tmp_path / "cache")
+    assert restored.get("a").file_id == "file-a"
@@ -0,0 +1,70 @@
+import pytest
+
+from src.bot.services.battle.delivery import BattleDeliveryService
+from src.bot.services.battle.win_table import (
+    REFERENCE,
+    WinProbabilityTable,
+    _scaled_fighter,
+    build_win_table,
+)
+from src.bot.types import KaguneType
+
+
+@pytest.fixture(scope="module")
+def table():
+    return build_win_table(
+        fights_per_cell=200,
+        rng=0,
+        kagunes=(KaguneType.UKAKU,),
+        limit=1.0,
+        step=1.0,
+    )
+
+
+def fighter(hp=0.0, power=0.0, speed=0.0, dexterity=0.0):
+    return _scaled_fighter(REFERENCE, (hp, power, speed, dexterity), KaguneType.UKAKU)
+
+
+def test_stronger_fighter_is_favoured(table):
+    strong = table.probability(fighter(power=1.0), fighter())
+    weak = table.probability(fighter(power=-1.0), fighter())
+
+    assert strong > 0.5 > weak
+
+
+def test_grid_points_match_cells_and_interpolation_is_between(table):
+    at_low = table.probability(fighter(power=0.0), fighter(), interpolate=False)
+    at_high = table.probability(fighter(power=1.0), fighter(), interpolate=False)
+    middle = table.probability(fighter(power=0.5), fighter())
+
+    assert min(at_low, at_high) <= middle <= max(at_low, at_high)
+
+
+def test_save_and_load_round_trip(table, tmp_path):
+    path = tmp_path / "win.npz"
+    table.save(path)
+    loaded = WinProbabilityTable.load(path)
+
+    assert loaded.kagunes == table.kagunes
+    assert loaded.probability(fighter(), fighter()) == table.probability(
+        fighter(), fighter()
+    )
+
+
+def test_missing_table_degrades_to_none(tmp_path):
+    assert WinProbabilityTable.load_optional(tmp_path / "missing.npz") is None
+
+
+def test_delivery_caption_shows_win_chance(table):
+    delivery = BattleDeliveryService(
+        generator=None, video_cache=None, scheduler=None, win_table=table
+    )
+    line = delivery.win_chance_line(fighter(power=1.0), fighter())
+
+    assert line.startswith("Шансы до боя: reference ")
+    assert "%" in line
+
+    no_table = BattleDeliveryService(
+        generator=None, video_cache=None, scheduler=None
+    )
+    assert no_table.win_chance_line(fighter(), fighter()) == ""
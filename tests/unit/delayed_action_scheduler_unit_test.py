@@ -0,0 +1,45 @@
+import asyncio
+
+from src.bot.services.scheduler import DelayedActionScheduler
+
+
+async def test_schedule_returns_immediately_and_runs_later():
+    scheduler = DelayedActionScheduler()
+    done = []
+
+    async def action():
+        done.append(True)
+
+    scheduler.schedule(0.05, action)
+    assert done == [] and scheduler.pending == 1
+
+    await asyncio.sleep(0.1)
+    assert done == [True] and scheduler.pending == 0
+
+
+async def test_failing_action_does_not_break_others():
+    scheduler = DelayedActionScheduler()
+    done = []
+
+    async def broken():
+        raise RuntimeError("telegram is down")
+
+    async def action():
+        done.append(True)
+
+    scheduler.schedule(0, broken)
+    scheduler.schedule(0, action)
+    await asyncio.sleep(0.01)
+    assert done == [True]
+
+
+async def test_stop_flushes_pending_actions_without_delay():
+    scheduler = DelayedActionScheduler()
+    done = []
+
+    async def action():
+        done.append(True)
+
+    scheduler.schedule(3600, action)
+    await asyncio.wait_for(scheduler.stop(), timeout=1)
+    assert done == [True]
@@ -0,0 +1,64 @@
+from src.bot.services.battle.frame_cache import ByteBudgetCache
+
+
+def make_cache(max_bytes: int = 10) -> ByteBudgetCache:
+    return ByteBudgetCache(name="test", max_bytes=max_bytes, sizeof=len)
+
+
+def test_get_miss_then_hit():
+    cache = make_cache()
+    assert cache.get("a") is None
+
+    cache.put("a", b"123")
+    assert cache.get("a") == b"123"
+
+    stats = cache.stats
+    assert stats.hits == 1
+    assert stats.misses == 1
+    assert stats.bytes == 3
+
+
+def test_evicts_least_recently_used_by_bytes():
+    cache = make_cache(max_bytes=10)
+    cache.put("a", b"1234")
+    cache.put("b", b"1234")
+    cache.get("a")
+    cache.put("c", b"1234")
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+    assert cache.stats.evictions == 1
+    assert cache.stats.bytes == 8
+
+
+def test_entry_larger_than_budget_is_not_cached():
+    cache = make_cache(max_bytes=4)
+    cache.put("big", b"123456")
+
+    assert "big" not in cache
+    assert cache.stats.bytes == 0
+
+
+def test_get_or_load_calls_loader_once():
+    cache = make_cache()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return b"xy"
+
+    assert cache.get_or_load("k", loader) == b"xy"
+    assert cache.get_or_load("k", loader) == b"xy"
+    assert len(calls) == 1
+
+
+def test_resize_evicts_down_to_new_budget():
+    cache = make_cache(max_bytes=10)
+    cache.put("a", b"1234")
+    cache.put("b", b"1234")
+
+    cache.resize(5)
+
+    assert cache.stats.entries == 1
+    assert "b" in cache
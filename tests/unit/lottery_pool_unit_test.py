@@ -0,0 +1,92 @@
+import av
+import numpy as np
+
+from src.bot.services.lottery_pool import (
+    LOTTERY_MANIFEST,
+    LotteryPoolBuilder,
+    LotteryPoolIndex,
+    LotteryPoolManifest,
+    LotteryVideo,
+)
+
+
+def test_reconcile_drops_partial_and_broken_files(tmp_path):
+    color_dir = tmp_path / "red"
+    color_dir.mkdir()
+    (color_dir / "red_001.mp4.part").write_bytes(b"half")
+    (color_dir / "red_002.mp4").write_bytes(b"not a video")
+
+    builder = LotteryPoolBuilder(tmp_path, videos_per_color=2, colors=["red"])
+    builder.reconcile()
+
+    assert list(color_dir.iterdir()) == []
+    assert builder.plan() == [("red", "red_001.mp4"), ("red", "red_002.mp4")]
+
+
+def test_top_up_keeps_intact_videos(tmp_path):
+    (tmp_path / "red").mkdir()
+    (tmp_path / "red" / "red_002.mp4").write_bytes(b"x" * 10)
+
+    manifest = LotteryPoolManifest(tmp_path)
+    manifest.add(LotteryVideo("red", "red/red_002.mp4", 7.0, 10, "abc"))
+    manifest.add(LotteryVideo("red", "red/red_005.mp4", 7.0, 10, "abc"))
+    manifest.save()
+
+    builder = LotteryPoolBuilder(tmp_path, videos_per_color=3, colors=["red"])
+    builder.reconcile()
+
+    assert list(builder.manifest.videos) == ["red/red_002.mp4"]
+    assert builder.plan() == [("red", "red_001.mp4"), ("red", "red_003.mp4")]
+    assert len(builder.plan(rebuild=True)) == 3
+
+
+def test_index_picks_by_color_and_persists_file_ids(tmp_path):
+    manifest = LotteryPoolManifest(tmp_path)
+    manifest.add(LotteryVideo("red", "red/red_001.mp4", 7.0, 10, "aaa"))
+    manifest.add(LotteryVideo("blue", "blue/blue_001.mp4", 7.0, 10, "bbb"))
+    manifest.save()
+
+    index = LotteryPoolIndex(tmp_path, refresh_interval=0)
+    entry = index.pick("red")
+    assert entry.path == tmp_path / "red" / "red_001.mp4"
+    assert entry.file_id is None
+    assert index.pick("green") is None
+
+    index.set_file_id(entry, "file-id-1")
+    assert LotteryPoolIndex(tmp_path).pick("red").file_id == "file-id-1"
+
+    # Перерисованное видео — другой sha256, старый file_id к нему не липнет
+    manifest.add(LotteryVideo("red", "red/red_001.mp4", 7.0, 12, "ccc"))
+    manifest.save()
+    assert LotteryPoolIndex(tmp_path).pick("red").file_id is None
+
+
+def _write_video(path, frames=5):
+    with av.open(str(path), "w") as container:
+        stream = container.add_stream("mpeg4", rate=10)
+        stream.width, stream.height = 32, 32
+        stream.pix_fmt = "yuv420p"
+        for _ in range(frames):
+            frame = av.VideoFrame.from_ndarray(
+                np.zeros((32, 32, 3), dtype=np.uint8), format="rgb24"
+            )
+            container.mux(stream.encode(frame))
+        container.mux(stream.encode())
+
+
+def test_load_indexes_pool_without_manifest(tmp_path):
+    (tmp_path / "red").mkdir()
+    _write_video(tmp_path / "red" / "old.mp4")
+    _write_video(tmp_path / "red" / "manual.mov")
+    (tmp_path / "red" / "notes.txt").write_text("не видео")
+
+    index = LotteryPoolIndex(tmp_path, refresh_interval=0)
+    # Без манифеста pick ничего не хеширует — пул пуст до load()
+    assert index.pick("red") is None
+
+    index.load()
+    assert (tmp_path / LOTTERY_MANIFEST).is_file()
+    assert sorted(entry.path.name for entry in index.entries()) == [
+        "manual.mov",
+        "old.mp4",
+    ]
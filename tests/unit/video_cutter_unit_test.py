@@ -0,0 +1,96 @@
+from fractions import Fraction
+
+import av
+import numpy as np
+import pytest
+
+from src.bot.services.video.cutter import VideoCutterService
+from src.bot.services.video.keyframes import KeyframeIndexStore
+
+FPS = 25
+SAMPLE_RATE = 44100
+
+
+def _write_episode(path, seconds=8, gop=FPS):
+    """H.264 + AAC, keyframe раз в gop кадров."""
+    with av.open(str(path), "w") as container:
+        video = container.add_stream("libx264", rate=FPS)
+        video.width, video.height = 64, 48
+        video.pix_fmt = "yuv420p"
+        video.codec_context.gop_size = gop
+        video.codec_context.options = {"keyint_min": str(gop), "sc_threshold": "0"}
+
+        audio = container.add_stream("aac", rate=SAMPLE_RATE)
+        audio.layout = "mono"
+
+        for i in range(seconds * FPS):
+            image = np.full((48, 64, 3), i * 3 % 256, dtype=np.uint8)
+            frame = av.VideoFrame.from_ndarray(image, format="rgb24")
+            frame.pts = i
+            frame.time_base = Fraction(1, FPS)
+            container.mux(video.encode(frame))
+        container.mux(video.encode())
+
+        samples = 1024
+        for i in range(seconds * SAMPLE_RATE // samples):
+            tone = np.zeros((1, samples), dtype=np.float32)
+            frame = av.AudioFrame.from_ndarray(tone, format="fltp", layout="mono")
+            frame.sample_rate = SAMPLE_RATE
+            frame.pts = i * samples
+            container.mux(audio.encode(frame))
+        container.mux(audio.encode())
+
+
+@pytest.fixture
+def cutter(tmp_path):
+    return VideoCutterService(keyframes=KeyframeIndexStore(tmp_path / "keyframes"))
+
+
+def test_stream_copy_cut(tmp_path, cutter):
+    source = tmp_path / "episode.mp4"
+    output = tmp_path / "clip.mp4"
+    _write_episode(source)
+
+    # Начало между keyframe (2.0 и 3.0) — копирование идёт с 2.0
+    cutter._cut_stream_copy(source, output, 2.5, 6.0)
+
+    with av.open(str(output)) as container:
+        # Хвост может быть длиннее на окно переупорядочивания B-кадров
+        duration = container.duration / av.time_base
+        assert 3.5 - 1 / FPS <= duration <= 3.5 + 4 / FPS
+        assert container.streams.audio
+
+        first = next(
+            packet
+            for packet in container.demux(container.streams.video[0])
+            if packet.size
+        )
+        assert first.is_keyframe
+
+    # Edit list прячет кадры до начала: первый показанный — кадр 2.5 с
+    with av.open(str(output)) as container:
+        frame = next(container.decode(video=0))
+        assert frame.time == pytest.approx(0.0, abs=1e-3)
+        level = int(frame.to_ndarray(format="rgb24")[24, 32, 0])
+        assert abs(level - int(2.5 * FPS) * 3 % 256) <= 6
+    assert not output.with_name(output.name + ".part").exists()
+
+
+async def test_broken_input_falls_back_to_reencode(tmp_path, cutter, monkeypatch):
+    source = tmp_path / "broken.mp4"
+    source.write_bytes(b"not a video")
+    output = tmp_path / "clip.mp4"
+
+    calls = []
+
+    async def fake_reencode(input_path, output_path, start_time, duration):
+        calls.append((str(input_path), start_time, duration))
+        return output_path
+
+    monkeypatch.setattr(cutter, "_cut_reencode", fake_reencode)
+
+    result = await cutter.cut_video_async(source, output, "00:02", "00:06")
+
+    assert result == output
+    assert calls == [(str(source), "00:02", 4)]
+    assert not output.exists()
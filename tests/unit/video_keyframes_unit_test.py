@@ -0,0 +1,46 @@
+from src.bot.services.video import keyframes as keyframes_module
+from src.bot.services.video.cutter import VideoCutterService
+from src.bot.services.video.keyframes import KeyframeIndex, KeyframeIndexStore
+
+
+def test_keyframe_lookup():
+    index = KeyframeIndex("ep.mp4", 0, 0, [0.0, 2.0, 4.5, 9.0])
+
+    assert index.at_or_before(4.5) == 4.5
+    assert index.at_or_before(8.9) == 4.5
+    assert index.at_or_before(-1.0) == 0.0
+    assert index.after(4.5) == 9.0
+    assert index.after(9.0) is None
+
+
+def test_store_persists_and_rebuilds_on_change(tmp_path, monkeypatch):
+    source = tmp_path / "Season_1_Episode_1.mp4"
+    source.write_bytes(b"x" * 10)
+
+    scans = []
+
+    def fake_scan(path):
+        scans.append(path)
+        return [0.0, 2.0]
+
+    monkeypatch.setattr(keyframes_module, "scan_keyframes", fake_scan)
+
+    KeyframeIndexStore(tmp_path / "cache").get(source)
+    index = KeyframeIndexStore(tmp_path / "cache").get(source)
+    assert index.keyframes == [0.0, 2.0]
+    assert len(scans) == 1
+
+    source.write_bytes(b"y" * 20)
+    KeyframeIndexStore(tmp_path / "cache").get(source)
+    assert len(scans) == 2
+
+
+def test_output_paths_are_unique():
+    cutter = VideoCutterService()
+
+    first = cutter.generate_output_path("Season_1_Episode_1.mp4")
+    second = cutter.generate_output_path("Season_1_Episode_1.mp4")
+
+    assert first != second
+    assert first.suffix == ".mp4"
+    assert cutter.generate_output_path("ep.mp4", is_gif=True).suffix == ".gif"